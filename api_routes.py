@@ -1,8 +1,26 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, g, request, jsonify, current_app, stream_with_context, url_for
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from auth import require_auth, validate_json_input
-from models import DataRecord, db
+from export import EXPORT_FORMATS, write_export
+from models import BulkJob, DataRecord, db, record_stats
+from cache import get_response_cache, listing_key, pack_entry, unpack_entry, record_tag, record_tags, unit_tag, wiki_tag
+from bulk_import import IMPORT_MODES, ImportRowError, check_upsert, import_records, iter_ndjson
+from validation import check_fields, check_title
+from pagination import InvalidCursorError, listing_metadata, paginate_keyset, paginate_offset
+from db_pool import get_pool_stats
+from replicas import read_only, wants_primary
+from profiling import phase
+from search import SEARCH_SORTS, check_search_query, search_page, search_statement
+from stats import check_group_by, stats_payload, stats_statement
+from changes import changes_page, changes_statement, cursor_expired, decode_changes_cursor
+from multiget import check_ids, multiget_payload, multiget_statement
+from jobs import BULK_ACTIONS, bulk_statement, check_record_ids, enqueue_statement
+from group_commit import PendingWrite, create_values, get_group_committer, update_values
+from conditional import has_conditions, is_not_modified, make_etag, not_modified_response, set_validators
+from urllib.parse import urlencode
 import logging
+import time
 
 # Create blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -21,6 +39,140 @@ def internal_error(error):
         'message': 'An unexpected error occurred'
     }), 500
 
+def list_records(query, body=None, cache_tag=None):
+    """Respond with one page of a record query.
+    
+    Paginates by page number, or by keyset when a cursor parameter is present.
+    Serves from the response cache when cache_tag is given and answers
+    conditional requests with 304 before any rows are loaded where possible.
+    """
+    cache_key = listing_key(cache_tag) if cache_tag else None
+    if cache_key:
+        response = cached_response(cache_key)
+        if response:
+            return response
+    
+    fields, error = check_fields(request.args.get('fields'))
+    if error:
+        return jsonify(error), 400
+    
+    # Select plain column tuples for the requested fields only, so unrequested
+    # columns such as content are never read; pagination and validators also
+    # need id, created_at and updated_at
+    selected = tuple(dict.fromkeys(fields + ('id', 'created_at', 'updated_at')))
+    query = query.with_only_columns(*DataRecord.columns(selected))
+    
+    per_page = min(request.args.get('per_page', 10, type=int), 100)  # Max 100 per page
+    if per_page < 1:
+        per_page = 10
+    params = urlencode(sorted(request.args.items(multi=True)))
+    
+    # Listings send no Last-Modified: deleting a row, or a row moving into the
+    # page, leaves max(updated_at) unchanged, so If-Modified-Since could
+    # answer 304 for a changed page. Only If-None-Match is honoured.
+    if 'cursor' in request.args:
+        # The ETag comes from the page itself so the COUNT(*) can still be skipped
+        include_total = request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+        records, pagination = paginate_keyset(db.session, query, request.args['cursor'], per_page, include_total)
+        etag = make_etag(params, pagination.get('total'), [(record.id, record.updated_at) for record in records])
+        if is_not_modified(etag, None):
+            return not_modified_response(etag, None)
+    else:
+        # One aggregate gives both the page total and the ETag
+        page = max(request.args.get('page', 1, type=int), 1)
+        total, latest_update = listing_metadata(db.session, query)
+        etag = make_etag(params, total, latest_update)
+        if is_not_modified(etag, None):
+            return not_modified_response(etag, None)
+        records, pagination = paginate_offset(db.session, query, page, per_page, total)
+    
+    with phase('serialize'):
+        payload = dict(body or {})
+        if selected == fields:
+            payload['records'] = [record._asdict() for record in records]
+        else:
+            payload['records'] = [{field: record._mapping[field] for field in fields} for record in records]
+        payload['pagination'] = pagination
+        response = set_validators(jsonify(payload), etag, None)
+    
+    if cache_key:
+        cache_response(cache_key, response, [cache_tag])
+    return response
+
+def filter_records(query, args=None, columns=DataRecord):
+    """Apply the category/is_active/wiki_id/unit_id query parameters to a record select.
+    
+    columns holds the filtered columns as attributes; record_stats.c filters
+    the stats table the same way.
+    """
+    args = request.args if args is None else args
+    category = args.get('category')
+    is_active = args.get('is_active', type=bool)
+    wiki_id = args.get('wiki_id', type=int)
+    unit_id = args.get('unit_id', type=int)
+    
+    if category:
+        query = query.filter(columns.category == category)
+    
+    if is_active is not None:
+        query = query.filter(columns.is_active == is_active)
+        
+    if wiki_id is not None:
+        query = query.filter(columns.wiki_id == wiki_id)
+        
+    if unit_id is not None:
+        query = query.filter(columns.unit_id == unit_id)
+    
+    return query
+
+def where_record(stmt, record_id, wiki_id=None):
+    """Restrict a select to one record.
+    
+    A known wiki_id narrows the lookup to one partition when data_records is
+    hash partitioned by wiki_id (see partitions.py); records of other wikis
+    are then not found.
+    """
+    stmt = stmt.where(DataRecord.id == record_id)
+    if wiki_id is not None:
+        stmt = stmt.where(DataRecord.wiki_id == wiki_id)
+    return stmt
+
+def cached_response(key):
+    """Return a response (or 304) built from a cached JSON body, or None on a miss"""
+    # Cached bodies may come from a lagging replica
+    if wants_primary():
+        return None
+    
+    cached = get_response_cache().get(key)
+    if cached is None:
+        return None
+    
+    etag, last_modified, body = unpack_entry(cached)
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    
+    response = current_app.response_class(body, mimetype='application/json')
+    return set_validators(response, etag, last_modified)
+
+def cache_response(key, response, tags):
+    """Store a successful JSON response body and its validators under key"""
+    etag, _ = response.get_etag()
+    get_response_cache().set(key, pack_entry(etag, response.last_modified, response.get_data()), tags)
+    return response
+
+def invalidate_records(rows):
+    """Drop cached responses for (id, wiki_id, unit_id) rows touched by a write"""
+    tags = []
+    for record_id, wiki_id, unit_id in rows:
+        tags.extend(record_tags(record_id, wiki_id, unit_id))
+    get_response_cache().invalidate(tags)
+
+def invalid_cursor_response(error):
+    return jsonify({
+        'error': 'Invalid cursor',
+        'message': str(error)
+    }), 400
+
 # Health check endpoint (no auth required)
 @api_bp.route('/health', methods=['GET'])
 def health_check():
@@ -44,56 +196,212 @@ def health_check():
 # GET /api/records - Get all records
 @api_bp.route('/records', methods=['GET'])
 @require_auth
+@read_only
 def get_records():
     """Get all data records with optional filtering"""
     try:
-        # Get query parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)  # Max 100 per page
-        category = request.args.get('category')
-        is_active = request.args.get('is_active', type=bool)
-        wiki_id = request.args.get('wiki_id', type=int)
-        unit_id = request.args.get('unit_id', type=int)
-        
         # Build query
-        query = DataRecord.query
+        query = filter_records(select(DataRecord))
         
-        if category:
-            query = query.filter(DataRecord.category == category)
+        # Paginate (newest first)
+        return list_records(query)
         
-        if is_active is not None:
-            query = query.filter(DataRecord.is_active == is_active)
-            
-        if wiki_id is not None:
-            query = query.filter(DataRecord.wiki_id == wiki_id)
-            
-        if unit_id is not None:
-            query = query.filter(DataRecord.unit_id == unit_id)
+    except InvalidCursorError as e:
+        return invalid_cursor_response(e)
+    except Exception as e:
+        current_app.logger.error(f"Error getting records: {str(e)}")
+        return jsonify({
+            'error': 'Failed to retrieve records',
+            'message': str(e)
+        }), 500
+
+# GET /api/records/export - Stream records as NDJSON or CSV
+@api_bp.route('/records/export', methods=['GET'])
+@require_auth
+@read_only
+def export_records():
+    """Stream all records matching the listing filters, read through a server-side cursor"""
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({
+                'error': 'Invalid format',
+                'message': 'Supported formats: ndjson, csv'
+            }), 400
+        
+        stmt = filter_records(select(*DataRecord.columns())).order_by(DataRecord.id)
+        batch_size = current_app.config['EXPORT_BATCH_SIZE']
+        
+        def generate():
+            result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+            try:
+                yield from write_export(result, export_format)
+            except Exception as e:
+                # Headers are already sent, so the stream can only be cut short
+                current_app.logger.error(f"Error streaming export: {str(e)}")
+                raise
+            finally:
+                result.close()
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        return Response(
+            stream_with_context(generate()),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=records.{extension}'}
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f"Error exporting records: {str(e)}")
+        return jsonify({
+            'error': 'Failed to export records',
+            'message': str(e)
+        }), 500
+
+# GET /api/records/search - Full-text search over title and content
+@api_bp.route('/records/search', methods=['GET'])
+@require_auth
+@read_only
+def search_records():
+    """Search records by title and content, ranked, with highlighted snippets"""
+    try:
+        query, error = check_search_query(request.args.get('q'))
+        if error:
+            return jsonify(error), 400
         
-        # Order by creation date (newest first)
-        query = query.order_by(DataRecord.created_at.desc())
+        fields, error = check_fields(request.args.get('fields'))
+        if error:
+            return jsonify(error), 400
         
-        # Paginate
-        records = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
+        sort = request.args.get('sort', 'relevance').lower()
+        if sort not in SEARCH_SORTS:
+            return jsonify({
+                'error': 'Invalid sort',
+                'message': f"Supported sorts: {', '.join(SEARCH_SORTS)}"
+            }), 400
+        
+        per_page = min(request.args.get('per_page', 10, type=int), 100)  # Max 100 per page
+        if per_page < 1:
+            per_page = 10
+        max_matches = current_app.config['SEARCH_MAX_MATCHES']
+        
+        stmt = search_statement(
+            filter_records(select(DataRecord)), query, sort, request.args.get('cursor'), per_page, max_matches, fields
         )
+        rows = db.session.execute(stmt).all()
         
+        with phase('serialize'):
+            records, pagination = search_page(rows, sort, per_page, max_matches, fields)
+            return jsonify({
+                'query': query,
+                'records': records,
+                'pagination': pagination
+            })
+        
+    except InvalidCursorError as e:
+        return invalid_cursor_response(e)
+    except Exception as e:
+        current_app.logger.error(f"Error searching records: {str(e)}")
         return jsonify({
-            'records': [record.to_dict() for record in records.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': records.total,
-                'pages': records.pages,
-                'has_next': records.has_next,
-                'has_prev': records.has_prev
-            }
-        })
+            'error': 'Failed to search records',
+            'message': str(e)
+        }), 500
+
+# GET /api/records/stats - Record counts grouped by wiki_id, category and is_active
+@api_bp.route('/records/stats', methods=['GET'])
+@require_auth
+@read_only
+def get_record_stats():
+    """Grouped record counts, read from the trigger-maintained record_stats table"""
+    try:
+        group_by, error = check_group_by(request.args.get('group_by'))
+        if error:
+            return jsonify(error), 400
+        
+        if 'unit_id' in request.args:
+            return jsonify({
+                'error': 'Unsupported filter',
+                'message': 'Stats can be filtered by category, is_active and wiki_id'
+            }), 400
+        
+        stmt = stats_statement(filter_records(select(record_stats), columns=record_stats.c), group_by)
+        rows = db.session.execute(stmt).all()
+        return jsonify(stats_payload(rows, group_by))
         
     except Exception as e:
-        current_app.logger.error(f"Error getting records: {str(e)}")
+        current_app.logger.error(f"Error getting record stats: {str(e)}")
+        return jsonify({
+            'error': 'Failed to retrieve record stats',
+            'message': str(e)
+        }), 500
+
+# GET /api/records/changes - Inserts, updates and deletes after a since= cursor
+# Changes appear once every older transaction has ended, so a long-running writing
+# transaction holds the feed back (metric record_changes_lag_seconds)
+@api_bp.route('/records/changes', methods=['GET'])
+@require_auth
+def get_record_changes():
+    """Change feed for incremental sync; wait= long-polls until a change arrives"""
+    try:
+        fields, error = check_fields(request.args.get('fields'))
+        if error:
+            return jsonify(error), 400
+        
+        per_page = min(request.args.get('per_page', 100, type=int), 1000)
+        if per_page < 1:
+            per_page = 100
+        wait = min(max(request.args.get('wait', 0, type=float), 0), current_app.config['CHANGES_MAX_WAIT'])
+        
+        since = request.args.get('since', '')
+        _, _, cursor_at = decode_changes_cursor(since)
+        if cursor_expired(cursor_at, current_app.config['CHANGES_RETENTION_DAYS']):
+            return jsonify({
+                'error': 'Cursor expired',
+                'message': 'Changes after this cursor have been pruned; resync from /api/records/export'
+            }), 410
+        
+        stmt = changes_statement(since, per_page, fields)
+        deadline = time.monotonic() + wait
+        while True:
+            rows = db.session.execute(stmt).all()
+            if rows[0].seq is not None or time.monotonic() >= deadline:
+                break
+            # Release the connection while waiting
+            db.session.commit()
+            time.sleep(current_app.config['CHANGES_POLL_INTERVAL'])
+        
+        return jsonify(changes_page(rows, per_page, fields))
+        
+    except InvalidCursorError as e:
+        return invalid_cursor_response(e)
+    except Exception as e:
+        current_app.logger.error(f"Error getting record changes: {str(e)}")
+        return jsonify({
+            'error': 'Failed to retrieve record changes',
+            'message': str(e)
+        }), 500
+
+# POST /api/records/batch-get - Fetch many records by id in one query
+@api_bp.route('/records/batch-get', methods=['POST'])
+@require_auth
+@read_only
+@validate_json_input(required_fields=['ids'])
+def batch_get_records():
+    """Get the records for a list of ids, in request order, with the ids not found"""
+    try:
+        fields, error = check_fields(request.args.get('fields'))
+        if error:
+            return jsonify(error), 400
+        
+        ids, error = check_ids(request.get_json()['ids'], current_app.config['BATCH_GET_MAX_IDS'])
+        if error:
+            return jsonify(error[0]), error[1]
+        
+        rows = db.session.execute(multiget_statement(ids, fields)).all()
+        with phase('serialize'):
+            return jsonify(multiget_payload(rows, ids, fields))
+        
+    except Exception as e:
+        current_app.logger.error(f"Error getting records by ids: {str(e)}")
         return jsonify({
             'error': 'Failed to retrieve records',
             'message': str(e)
@@ -102,17 +410,39 @@ def get_records():
 # GET /api/records/<id> - Get specific record
 @api_bp.route('/records/<int:record_id>', methods=['GET'])
 @require_auth
+@read_only
 def get_record(record_id):
     """Get a specific record by ID"""
     try:
-        record = DataRecord.query.get(record_id)
+        wiki_id = request.args.get('wiki_id', type=int)
+        cache_key = record_tag(record_id) if wiki_id is None else listing_key(record_tag(record_id))
+        response = cached_response(cache_key)
+        if response:
+            return response
+        
+        # Answer conditional requests from updated_at alone when unchanged
+        if has_conditions():
+            updated_at = db.session.execute(
+                where_record(select(DataRecord.updated_at), record_id, wiki_id)
+            ).first()
+            if updated_at:
+                etag = make_etag('record', record_id, updated_at[0])
+                if is_not_modified(etag, updated_at[0]):
+                    return not_modified_response(etag, updated_at[0])
+        
+        record = db.session.execute(
+            where_record(select(DataRecord), record_id, wiki_id)
+        ).scalar_one_or_none()
         if not record:
             return jsonify({
                 'error': 'Record not found',
                 'message': f'No record found with ID {record_id}'
             }), 404
         
-        return jsonify({'record': record.to_dict()})
+        with phase('serialize'):
+            response = jsonify({'record': record.to_dict()})
+        set_validators(response, make_etag('record', record.id, record.updated_at), record.updated_at)
+        return cache_response(cache_key, response, [record_tag(record_id)])
         
     except Exception as e:
         current_app.logger.error(f"Error getting record {record_id}: {str(e)}")
@@ -131,30 +461,27 @@ def create_record():
         data = request.get_json()
         
         # Validate input
-        title = data.get('title', '').strip()
-        if not title:
-            return jsonify({
-                'error': 'Title cannot be empty'
-            }), 400
-        
-        if len(title) > 200:
-            return jsonify({
-                'error': 'Title too long',
-                'message': 'Title must be 200 characters or less'
-            }), 400
-        
-        # Create record
-        record = DataRecord(
-            wiki_id=data.get('wiki_id'),
-            unit_id=data.get('unit_id'),
-            title=title,
-            content=data.get('content', ''),
-            category=data.get('category'),
-            is_active=data.get('is_active', True)
-        )
-        
-        db.session.add(record)
-        db.session.commit()
+        title, error = check_title(data.get('title', ''))
+        if error:
+            return jsonify(error), 400
+        
+        # Create record, in a shared transaction when group commit is on
+        values = create_values(data, title)
+        committer = get_group_committer()
+        if committer.enabled:
+            # The session's connection is not needed while the batch runs
+            db.session.close()
+            write = committer.submit(PendingWrite('create', values))
+            if write.error:
+                raise write.error
+            # The batch bypasses RoutingSession; start the read-your-writes window here
+            g.db_wrote = True
+            record = write.record()
+        else:
+            record = DataRecord(**values)
+            db.session.add(record)
+            db.session.commit()
+        invalidate_records([(record.id, record.wiki_id, record.unit_id)])
         
         current_app.logger.info(f"Created record {record.id}: {record.title}")
         
@@ -178,6 +505,85 @@ def create_record():
             'message': str(e)
         }), 500
 
+# POST /api/records/import - Bulk insert or upsert
+@api_bp.route('/records/import', methods=['POST'])
+@require_auth
+def bulk_import_records():
+    """Insert or upsert many records from a JSON array or an NDJSON stream"""
+    try:
+        mode = request.args.get('mode', 'insert')
+        
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            items = iter_ndjson(request.stream)
+        elif request.is_json:
+            items = request.get_json(silent=True)
+            if isinstance(items, dict):
+                mode = items.get('mode', mode)
+                items = items.get('records')
+            if not isinstance(items, list):
+                return jsonify({
+                    'error': 'Request body must be a JSON array of records',
+                    'message': 'Send a JSON array, {"records": [...]}, or NDJSON'
+                }), 400
+        else:
+            return jsonify({
+                'error': 'Content-Type must be application/json or application/x-ndjson'
+            }), 400
+        
+        if mode not in IMPORT_MODES:
+            return jsonify({
+                'error': 'Invalid mode',
+                'message': 'Supported modes: insert, upsert'
+            }), 400
+        if mode == 'upsert':
+            error = check_upsert(db.session.connection())
+            if error:
+                return jsonify(error), 400
+        
+        importer = import_records(
+            items,
+            mode,
+            batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+            max_rows=current_app.config['IMPORT_MAX_ROWS']
+        )
+        db.session.commit()
+        invalidate_records(importer.affected)
+        
+        current_app.logger.info(
+            f"Imported records: {importer.inserted} inserted, {importer.updated} updated, "
+            f"{len(importer.errors)} failed"
+        )
+        
+        return jsonify({
+            'message': 'Import completed',
+            'inserted': importer.inserted,
+            'updated': importer.updated,
+            'failed': len(importer.errors),
+            'ids': importer.ids,
+            'errors': importer.errors
+        })
+        
+    except ImportRowError as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Import too large',
+            'message': str(e)
+        }), 413
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Database error importing records: {str(e)}")
+        return jsonify({
+            'error': 'Database error',
+            'message': 'Failed to import records due to database error'
+        }), 500
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error importing records: {str(e)}")
+        return jsonify({
+            'error': 'Failed to import records',
+            'message': str(e)
+        }), 500
+
 # PUT /api/records/<id> - Update record
 @api_bp.route('/records/<int:record_id>', methods=['PUT'])
 @require_auth
@@ -185,45 +591,34 @@ def create_record():
 def update_record(record_id):
     """Update an existing record"""
     try:
-        record = DataRecord.query.get(record_id)
+        committer = get_group_committer()
+        if committer.enabled:
+            return update_record_grouped(committer, record_id, request.get_json())
+        
+        # Validate the whole body before the record is loaded and changed
+        data = request.get_json()
+        title, error = check_title(data['title']) if 'title' in data else (None, None)
+        if error:
+            return jsonify(error), 400
+        
+        record = db.session.execute(
+            where_record(select(DataRecord), record_id, request.args.get('wiki_id', type=int))
+        ).scalar_one_or_none()
         if not record:
             return jsonify({
                 'error': 'Record not found',
                 'message': f'No record found with ID {record_id}'
             }), 404
         
-        data = request.get_json()
+        affected = [(record.id, record.wiki_id, record.unit_id)]
         
         # Update fields if provided
-        if 'wiki_id' in data:
-            record.wiki_id = data['wiki_id']
-            
-        if 'unit_id' in data:
-            record.unit_id = data['unit_id']
-            
-        if 'title' in data:
-            title = data['title'].strip()
-            if not title:
-                return jsonify({
-                    'error': 'Title cannot be empty'
-                }), 400
-            if len(title) > 200:
-                return jsonify({
-                    'error': 'Title too long',
-                    'message': 'Title must be 200 characters or less'
-                }), 400
-            record.title = title
-        
-        if 'content' in data:
-            record.content = data['content']
-        
-        if 'category' in data:
-            record.category = data['category']
-        
-        if 'is_active' in data:
-            record.is_active = data['is_active']
+        for field, value in update_values(data, title).items():
+            setattr(record, field, value)
         
         db.session.commit()
+        affected.append((record.id, record.wiki_id, record.unit_id))
+        invalidate_records(affected)
         
         current_app.logger.info(f"Updated record {record.id}: {record.title}")
         
@@ -247,24 +642,55 @@ def update_record(record_id):
             'message': str(e)
         }), 500
 
+def update_record_grouped(committer, record_id, data):
+    """update_record through group commit; database errors propagate to its handlers"""
+    title, error = check_title(data['title']) if 'title' in data else (None, None)
+    if error:
+        return jsonify(error), 400
+    
+    db.session.close()
+    write = committer.submit(PendingWrite(
+        'update', update_values(data, title), record_id, request.args.get('wiki_id', type=int)
+    ))
+    if write.error:
+        raise write.error
+    if not write.found:
+        return jsonify({
+            'error': 'Record not found',
+            'message': f'No record found with ID {record_id}'
+        }), 404
+    
+    g.db_wrote = True
+    record = write.record()
+    invalidate_records(write.affected())
+    current_app.logger.info(f"Updated record {record.id}: {record.title}")
+    return jsonify({
+        'message': 'Record updated successfully',
+        'record': record.to_dict()
+    })
+
 # DELETE /api/records/<id> - Delete record
 @api_bp.route('/records/<int:record_id>', methods=['DELETE'])
 @require_auth
 def delete_record(record_id):
     """Delete a record"""
     try:
-        record = DataRecord.query.get(record_id)
+        record = db.session.execute(
+            where_record(select(DataRecord), record_id, request.args.get('wiki_id', type=int))
+        ).scalar_one_or_none()
         if not record:
             return jsonify({
                 'error': 'Record not found',
                 'message': f'No record found with ID {record_id}'
             }), 404
         
-        # Store record info for logging
+        # Store record info for logging and cache invalidation
         record_title = record.title
+        affected = [(record.id, record.wiki_id, record.unit_id)]
         
         db.session.delete(record)
         db.session.commit()
+        invalidate_records(affected)
         
         current_app.logger.info(f"Deleted record {record_id}: {record_title}")
         
@@ -290,37 +716,18 @@ def delete_record(record_id):
 # GET /api/records/by-wiki/<wiki_id> - Get records by wiki_id
 @api_bp.route('/records/by-wiki/<int:wiki_id>', methods=['GET'])
 @require_auth
+@read_only
 def get_records_by_wiki(wiki_id):
     """Get all records for a specific wiki_id"""
     try:
-        # Get query parameters for pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
-        
         # Query records by wiki_id
-        query = DataRecord.query.filter(DataRecord.wiki_id == wiki_id)
-        query = query.order_by(DataRecord.created_at.desc())
-        
-        # Paginate
-        records = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        query = select(DataRecord).where(DataRecord.wiki_id == wiki_id)
         
-        return jsonify({
-            'wiki_id': wiki_id,
-            'records': [record.to_dict() for record in records.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': records.total,
-                'pages': records.pages,
-                'has_next': records.has_next,
-                'has_prev': records.has_prev
-            }
-        })
+        # Paginate (newest first)
+        return list_records(query, {'wiki_id': wiki_id}, cache_tag=wiki_tag(wiki_id))
         
+    except InvalidCursorError as e:
+        return invalid_cursor_response(e)
     except Exception as e:
         current_app.logger.error(f"Error getting records for wiki_id {wiki_id}: {str(e)}")
         return jsonify({
@@ -331,37 +738,18 @@ def get_records_by_wiki(wiki_id):
 # GET /api/records/by-unit/<unit_id> - Get records by unit_id
 @api_bp.route('/records/by-unit/<int:unit_id>', methods=['GET'])
 @require_auth
+@read_only
 def get_records_by_unit(unit_id):
     """Get all records for a specific unit_id"""
     try:
-        # Get query parameters for pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
-        
         # Query records by unit_id
-        query = DataRecord.query.filter(DataRecord.unit_id == unit_id)
-        query = query.order_by(DataRecord.created_at.desc())
-        
-        # Paginate
-        records = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        query = select(DataRecord).where(DataRecord.unit_id == unit_id)
         
-        return jsonify({
-            'unit_id': unit_id,
-            'records': [record.to_dict() for record in records.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': records.total,
-                'pages': records.pages,
-                'has_next': records.has_next,
-                'has_prev': records.has_prev
-            }
-        })
+        # Paginate (newest first)
+        return list_records(query, {'unit_id': unit_id}, cache_tag=unit_tag(unit_id))
         
+    except InvalidCursorError as e:
+        return invalid_cursor_response(e)
     except Exception as e:
         current_app.logger.error(f"Error getting records for unit_id {unit_id}: {str(e)}")
         return jsonify({
@@ -374,59 +762,45 @@ def get_records_by_unit(unit_id):
 @require_auth
 @validate_json_input(required_fields=['action'])
 def bulk_operations():
-    """Perform bulk operations on records"""
+    """Perform bulk operations on records; long id lists are queued as a job"""
     try:
         data = request.get_json()
         action = data.get('action')
-        record_ids = data.get('record_ids', [])
         
-        if not record_ids:
+        record_ids, error = check_record_ids(data.get('record_ids', []), current_app.config['BULK_MAX_IDS'])
+        if error:
+            return jsonify(error[0]), error[1]
+        
+        if action not in BULK_ACTIONS:
             return jsonify({
-                'error': 'No record IDs provided'
+                'error': 'Invalid action',
+                'message': 'Supported actions: delete, activate, deactivate'
             }), 400
         
-        if action == 'delete':
-            # Bulk delete
-            deleted_count = DataRecord.query.filter(DataRecord.id.in_(record_ids)).delete(synchronize_session=False)
+        if len(record_ids) > current_app.config['BULK_SYNC_MAX_IDS']:
+            job = db.session.execute(enqueue_statement(action, record_ids, request.token_id)).scalar_one()
             db.session.commit()
             
-            current_app.logger.info(f"Bulk deleted {deleted_count} records")
+            current_app.logger.info(f"Queued bulk job {job.id}: {action} {job.total} records")
             
-            return jsonify({
-                'message': f'Successfully deleted {deleted_count} records'
+            response = jsonify({
+                'message': f'Bulk {action} of {job.total} records queued',
+                'job': job.to_dict()
             })
+            response.status_code = 202
+            response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+            return response
         
-        elif action == 'activate':
-            # Bulk activate
-            updated_count = DataRecord.query.filter(DataRecord.id.in_(record_ids)).update(
-                {DataRecord.is_active: True}, synchronize_session=False
-            )
-            db.session.commit()
-            
-            current_app.logger.info(f"Bulk activated {updated_count} records")
-            
-            return jsonify({
-                'message': f'Successfully activated {updated_count} records'
-            })
+        _, verb = BULK_ACTIONS[action]
+        affected = db.session.execute(bulk_statement(action, record_ids)).all()
+        db.session.commit()
+        invalidate_records(affected)
         
-        elif action == 'deactivate':
-            # Bulk deactivate
-            updated_count = DataRecord.query.filter(DataRecord.id.in_(record_ids)).update(
-                {DataRecord.is_active: False}, synchronize_session=False
-            )
-            db.session.commit()
-            
-            current_app.logger.info(f"Bulk deactivated {updated_count} records")
-            
-            return jsonify({
-                'message': f'Successfully deactivated {updated_count} records'
-            })
+        current_app.logger.info(f"Bulk {verb} {len(affected)} records")
         
-        else:
-            return jsonify({
-                'error': 'Invalid action',
-                'message': 'Supported actions: delete, activate, deactivate'
-            }), 400
+        return jsonify({
+            'message': f'Successfully {verb} {len(affected)} records'
+        })
             
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -442,3 +816,41 @@ def bulk_operations():
             'error': 'Failed to perform bulk operation',
             'message': str(e)
         }), 500
+
+# GET /api/jobs/<id> - Progress of a queued bulk operation
+@api_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@require_auth
+def get_job(job_id):
+    """Get the status and progress of a bulk job"""
+    try:
+        job = BulkJob.query.get(job_id)
+        
+        # Jobs are visible only to the token that queued them
+        if not job or job.token_id != request.token_id:
+            return jsonify({
+                'error': 'Job not found',
+                'message': f'No job found with ID {job_id}'
+            }), 404
+        
+        return jsonify(job.to_dict())
+        
+    except Exception as e:
+        current_app.logger.error(f"Error getting job {job_id}: {str(e)}")
+        return jsonify({
+            'error': 'Failed to retrieve job',
+            'message': str(e)
+        }), 500
+
+# GET /api/cache/stats - Response cache counters
+@api_bp.route('/cache/stats', methods=['GET'])
+@require_auth
+def cache_stats():
+    """Report response cache hit/miss counters for this worker"""
+    return jsonify(get_response_cache().stats())
+
+# GET /api/pool/stats - Connection pool occupancy and checkout waits
+@api_bp.route('/pool/stats', methods=['GET'])
+@require_auth
+def pool_stats():
+    """Report connection pool saturation and checkout wait times for this worker"""
+    return jsonify(get_pool_stats())
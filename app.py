@@ -5,6 +5,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from json_provider import FastJSONProvider
+from db_pool import engine_options
+from replicas import REPLICA_STRATEGIES, RoutingSession, replica_bind_keys
+from profiling import PROFILE_MODES
+from ratelimit import RATE_LIMIT_BACKENDS
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -12,58 +17,179 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
-
-# Create the app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
-
-# Configure CORS
-CORS(app, origins="*", allow_headers=["Content-Type", "Authorization"])
-
-# Configure the database
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "postgresql://localhost/flask_api")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
-
-# JWT Configuration
-app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "jwt-secret-change-in-production")
-app.config["JWT_ACCESS_TOKEN_EXPIRES"] = False  # Tokens don't expire for simplicity
-
-# Initialize the app with the extension
-db.init_app(app)
-
-with app.app_context():
-    # Import models to ensure tables are created
-    import models  # noqa: F401
-    
-    # Import and register API routes
-    from api_routes import api_bp
-    app.register_blueprint(api_bp)
-    
-    # Create all tables
-    db.create_all()
-    
-    # Create default admin token if not exists
-    from models import ApiToken
-    from auth import generate_token
-    
-    admin_token = ApiToken.query.filter_by(name="admin").first()
-    if not admin_token:
-        token_value = generate_token({"user": "admin", "role": "admin"})
-        admin_token = ApiToken(name="admin", token=token_value, is_active=True)
-        db.session.add(admin_token)
-        db.session.commit()
-        app.logger.info(f"Created admin token: {token_value}")
-
-@app.route('/')
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
+
+
+def create_app():
+    """Build the Flask app; no database work, migrations and the admin token are left to bootstrap.py"""
+    # Create the app
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+    # Configure CORS
+    CORS(app, origins="*", allow_headers=["Content-Type", "Authorization"])
+
+    # Configure the database
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "postgresql://localhost/flask_api")
+
+    # Connection pool, per worker: at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+    app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 5))
+    app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    app.config["DB_POOL_TIMEOUT"] = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+    app.config["DB_POOL_RECYCLE"] = int(os.environ.get("DB_POOL_RECYCLE", 300))
+    app.config["DB_POOL_LIFO"] = os.environ.get("DB_POOL_LIFO", "true").lower() == "true"
+    app.config["DB_POOL_PRE_PING"] = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+    app.config["DB_STATEMENT_TIMEOUT"] = int(os.environ.get("DB_STATEMENT_TIMEOUT", 30000))  # ms, 0 disables
+    # Transaction-pooling PgBouncer in front of Postgres: no pre-ping, no prepared statements
+    app.config["DB_PGBOUNCER"] = os.environ.get("DB_PGBOUNCER", "false").lower() == "true"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
+    # Read replicas: comma-separated URLs; read-only endpoints are routed to them
+    app.config["DATABASE_REPLICA_URLS"] = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    app.config["DATABASE_REPLICA_STRATEGY"] = os.environ.get("DATABASE_REPLICA_STRATEGY", "round_robin")
+    if app.config["DATABASE_REPLICA_STRATEGY"] not in REPLICA_STRATEGIES:
+        raise ValueError(f"DATABASE_REPLICA_STRATEGY must be one of: {', '.join(REPLICA_STRATEGIES)}")
+    # Seconds a token keeps reading from the primary after it writes (read-your-writes)
+    app.config["DATABASE_REPLICA_STICKY_SECONDS"] = float(os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", 5))
+    app.config["SQLALCHEMY_BINDS"] = dict(zip(
+        replica_bind_keys(app.config["DATABASE_REPLICA_URLS"]), app.config["DATABASE_REPLICA_URLS"]
+    ))
+
+    # JWT Configuration
+    app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "jwt-secret-change-in-production")
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = False  # Tokens don't expire for simplicity
+
+    # Token verification cache (TTL also bounds how long a revoked token stays usable)
+    app.config["AUTH_CACHE_TTL"] = int(os.environ.get("AUTH_CACHE_TTL", 30))
+    app.config["AUTH_CACHE_MAX_SIZE"] = int(os.environ.get("AUTH_CACHE_MAX_SIZE", 1024))
+    app.config["LAST_USED_FLUSH_INTERVAL"] = float(os.environ.get("LAST_USED_FLUSH_INTERVAL", 10))
+
+    # Per-token rate limit: requests per second with bursts up to RATE_LIMIT_BURST (0 disables).
+    # "postgres" shares each token's bucket across workers and hosts, leasing
+    # RATE_LIMIT_LEASE requests per round trip; "memory" limits every process separately
+    app.config["RATE_LIMIT_BACKEND"] = os.environ.get("RATE_LIMIT_BACKEND", "postgres")
+    if app.config["RATE_LIMIT_BACKEND"] not in RATE_LIMIT_BACKENDS:
+        raise ValueError(f"RATE_LIMIT_BACKEND must be one of: {', '.join(RATE_LIMIT_BACKENDS)}")
+    app.config["RATE_LIMIT_PER_SECOND"] = float(os.environ.get("RATE_LIMIT_PER_SECOND", 50))
+    app.config["RATE_LIMIT_BURST"] = float(os.environ.get("RATE_LIMIT_BURST", 100))
+    app.config["RATE_LIMIT_LEASE"] = int(os.environ.get("RATE_LIMIT_LEASE", 5))
+    # Requests of one token in flight at once in a worker (0 disables)
+    app.config["RATE_LIMIT_CONCURRENCY"] = int(os.environ.get("RATE_LIMIT_CONCURRENCY", 4))
+    # Answer 503 while the average pool checkout wait of the last LOAD_SHED_WINDOW seconds exceeds this (0 disables)
+    app.config["LOAD_SHED_POOL_WAIT_MS"] = float(os.environ.get("LOAD_SHED_POOL_WAIT_MS", 1000))
+    app.config["LOAD_SHED_WINDOW"] = float(os.environ.get("LOAD_SHED_WINDOW", 5))
+    # Checkouts the window needs before its average can shed load
+    app.config["LOAD_SHED_MIN_SAMPLES"] = int(os.environ.get("LOAD_SHED_MIN_SAMPLES", 20))
+
+    # Group commit: single-record creates and updates arriving within this many
+    # milliseconds share one transaction and commit (0 commits each request alone)
+    app.config["GROUP_COMMIT_WINDOW_MS"] = float(os.environ.get("GROUP_COMMIT_WINDOW_MS", 0))
+    app.config["GROUP_COMMIT_MAX_BATCH"] = int(os.environ.get("GROUP_COMMIT_MAX_BATCH", 64))
+
+    # Rows fetched per round trip by the streaming export
+    app.config["EXPORT_BATCH_SIZE"] = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+    # Bulk import: rows per multi-row INSERT and rows accepted per request
+    app.config["IMPORT_BATCH_SIZE"] = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+    app.config["IMPORT_MAX_ROWS"] = int(os.environ.get("IMPORT_MAX_ROWS", 100000))
+
+    # Batch multi-get: ids accepted per POST /api/records/batch-get
+    app.config["BATCH_GET_MAX_IDS"] = int(os.environ.get("BATCH_GET_MAX_IDS", 1000))
+
+    # Bulk operations: longer id lists are queued as jobs for jobs.py workers
+    app.config["BULK_SYNC_MAX_IDS"] = int(os.environ.get("BULK_SYNC_MAX_IDS", 1000))
+    app.config["BULK_MAX_IDS"] = int(os.environ.get("BULK_MAX_IDS", 1000000))
+    app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 2))
+    app.config["JOB_CHUNK_SIZE"] = int(os.environ.get("JOB_CHUNK_SIZE", 1000))
+    app.config["JOB_POLL_INTERVAL"] = float(os.environ.get("JOB_POLL_INTERVAL", 1))
+    # Seconds without a heartbeat after which another worker takes a running job over
+    app.config["JOB_LEASE_SECONDS"] = int(os.environ.get("JOB_LEASE_SECONDS", 60))
+    app.config["JOB_MAX_ATTEMPTS"] = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+    # Change feed: days of change log kept, and the long-poll limits of wait=
+    app.config["CHANGES_RETENTION_DAYS"] = int(os.environ.get("CHANGES_RETENTION_DAYS", 7))
+    app.config["CHANGES_MAX_WAIT"] = float(os.environ.get("CHANGES_MAX_WAIT", 30))
+    app.config["CHANGES_POLL_INTERVAL"] = float(os.environ.get("CHANGES_POLL_INTERVAL", 0.5))
+
+    # Range-partitioned data_records (partitions.py): monthly partitions worker.py keeps
+    # created ahead, and months of records kept before whole partitions are dropped (0 keeps all)
+    app.config["PARTITION_AHEAD_MONTHS"] = int(os.environ.get("PARTITION_AHEAD_MONTHS", 3))
+    app.config["RECORDS_RETENTION_MONTHS"] = int(os.environ.get("RECORDS_RETENTION_MONTHS", 0))
+
+    # Full-text search: matches ranked per query when sorting by relevance
+    app.config["SEARCH_MAX_MATCHES"] = int(os.environ.get("SEARCH_MAX_MATCHES", 10000))
+
+    # Response cache: "redis" (shared), "memory" (per process) or "none".
+    # Invalidation only reaches the process that handled the write, so "memory"
+    # is for single-worker deployments only
+    app.config["CACHE_BACKEND"] = os.environ.get("CACHE_BACKEND", "none")
+    app.config["CACHE_REDIS_URL"] = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    app.config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 5))
+    app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+
+    # Response compression, in server preference order; br and zstd need the "compression" extra
+    app.config["COMPRESS_ALGORITHMS"] = [name.strip() for name in os.environ.get("COMPRESS_ALGORITHMS", "zstd,br,gzip").split(",") if name.strip()]
+    # Bodies smaller than this many bytes are sent uncompressed (streamed bodies are always compressed)
+    app.config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+
+    # Profiling: a share of requests, or admin requests with an X-Profile header
+    app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+    app.config["PROFILE_ADMIN_HEADER"] = os.environ.get("PROFILE_ADMIN_HEADER", "false").lower() == "true"
+    app.config["PROFILE_MODE"] = os.environ.get("PROFILE_MODE", "timings")
+    if app.config["PROFILE_MODE"] not in PROFILE_MODES:
+        raise ValueError(f"PROFILE_MODE must be one of: {', '.join(PROFILE_MODES)}")
+    app.config["PROFILE_SAMPLE_INTERVAL"] = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))
+    app.config["PROFILE_DIR"] = os.environ.get("PROFILE_DIR", "/tmp/profiles")
+    # Log statements slower than this many milliseconds with their EXPLAIN plan (0 disables)
+    app.config["SLOW_QUERY_MS"] = float(os.environ.get("SLOW_QUERY_MS", 0))
+    app.config["SLOW_QUERY_EXPLAIN"] = os.environ.get("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+
+    # Initialize the app with the extension
+    db.init_app(app)
+
+    with app.app_context():
+        # Imported here: models imports db from this module
+        import models  # noqa: F401
+
+        # Registered first so its after_request hook runs last, on the final body
+        import compression
+        compression.init_app(app)
+
+        import db_pool
+        db_pool.init_app(app)
+
+        import replicas
+        replicas.init_app(app)
+
+        import token_cache
+        token_cache.init_app(app)
+
+        import ratelimit
+        ratelimit.init_app(app)
+
+        import cache
+        cache.init_app(app)
+
+        import group_commit
+        group_commit.init_app(app)
+
+        import metrics
+        metrics.init_app(app)
+
+        import profiling
+        profiling.init_app(app)
+
+        # Import and register API routes
+        from api_routes import api_bp
+        app.register_blueprint(api_bp)
+
+    app.add_url_rule('/', 'index', index)
+    return app
+
+
 def index():
     """Serve the API documentation page"""
     from flask import render_template
     return render_template('index.html')
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,94 @@
+"""ASGI entry point: the /api/* endpoints on SQLAlchemy asyncio with asyncpg.
+
+Run with ``uvicorn asgi:app``. Configuration and models come from app.py, so
+both entry points share one set of settings; run bootstrap.py first.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from app import create_app
+from async_routes import json_response, routes
+from cache import create_response_cache
+from compression import CompressionMiddleware, available_codecs
+from db_pool import async_database_url, configure_engine, engine_options
+from group_commit import AsyncGroupCommitter
+from ratelimit import create_load_shedder, create_rate_limiter
+from token_cache import AsyncLastUsedBatcher, TokenCache
+
+logger = logging.getLogger('asgi')
+
+flask_app = create_app()
+
+
+def create_engine(config):
+    engine = create_async_engine(
+        async_database_url(config['SQLALCHEMY_DATABASE_URI'], config),
+        **engine_options(config, is_async=True)
+    )
+    configure_engine(engine.sync_engine, config)
+    return engine
+
+
+@asynccontextmanager
+async def lifespan(starlette_app):
+    config = flask_app.config
+    state = starlette_app.state
+    state.config = config
+    state.engine = create_engine(config)
+    state.session_factory = async_sessionmaker(state.engine, expire_on_commit=False)
+    state.token_cache = TokenCache(ttl=config['AUTH_CACHE_TTL'], max_size=config['AUTH_CACHE_MAX_SIZE'])
+    state.last_used_batcher = AsyncLastUsedBatcher(
+        state.engine, interval=config['LAST_USED_FLUSH_INTERVAL'], logger=logger
+    )
+    state.response_cache = create_response_cache(config, logger)
+    state.rate_limiter = create_rate_limiter(config)
+    state.load_shedder = create_load_shedder(config, [state.engine.sync_engine])
+    state.group_committer = AsyncGroupCommitter(
+        state.engine, window_ms=config['GROUP_COMMIT_WINDOW_MS'], max_batch=config['GROUP_COMMIT_MAX_BATCH'],
+        logger=logger
+    )
+
+    flusher = asyncio.create_task(state.last_used_batcher.run())
+    try:
+        yield
+    finally:
+        flusher.cancel()
+        await state.last_used_batcher.flush()
+        await state.engine.dispose()
+
+
+async def not_found(request, exc):
+    return json_response({
+        'error': 'Not found',
+        'message': 'The requested resource was not found'
+    }, 404)
+
+
+async def http_error(request, exc):
+    return json_response({'error': exc.detail}, exc.status_code, headers=exc.headers)
+
+
+async def internal_error(request, exc):
+    logger.error(f"Unhandled error on {request.url.path}: {str(exc)}")
+    return json_response({
+        'error': 'Internal server error',
+        'message': 'An unexpected error occurred'
+    }, 500)
+
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_headers=['Content-Type', 'Authorization'],
+                   allow_methods=['*']),
+        Middleware(CompressionMiddleware, codecs=available_codecs(flask_app.config['COMPRESS_ALGORITHMS']),
+                   minimum_size=flask_app.config['COMPRESS_MIN_SIZE'])
+    ],
+    exception_handlers={404: not_found, HTTPException: http_error, 500: internal_error},
+    lifespan=lifespan,
+)
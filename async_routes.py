@@ -0,0 +1,722 @@
+"""Async handlers serving the /api/* contract of api_routes.py for the ASGI app.
+
+Query building, validation, pagination, validators and caching are shared
+with the sync blueprint; only request parsing and database I/O differ.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MultiDict
+from api_routes import filter_records, where_record
+from auth import decode_token
+from bulk_import import IMPORT_MODES, AsyncRecordImporter, ImportRowError, check_upsert, iter_ndjson
+from cache import RedisBackend, listing_key, pack_entry, record_tag, record_tags, unit_tag, unpack_entry, wiki_tag
+from db_pool import pool_stats
+from conditional import headers_have_conditions, headers_not_modified, make_etag, validator_headers
+from export import EXPORT_FORMATS, encode_header, encode_rows
+from json_provider import dumps_bytes
+from changes import changes_page, changes_statement, cursor_expired, decode_changes_cursor
+from group_commit import PendingWrite, create_values, update_values
+from multiget import check_ids, multiget_payload, multiget_statement
+from jobs import BULK_ACTIONS, bulk_statement, check_record_ids, enqueue_statement
+from models import ApiToken, BulkJob, DataRecord, record_stats
+from search import SEARCH_SORTS, check_search_query, search_page, search_statement
+from stats import check_group_by, stats_payload, stats_statement
+from ratelimit import (
+    lease_statement, overloaded_error, rate_limited_error, retry_after_header, too_many_in_flight_error
+)
+from pagination import (
+    InvalidCursorError, count_statement, keyset_pagination, keyset_statement,
+    metadata_statement, offset_pagination, offset_statement
+)
+from token_cache import token_digest
+from validation import check_fields, check_title
+
+logger = logging.getLogger('asgi')
+
+
+def json_response(payload, status_code=200, headers=None):
+    return Response(dumps_bytes(payload), status_code=status_code, headers=headers, media_type='application/json')
+
+
+def not_modified_response(etag, last_modified):
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def query_args(request):
+    """Query parameters as a werkzeug MultiDict, so parsing matches the Flask handlers"""
+    return MultiDict(request.query_params.multi_items())
+
+
+async def cache_call(state, method, *args):
+    """Call the response cache, moving blocking network backends off the event loop"""
+    cache = state.response_cache
+    if isinstance(cache.backend, RedisBackend):
+        return await run_in_threadpool(getattr(cache, method), *args)
+    return getattr(cache, method)(*args)
+
+
+async def cached_response(request, key):
+    cached = await cache_call(request.app.state, 'get', key)
+    if cached is None:
+        return None
+    etag, last_modified, body = unpack_entry(cached)
+    if headers_not_modified(etag, last_modified, request.headers):
+        return not_modified_response(etag, last_modified)
+    return Response(body, headers=validator_headers(etag, last_modified), media_type='application/json')
+
+
+async def invalidate_records(request, rows):
+    tags = []
+    for record_id, wiki_id, unit_id in rows:
+        tags.extend(record_tags(record_id, wiki_id, unit_id))
+    await cache_call(request.app.state, 'invalidate', tags)
+
+
+async def authenticate(request, session):
+    """Async require_auth: returns an error response, or None once the token is accepted"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return json_response({
+            'error': 'Authorization header is required',
+            'message': 'Please provide a Bearer token in the Authorization header'
+        }, 401)
+    if not auth_header.startswith('Bearer '):
+        return json_response({
+            'error': 'Invalid authorization header format',
+            'message': 'Authorization header must start with "Bearer "'
+        }, 401)
+
+    state = request.app.state
+    if state.load_shedder.overloaded():
+        return json_response(overloaded_error(), 503, headers={'Retry-After': '1'})
+
+    token = auth_header.split(' ')[1]
+    digest = token_digest(token)
+    cached = state.token_cache.get(digest)
+    if cached:
+        token_id, payload = cached
+    else:
+        token_id = await session.scalar(
+            select(ApiToken.id).where(ApiToken.token == token, ApiToken.is_active.is_(True)).limit(1)
+        )
+        if token_id is None:
+            return json_response({
+                'error': 'Invalid or inactive token',
+                'message': 'The provided token is not valid or has been deactivated'
+            }, 401)
+        payload = decode_token(token, state.config['JWT_SECRET_KEY'])
+        if not payload:
+            return json_response({
+                'error': 'Invalid token',
+                'message': 'The provided token is invalid or expired'
+            }, 401)
+        state.token_cache.put(digest, token_id, payload)
+
+    limiter = state.rate_limiter
+    if limiter.enabled:
+        allowed, retry_after = limiter.check(token_id)
+        if allowed is None:
+            # The lease takes a second connection; end the token lookup's
+            # transaction first, or requests could fill the pool and wait on each other
+            await session.rollback()
+            async with state.engine.begin() as conn:
+                lease = (await conn.execute(
+                    lease_statement(token_id, limiter.rate, limiter.burst, limiter.lease)
+                )).one()
+            allowed, retry_after = limiter.add_lease(token_id, *lease)
+        if not allowed:
+            return json_response(rate_limited_error(), 429, headers={'Retry-After': retry_after_header(retry_after)})
+
+    state.last_used_batcher.touch(token_id)
+    request.state.current_user = dict(payload)
+    request.state.token_id = token_id
+    return None
+
+
+async def read_json(request, required_fields=None):
+    """Async validate_json_input: returns (data, None) or (None, error response)"""
+    if request.headers.get('content-type', '').split(';')[0].strip() != 'application/json':
+        return None, json_response({'error': 'Content-Type must be application/json'}, 400)
+    try:
+        data = json.loads(await request.body() or b'null')
+    except ValueError:
+        data = None
+    if not data:
+        return None, json_response({'error': 'Request body must contain valid JSON'}, 400)
+    missing_fields = [field for field in required_fields or () if field not in data]
+    if missing_fields:
+        return None, json_response({
+            'error': 'Missing required fields',
+            'missing_fields': missing_fields
+        }, 400)
+    return data, None
+
+
+def endpoint(error, db_error=None, auth=True):
+    """Wrap a handler with a session, authentication and the blueprint's error responses"""
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapped(request):
+            async with request.app.state.session_factory() as session:
+                try:
+                    if not auth:
+                        return await handler(request, session, **request.path_params)
+                    response = await authenticate(request, session)
+                    if response:
+                        return response
+                    limiter = request.app.state.rate_limiter
+                    if not limiter.enter(request.state.token_id):
+                        return json_response(too_many_in_flight_error(), 429, headers={'Retry-After': '1'})
+                    try:
+                        return await handler(request, session, **request.path_params)
+                    finally:
+                        limiter.exit(request.state.token_id)
+                except InvalidCursorError as e:
+                    return json_response({'error': 'Invalid cursor', 'message': str(e)}, 400)
+                except SQLAlchemyError as e:
+                    await session.rollback()
+                    logger.error(f"Database error in {handler.__name__}: {str(e)}")
+                    if db_error:
+                        return json_response({'error': 'Database error', 'message': db_error}, 500)
+                    return json_response({'error': error, 'message': str(e)}, 500)
+                except Exception as e:
+                    await session.rollback()
+                    logger.error(f"Error in {handler.__name__}: {str(e)}")
+                    return json_response({'error': error, 'message': str(e)}, 500)
+        return wrapped
+    return decorator
+
+
+async def list_records(request, session, stmt, body=None, cache_tag=None):
+    """Async counterpart of api_routes.list_records"""
+    args = query_args(request)
+    cache_key = listing_key(cache_tag, args) if cache_tag else None
+    if cache_key:
+        response = await cached_response(request, cache_key)
+        if response:
+            return response
+
+    fields, error = check_fields(args.get('fields'))
+    if error:
+        return json_response(error, 400)
+    selected = tuple(dict.fromkeys(fields + ('id', 'created_at', 'updated_at')))
+    stmt = stmt.with_only_columns(*DataRecord.columns(selected))
+
+    per_page = min(args.get('per_page', 10, type=int), 100)
+    if per_page < 1:
+        per_page = 10
+    params = urlencode(sorted(args.items(multi=True)))
+
+    # No Last-Modified for listings, see api_routes.list_records
+    if 'cursor' in args:
+        include_total = args.get('include_total', '').lower() in ('1', 'true', 'yes')
+        total = await session.scalar(count_statement(stmt)) if include_total else None
+        rows = (await session.execute(keyset_statement(stmt, args['cursor'], per_page))).all()
+        records, pagination = keyset_pagination(rows, per_page, total)
+        etag = make_etag(params, pagination.get('total'), [(record.id, record.updated_at) for record in records])
+        if headers_not_modified(etag, None, request.headers):
+            return not_modified_response(etag, None)
+    else:
+        page = max(args.get('page', 1, type=int), 1)
+        total, latest_update = (await session.execute(metadata_statement(stmt))).one()
+        etag = make_etag(params, total, latest_update)
+        if headers_not_modified(etag, None, request.headers):
+            return not_modified_response(etag, None)
+        records = (await session.execute(offset_statement(stmt, page, per_page))).all()
+        pagination = offset_pagination(page, per_page, total)
+
+    payload = dict(body or {})
+    if selected == fields:
+        payload['records'] = [record._asdict() for record in records]
+    else:
+        payload['records'] = [{field: record._mapping[field] for field in fields} for record in records]
+    payload['pagination'] = pagination
+    body_bytes = dumps_bytes(payload)
+
+    if cache_key:
+        await cache_call(request.app.state, 'set', cache_key, pack_entry(etag, None, body_bytes), [cache_tag])
+    return Response(body_bytes, headers=validator_headers(etag, None), media_type='application/json')
+
+
+@endpoint(error='Health check failed', auth=False)
+async def health_check(request, session):
+    try:
+        await session.execute(text('SELECT 1'))
+        return json_response({'status': 'healthy', 'database': 'connected'})
+    except Exception as e:
+        logger.error(f"Health check failed: {str(e)}")
+        return json_response({
+            'status': 'unhealthy',
+            'database': 'disconnected',
+            'error': str(e)
+        }, 503)
+
+
+@endpoint(error='Failed to retrieve records')
+async def get_records(request, session):
+    stmt = filter_records(select(DataRecord), query_args(request))
+    return await list_records(request, session, stmt)
+
+
+@endpoint(error='Failed to export records')
+async def export_records(request, session):
+    export_format = request.query_params.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return json_response({
+            'error': 'Invalid format',
+            'message': 'Supported formats: ndjson, csv'
+        }, 400)
+
+    stmt = filter_records(select(*DataRecord.columns()), query_args(request)).order_by(DataRecord.id)
+    state = request.app.state
+    batch_size = state.config['EXPORT_BATCH_SIZE']
+
+    async def generate():
+        # The request session closes when the handler returns, so stream on a new one
+        async with state.session_factory() as stream_session:
+            result = await stream_session.stream(stmt.execution_options(yield_per=batch_size))
+            try:
+                keys = list(result.keys())
+                header = encode_header(keys, export_format)
+                if header:
+                    yield header
+                async for rows in result.partitions():
+                    yield encode_rows(keys, rows, export_format)
+            except Exception as e:
+                # Headers are already sent, so the stream can only be cut short
+                logger.error(f"Error streaming export: {str(e)}")
+                raise
+            finally:
+                await result.close()
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        generate(),
+        media_type=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=records.{extension}'}
+    )
+
+
+@endpoint(error='Failed to search records')
+async def search_records(request, session):
+    args = query_args(request)
+    query, error = check_search_query(args.get('q'))
+    if error:
+        return json_response(error, 400)
+    fields, error = check_fields(args.get('fields'))
+    if error:
+        return json_response(error, 400)
+    sort = args.get('sort', 'relevance').lower()
+    if sort not in SEARCH_SORTS:
+        return json_response({
+            'error': 'Invalid sort',
+            'message': f"Supported sorts: {', '.join(SEARCH_SORTS)}"
+        }, 400)
+
+    per_page = min(args.get('per_page', 10, type=int), 100)
+    if per_page < 1:
+        per_page = 10
+    max_matches = request.app.state.config['SEARCH_MAX_MATCHES']
+
+    stmt = search_statement(
+        filter_records(select(DataRecord), args), query, sort, args.get('cursor'), per_page, max_matches, fields
+    )
+    rows = (await session.execute(stmt)).all()
+    records, pagination = search_page(rows, sort, per_page, max_matches, fields)
+    return json_response({'query': query, 'records': records, 'pagination': pagination})
+
+
+@endpoint(error='Failed to retrieve record stats')
+async def get_record_stats(request, session):
+    args = query_args(request)
+    group_by, error = check_group_by(args.get('group_by'))
+    if error:
+        return json_response(error, 400)
+    if 'unit_id' in args:
+        return json_response({
+            'error': 'Unsupported filter',
+            'message': 'Stats can be filtered by category, is_active and wiki_id'
+        }, 400)
+
+    stmt = stats_statement(filter_records(select(record_stats), args, columns=record_stats.c), group_by)
+    rows = (await session.execute(stmt)).all()
+    return json_response(stats_payload(rows, group_by))
+
+
+@endpoint(error='Failed to retrieve record changes')
+async def get_record_changes(request, session):
+    args = query_args(request)
+    config = request.app.state.config
+    fields, error = check_fields(args.get('fields'))
+    if error:
+        return json_response(error, 400)
+
+    per_page = min(args.get('per_page', 100, type=int), 1000)
+    if per_page < 1:
+        per_page = 100
+    wait = min(max(args.get('wait', 0, type=float), 0), config['CHANGES_MAX_WAIT'])
+
+    since = args.get('since', '')
+    _, _, cursor_at = decode_changes_cursor(since)
+    if cursor_expired(cursor_at, config['CHANGES_RETENTION_DAYS']):
+        return json_response({
+            'error': 'Cursor expired',
+            'message': 'Changes after this cursor have been pruned; resync from /api/records/export'
+        }, 410)
+
+    stmt = changes_statement(since, per_page, fields)
+    deadline = time.monotonic() + wait
+    while True:
+        rows = (await session.execute(stmt)).all()
+        if rows[0].seq is not None or time.monotonic() >= deadline:
+            break
+        await session.commit()
+        await asyncio.sleep(config['CHANGES_POLL_INTERVAL'])
+    return json_response(changes_page(rows, per_page, fields))
+
+
+@endpoint(error='Failed to retrieve records')
+async def batch_get_records(request, session):
+    fields, error = check_fields(request.query_params.get('fields'))
+    if error:
+        return json_response(error, 400)
+    data, response = await read_json(request, required_fields=['ids'])
+    if response:
+        return response
+    ids, error = check_ids(data['ids'], request.app.state.config['BATCH_GET_MAX_IDS'])
+    if error:
+        return json_response(*error)
+
+    rows = (await session.execute(multiget_statement(ids, fields))).all()
+    return json_response(multiget_payload(rows, ids, fields))
+
+
+@endpoint(error='Failed to retrieve record')
+async def get_record(request, session, record_id):
+    wiki_id = query_args(request).get('wiki_id', type=int)
+    cache_key = record_tag(record_id) if wiki_id is None else listing_key(record_tag(record_id), query_args(request))
+    response = await cached_response(request, cache_key)
+    if response:
+        return response
+
+    if headers_have_conditions(request.headers):
+        updated_at = (await session.execute(
+            where_record(select(DataRecord.updated_at), record_id, wiki_id)
+        )).first()
+        if updated_at:
+            etag = make_etag('record', record_id, updated_at[0])
+            if headers_not_modified(etag, updated_at[0], request.headers):
+                return not_modified_response(etag, updated_at[0])
+
+    record = (await session.execute(where_record(select(DataRecord), record_id, wiki_id))).scalar_one_or_none()
+    if not record:
+        return json_response({
+            'error': 'Record not found',
+            'message': f'No record found with ID {record_id}'
+        }, 404)
+
+    etag = make_etag('record', record.id, record.updated_at)
+    body = dumps_bytes({'record': record.to_dict()})
+    await cache_call(request.app.state, 'set', cache_key, pack_entry(etag, record.updated_at, body),
+                     [record_tag(record_id)])
+    return Response(body, headers=validator_headers(etag, record.updated_at), media_type='application/json')
+
+
+@endpoint(error='Failed to create record', db_error='Failed to create record due to database error')
+async def create_record(request, session):
+    data, response = await read_json(request, required_fields=['title'])
+    if response:
+        return response
+
+    title, error = check_title(data.get('title', ''))
+    if error:
+        return json_response(error, 400)
+
+    values = create_values(data, title)
+    committer = request.app.state.group_committer
+    if committer.enabled:
+        await session.close()
+        write = await committer.submit(PendingWrite('create', values))
+        if write.error:
+            raise write.error
+        record = write.record()
+    else:
+        record = DataRecord(**values)
+        session.add(record)
+        await session.commit()
+    await invalidate_records(request, [(record.id, record.wiki_id, record.unit_id)])
+
+    logger.info(f"Created record {record.id}: {record.title}")
+    return json_response({
+        'message': 'Record created successfully',
+        'record': record.to_dict()
+    }, 201)
+
+
+async def iter_ndjson_body(request):
+    """Split a streamed request body into lines and decode them like iter_ndjson"""
+    buffer = b''
+    line_number = 1
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b'\n')
+        for item in iter_ndjson(lines, start=line_number):
+            yield item
+        line_number += len(lines)
+    for item in iter_ndjson([buffer], start=line_number):
+        yield item
+
+
+@endpoint(error='Failed to import records', db_error='Failed to import records due to database error')
+async def bulk_import_records(request, session):
+    state = request.app.state
+    mode = request.query_params.get('mode', 'insert')
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+
+    if content_type in ('application/x-ndjson', 'application/jsonl'):
+        items = iter_ndjson_body(request)
+    elif content_type == 'application/json':
+        try:
+            items = json.loads(await request.body() or b'null')
+        except ValueError:
+            items = None
+        if isinstance(items, dict):
+            mode = items.get('mode', mode)
+            items = items.get('records')
+        if not isinstance(items, list):
+            return json_response({
+                'error': 'Request body must be a JSON array of records',
+                'message': 'Send a JSON array, {"records": [...]}, or NDJSON'
+            }, 400)
+    else:
+        return json_response({
+            'error': 'Content-Type must be application/json or application/x-ndjson'
+        }, 400)
+
+    if mode not in IMPORT_MODES:
+        return json_response({
+            'error': 'Invalid mode',
+            'message': 'Supported modes: insert, upsert'
+        }, 400)
+    if mode == 'upsert':
+        error = await (await session.connection()).run_sync(check_upsert)
+        if error:
+            return json_response(error, 400)
+
+    importer = AsyncRecordImporter(session, mode, state.config['IMPORT_BATCH_SIZE'])
+    now = datetime.utcnow()
+    index = 0
+    try:
+        if isinstance(items, list):
+            for index, item in enumerate(items):
+                importer.check_size(index, state.config['IMPORT_MAX_ROWS'])
+                if importer.add(index, item, now):
+                    await importer.flush()
+        else:
+            async for item in items:
+                importer.check_size(index, state.config['IMPORT_MAX_ROWS'])
+                if importer.add(index, item, now):
+                    await importer.flush()
+                index += 1
+        await importer.finish()
+    except ImportRowError as e:
+        await session.rollback()
+        return json_response({'error': 'Import too large', 'message': str(e)}, 413)
+    await session.commit()
+    await invalidate_records(request, importer.affected)
+
+    logger.info(
+        f"Imported records: {importer.inserted} inserted, {importer.updated} updated, "
+        f"{len(importer.errors)} failed"
+    )
+    return json_response({
+        'message': 'Import completed',
+        'inserted': importer.inserted,
+        'updated': importer.updated,
+        'failed': len(importer.errors),
+        'ids': importer.ids,
+        'errors': importer.errors
+    })
+
+
+@endpoint(error='Failed to update record', db_error='Failed to update record due to database error')
+async def update_record(request, session, record_id):
+    # The body is validated before the lookup, as validate_json_input does
+    data, response = await read_json(request)
+    if response:
+        return response
+
+    wiki_id = query_args(request).get('wiki_id', type=int)
+    committer = request.app.state.group_committer
+    if committer.enabled:
+        return await update_record_grouped(request, session, committer, record_id, wiki_id, data)
+
+    title, error = check_title(data['title']) if 'title' in data else (None, None)
+    if error:
+        return json_response(error, 400)
+
+    record = (await session.execute(where_record(select(DataRecord), record_id, wiki_id))).scalar_one_or_none()
+    if not record:
+        return json_response({
+            'error': 'Record not found',
+            'message': f'No record found with ID {record_id}'
+        }, 404)
+    affected = [(record.id, record.wiki_id, record.unit_id)]
+
+    for field, value in update_values(data, title).items():
+        setattr(record, field, value)
+
+    await session.commit()
+    affected.append((record.id, record.wiki_id, record.unit_id))
+    await invalidate_records(request, affected)
+
+    logger.info(f"Updated record {record.id}: {record.title}")
+    return json_response({
+        'message': 'Record updated successfully',
+        'record': record.to_dict()
+    })
+
+
+async def update_record_grouped(request, session, committer, record_id, wiki_id, data):
+    """update_record through group commit, as api_routes.update_record_grouped"""
+    title, error = check_title(data['title']) if 'title' in data else (None, None)
+    if error:
+        return json_response(error, 400)
+
+    await session.close()
+    write = await committer.submit(PendingWrite('update', update_values(data, title), record_id, wiki_id))
+    if write.error:
+        raise write.error
+    if not write.found:
+        return json_response({
+            'error': 'Record not found',
+            'message': f'No record found with ID {record_id}'
+        }, 404)
+
+    record = write.record()
+    await invalidate_records(request, write.affected())
+    logger.info(f"Updated record {record.id}: {record.title}")
+    return json_response({
+        'message': 'Record updated successfully',
+        'record': record.to_dict()
+    })
+
+
+@endpoint(error='Failed to delete record', db_error='Failed to delete record due to database error')
+async def delete_record(request, session, record_id):
+    wiki_id = query_args(request).get('wiki_id', type=int)
+    record = (await session.execute(where_record(select(DataRecord), record_id, wiki_id))).scalar_one_or_none()
+    if not record:
+        return json_response({
+            'error': 'Record not found',
+            'message': f'No record found with ID {record_id}'
+        }, 404)
+
+    record_title = record.title
+    affected = [(record.id, record.wiki_id, record.unit_id)]
+    await session.delete(record)
+    await session.commit()
+    await invalidate_records(request, affected)
+
+    logger.info(f"Deleted record {record_id}: {record_title}")
+    return json_response({'message': 'Record deleted successfully'})
+
+
+@endpoint(error='Failed to retrieve records')
+async def get_records_by_wiki(request, session, wiki_id):
+    stmt = select(DataRecord).where(DataRecord.wiki_id == wiki_id)
+    return await list_records(request, session, stmt, {'wiki_id': wiki_id}, cache_tag=wiki_tag(wiki_id))
+
+
+@endpoint(error='Failed to retrieve records')
+async def get_records_by_unit(request, session, unit_id):
+    stmt = select(DataRecord).where(DataRecord.unit_id == unit_id)
+    return await list_records(request, session, stmt, {'unit_id': unit_id}, cache_tag=unit_tag(unit_id))
+
+
+@endpoint(error='Failed to perform bulk operation', db_error='Failed to perform bulk operation due to database error')
+async def bulk_operations(request, session):
+    data, response = await read_json(request, required_fields=['action'])
+    if response:
+        return response
+    action = data.get('action')
+    config = request.app.state.config
+
+    record_ids, error = check_record_ids(data.get('record_ids', []), config['BULK_MAX_IDS'])
+    if error:
+        return json_response(*error)
+    if action not in BULK_ACTIONS:
+        return json_response({
+            'error': 'Invalid action',
+            'message': 'Supported actions: delete, activate, deactivate'
+        }, 400)
+
+    if len(record_ids) > config['BULK_SYNC_MAX_IDS']:
+        job = (await session.execute(enqueue_statement(action, record_ids, request.state.token_id))).scalar_one()
+        await session.commit()
+        logger.info(f"Queued bulk job {job.id}: {action} {job.total} records")
+        return json_response({
+            'message': f'Bulk {action} of {job.total} records queued',
+            'job': job.to_dict()
+        }, 202, headers={'Location': f'/api/jobs/{job.id}'})
+
+    _, verb = BULK_ACTIONS[action]
+    affected = (await session.execute(bulk_statement(action, record_ids))).all()
+    await session.commit()
+    await invalidate_records(request, affected)
+
+    logger.info(f"Bulk {verb} {len(affected)} records")
+    return json_response({'message': f'Successfully {verb} {len(affected)} records'})
+
+
+@endpoint(error='Failed to retrieve job')
+async def get_job(request, session, job_id):
+    job = await session.get(BulkJob, job_id)
+    # Jobs are visible only to the token that queued them
+    if not job or job.token_id != request.state.token_id:
+        return json_response({
+            'error': 'Job not found',
+            'message': f'No job found with ID {job_id}'
+        }, 404)
+    return json_response(job.to_dict())
+
+
+@endpoint(error='Failed to retrieve cache stats')
+async def cache_stats(request, session):
+    return json_response(request.app.state.response_cache.stats())
+
+
+@endpoint(error='Failed to retrieve pool stats')
+async def get_pool_stats(request, session):
+    return json_response(pool_stats(request.app.state.engine.sync_engine.pool))
+
+
+routes = [
+    Route('/api/health', health_check, methods=['GET']),
+    Route('/api/records', get_records, methods=['GET']),
+    Route('/api/records', create_record, methods=['POST']),
+    Route('/api/records/export', export_records, methods=['GET']),
+    Route('/api/records/import', bulk_import_records, methods=['POST']),
+    Route('/api/records/bulk', bulk_operations, methods=['POST']),
+    Route('/api/records/by-wiki/{wiki_id:int}', get_records_by_wiki, methods=['GET']),
+    Route('/api/records/by-unit/{unit_id:int}', get_records_by_unit, methods=['GET']),
+    Route('/api/records/search', search_records, methods=['GET']),
+    Route('/api/records/stats', get_record_stats, methods=['GET']),
+    Route('/api/records/changes', get_record_changes, methods=['GET']),
+    Route('/api/records/batch-get', batch_get_records, methods=['POST']),
+    Route('/api/records/{record_id:int}', get_record, methods=['GET']),
+    Route('/api/records/{record_id:int}', update_record, methods=['PUT']),
+    Route('/api/records/{record_id:int}', delete_record, methods=['DELETE']),
+    Route('/api/jobs/{job_id:int}', get_job, methods=['GET']),
+    Route('/api/cache/stats', cache_stats, methods=['GET']),
+    Route('/api/pool/stats', get_pool_stats, methods=['GET']),
+]
@@ -4,6 +4,12 @@ from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
 from models import ApiToken, db
+from profiling import authorize_profile, phase
+from ratelimit import (
+    get_load_shedder, get_rate_limiter, overloaded_error, rate_limited_error, retry_after_header,
+    too_many_in_flight_error
+)
+from token_cache import get_last_used_batcher, get_token_cache, token_digest
 
 def generate_token(payload):
     """Generate a JWT token with the given payload"""
@@ -22,12 +28,12 @@ def generate_token(payload):
         current_app.logger.error(f"Error generating token: {str(e)}")
         return None
 
-def decode_token(token):
+def decode_token(token, secret_key=None):
     """Decode and validate a JWT token"""
     try:
         payload = jwt.decode(
             token,
-            current_app.config['JWT_SECRET_KEY'],
+            secret_key or current_app.config['JWT_SECRET_KEY'],
             algorithms=['HS256']
         )
         return payload
@@ -56,33 +62,66 @@ def require_auth(f):
                 'message': 'Authorization header must start with "Bearer "'
             }), 401
         
+        # Refuse work up front while the database pool is saturated
+        if get_load_shedder().overloaded():
+            return jsonify(overloaded_error()), 503, {'Retry-After': '1'}
+        
         # Extract token
         token = auth_header.split(' ')[1]
         
-        # Validate token in database
-        db_token = ApiToken.query.filter_by(token=token, is_active=True).first()
-        if not db_token:
-            return jsonify({
-                'error': 'Invalid or inactive token',
-                'message': 'The provided token is not valid or has been deactivated'
-            }), 401
-        
-        # Decode JWT token
-        payload = decode_token(token)
-        if not payload:
-            return jsonify({
-                'error': 'Invalid token',
-                'message': 'The provided token is invalid or expired'
-            }), 401
+        with phase('auth'):
+            # Serve recently validated tokens from the per-worker cache
+            digest = token_digest(token)
+            token_cache = get_token_cache()
+            cached = token_cache.get(digest)
+            if cached:
+                token_id, payload = cached
+            else:
+                # Validate token in database
+                db_token = ApiToken.query.filter_by(token=token, is_active=True).first()
+                if not db_token:
+                    return jsonify({
+                        'error': 'Invalid or inactive token',
+                        'message': 'The provided token is not valid or has been deactivated'
+                    }), 401
+                
+                # Decode JWT token
+                payload = decode_token(token)
+                if not payload:
+                    return jsonify({
+                        'error': 'Invalid token',
+                        'message': 'The provided token is invalid or expired'
+                    }), 401
+                
+                token_id = db_token.id
+                token_cache.put(digest, token_id, payload)
+            
+            # Per-token request rate, shared across workers by the postgres backend
+            limiter = get_rate_limiter()
+            if limiter.enabled:
+                allowed, retry_after = limiter.check(token_id)
+                if allowed is None:
+                    # The lease takes a second connection; end the token lookup's
+                    # transaction first, or requests could fill the pool and wait on each other
+                    db.session.rollback()
+                    allowed, retry_after = limiter.add_lease(token_id, *limiter.fetch_lease(token_id))
+                if not allowed:
+                    return jsonify(rate_limited_error()), 429, {'Retry-After': retry_after_header(retry_after)}
         
-        # Update last used timestamp
-        db_token.last_used = datetime.utcnow()
-        db.session.commit()
+        # Queue last used timestamp for the next batched flush
+        get_last_used_batcher().touch(token_id)
         
         # Add payload to request context
-        request.current_user = payload
+        request.current_user = dict(payload)
+        request.token_id = token_id
+        authorize_profile(payload)
         
-        return f(*args, **kwargs)
+        if not limiter.enter(token_id):
+            return jsonify(too_many_in_flight_error()), 429, {'Retry-After': '1'}
+        try:
+            return f(*args, **kwargs)
+        finally:
+            limiter.exit(token_id)
     
     return decorated_function
 
@@ -0,0 +1 @@
+"""Load tests and micro-benchmarks; see the "Бенчмарки" section of the README."""
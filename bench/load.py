@@ -0,0 +1,223 @@
+"""Drive the API hot paths at fixed concurrency and report latency percentiles.
+
+    python -m bench.load --url http://localhost:5000 --token $TOKEN \\
+        --concurrency 16 --duration 30 --baseline bench/baselines/load.json
+
+Each scenario runs for --duration seconds after a --warmup period, with
+--concurrency threads each holding one keep-alive connection. Results are
+written to bench/results/; with --baseline the run fails (exit code 1) when
+a scenario's p95 latency is worse than the baseline by more than --threshold.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+from bench.results import compare, latency_summary, save_results
+
+PER_PAGE = 50
+
+
+class Context:
+    """What the scenarios need to know about the seeded data"""
+
+    def __init__(self, max_id, total, wikis):
+        self.max_id = max_id
+        self.total = total
+        self.wikis = wikis
+
+
+def list_records(rng, ctx):
+    return 'GET', f'/api/records?per_page={PER_PAGE}', None
+
+
+def list_filtered(rng, ctx):
+    return 'GET', f'/api/records/by-wiki/{rng.randint(1, ctx.wikis)}?per_page={PER_PAGE}', None
+
+
+def list_filtered_category(rng, ctx):
+    return 'GET', f'/api/records?category=docs&is_active=true&per_page={PER_PAGE}', None
+
+
+def list_deep_page(rng, ctx):
+    pages = max(ctx.total // PER_PAGE, 1)
+    page = rng.randint(max(int(pages * 0.9), 1), pages)
+    return 'GET', f'/api/records?per_page={PER_PAGE}&page={page}', None
+
+
+def list_cursor(rng, ctx):
+    return 'GET', f'/api/records?per_page={PER_PAGE}&cursor=', None
+
+
+def get_record(rng, ctx):
+    return 'GET', f'/api/records/{rng.randint(1, ctx.max_id)}', None
+
+
+def create_record(rng, ctx):
+    body = {
+        'title': f'Load test {rng.random()}',
+        'content': 'x' * 256,
+        'wiki_id': rng.randint(1, ctx.wikis),
+        'category': 'bench',
+    }
+    return 'POST', '/api/records', body
+
+
+def bulk_activate(rng, ctx):
+    ids = [rng.randint(1, ctx.max_id) for _ in range(100)]
+    return 'POST', '/api/records/bulk', {'action': 'activate', 'record_ids': ids}
+
+
+SCENARIOS = {
+    'list': list_records,
+    'list_filtered': list_filtered,
+    'list_filtered_category': list_filtered_category,
+    'list_deep_page': list_deep_page,
+    'list_cursor': list_cursor,
+    'get_record': get_record,
+    'create_record': create_record,
+    'bulk_activate': bulk_activate,
+}
+
+
+class Client:
+    """One keep-alive HTTP connection with the bearer token attached"""
+
+    def __init__(self, url, token):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=60)
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def request(self, method, path, body=None):
+        headers = dict(self.headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+        return response.status, data
+
+    def close(self):
+        self.connection.close()
+
+
+def discover(url, token, wikis):
+    """Read the newest id and the row count from the API itself"""
+    client = Client(url, token)
+    try:
+        status, data = client.request('GET', '/api/records?per_page=1')
+    finally:
+        client.close()
+    if status != 200:
+        raise SystemExit(f'GET /api/records returned {status}: {data[:200]!r}')
+    body = json.loads(data)
+    records = body['records']
+    return Context(max_id=records[0]['id'] if records else 1, total=body['pagination']['total'], wikis=wikis)
+
+
+def run_scenario(name, url, token, ctx, concurrency, duration, warmup, seed):
+    build = SCENARIOS[name]
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        client = Client(url, token)
+        own_latencies = []
+        own_statuses = Counter()
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    break
+                method, path, body = build(rng, ctx)
+                began = time.perf_counter()
+                try:
+                    status, _ = client.request(method, path, body)
+                except (OSError, http.client.HTTPException):
+                    status = 'connection_error'
+                    client = Client(url, token)
+                finished = time.perf_counter()
+                if began >= start_at:
+                    own_latencies.append(finished - began)
+                    own_statuses[status] += 1
+        finally:
+            client.close()
+        with lock:
+            latencies.extend(own_latencies)
+            statuses.update(own_statuses)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 404 is expected from get_record once bulk/deletes leave gaps in the ids
+    errors = sum(count for status, count in statuses.items()
+                 if not (isinstance(status, int) and (status < 400 or status == 404)))
+    summary = latency_summary(latencies, duration, errors)
+    summary['statuses'] = {str(status): count for status, count in sorted(statuses.items(), key=str)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=os.environ.get('BENCH_URL', 'http://localhost:5000'))
+    parser.add_argument('--token', default=os.environ.get('BENCH_TOKEN'), help='bearer token (or BENCH_TOKEN)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated scenario names')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before each scenario')
+    parser.add_argument('--wikis', type=int, default=1000, help='wiki_id range used by bench.seed')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for reproducible request mixes')
+    parser.add_argument('--output', help='result file (default: bench/results/load-<time>.json)')
+    parser.add_argument('--baseline', help='earlier result file to compare p95 latency against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p95 regression, as a fraction')
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error('--token or BENCH_TOKEN is required')
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    ctx = discover(args.url, args.token, args.wikis)
+    print(f'{ctx.total} records, newest id {ctx.max_id}, concurrency {args.concurrency}')
+    results = {}
+    for name in names:
+        result = run_scenario(name, args.url, args.token, ctx, args.concurrency, args.duration, args.warmup, args.seed)
+        results[name] = result
+        print(f"{name:24} {result['throughput_rps']:>9} req/s  p50 {result['p50_ms']}ms  "
+              f"p95 {result['p95_ms']}ms  p99 {result['p99_ms']}ms  errors {result['errors']}")
+
+    settings = {
+        'url': args.url, 'concurrency': args.concurrency, 'duration': args.duration,
+        'warmup': args.warmup, 'seed': args.seed, 'records': ctx.total,
+    }
+    print(f"Saved {save_results('load', settings, results, args.output)}")
+
+    if args.baseline:
+        print(f'Compared with {args.baseline}:')
+        if compare(args.baseline, results, 'p95_ms', args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Micro-benchmarks of per-request CPU work: authentication, to_dict and JSON encoding.
+
+    python -m bench.micro --baseline bench/baselines/micro.json
+
+Needs DATABASE_URL (for the app import and the uncached token lookup).
+Each benchmark reports the median and best time per call over --repeat
+rounds; with --baseline the run fails when a median is slower than the
+baseline by more than --threshold.
+"""
+import argparse
+import logging
+import statistics
+import sys
+import timeit
+from datetime import datetime
+from bench.results import compare, save_results
+
+
+def build_benchmarks(token):
+    """Named zero-argument callables, each run inside a request context"""
+    from auth import decode_token, require_auth
+    from flask import jsonify
+    from models import DataRecord
+    from token_cache import get_token_cache
+
+    now = datetime.utcnow()
+    records = [
+        DataRecord(id=index, wiki_id=index % 100, unit_id=index % 1000, title=f'Record {index}',
+                   content='x' * 256, category='docs', is_active=True, created_at=now, updated_at=now)
+        for index in range(100)
+    ]
+    dicts = [record.to_dict() for record in records]
+    protected = require_auth(lambda: None)
+
+    def require_auth_uncached():
+        get_token_cache().invalidate()
+        protected()
+
+    return {
+        'require_auth_cached': protected,
+        'require_auth_uncached': require_auth_uncached,
+        'decode_token': lambda: decode_token(token),
+        'to_dict_100': lambda: [record.to_dict() for record in records],
+        'jsonify_100': lambda: jsonify({'records': dicts}).get_data(),
+        'to_dict_jsonify_100': lambda: jsonify({'records': [record.to_dict() for record in records]}).get_data(),
+    }
+
+
+def measure(function, number, repeat):
+    timings = [elapsed / number for elapsed in timeit.repeat(function, number=number, repeat=repeat)]
+    return {
+        'number': number,
+        'repeat': repeat,
+        'median_us': round(statistics.median(timings) * 1e6, 3),
+        'best_us': round(min(timings) * 1e6, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=1000, help='calls per round')
+    parser.add_argument('--repeat', type=int, default=7, help='rounds per benchmark')
+    parser.add_argument('--only', help='comma-separated benchmark names')
+    parser.add_argument('--output', help='result file (default: bench/results/micro-<time>.json)')
+    parser.add_argument('--baseline', help='earlier result file to compare median times against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown, as a fraction')
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import ApiToken
+    app = create_app()
+    logging.disable(logging.INFO)
+
+    with app.app_context():
+        token = ApiToken.query.filter_by(name='admin').first().token
+    # The uncached lookup hits the database, so fewer calls keep runs short
+    numbers = {'require_auth_uncached': max(args.number // 10, 1)}
+
+    results = {}
+    with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        benchmarks = build_benchmarks(token)
+        names = args.only.split(',') if args.only else list(benchmarks)
+        for name in names:
+            results[name] = measure(benchmarks[name], numbers.get(name, args.number), args.repeat)
+            print(f"{name:24} median {results[name]['median_us']:>10.2f}us  best {results[name]['best_us']:>10.2f}us")
+
+    settings = {'number': args.number, 'repeat': args.repeat, 'json_provider': type(app.json).__name__}
+    print(f"Saved {save_results('micro', settings, results, args.output)}")
+
+    if args.baseline:
+        print(f'Compared with {args.baseline}:')
+        if compare(args.baseline, results, 'median_us', args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
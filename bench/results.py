@@ -0,0 +1,80 @@
+"""Storing benchmark results and comparing them with a saved baseline."""
+import json
+import math
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def latency_summary(latencies, elapsed, errors=0):
+    """p50/p95/p99/max latency in milliseconds and throughput of one scenario"""
+    latencies = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': to_ms(percentile(latencies, 0.50)),
+        'p95_ms': to_ms(percentile(latencies, 0.95)),
+        'p99_ms': to_ms(percentile(latencies, 0.99)),
+        'max_ms': to_ms(latencies[-1] if latencies else None),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(kind, settings, scenarios, path=None):
+    """Write a run to bench/results (or path) and return the path"""
+    run = {
+        'kind': kind,
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'settings': settings,
+        'scenarios': scenarios,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        path = os.path.join(RESULTS_DIR, f'{kind}-{stamp}.json')
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return path
+
+
+def compare(baseline_path, scenarios, metric, threshold, higher_is_better=False):
+    """Print each scenario against the baseline; return the names that regressed by more than threshold"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['scenarios']
+    regressions = []
+    for name, result in scenarios.items():
+        before = baseline.get(name, {}).get(metric)
+        after = result.get(metric)
+        if not before or after is None:
+            print(f'  {name}: no baseline')
+            continue
+        change = (after - before) / before
+        regressed = change < -threshold if higher_is_better else change > threshold
+        print(f"  {name}: {metric} {before} -> {after} ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
@@ -0,0 +1,72 @@
+"""Seed data_records with synthetic rows for benchmarking.
+
+    python -m bench.seed --scale 1m --truncate
+
+Rows are generated server-side with generate_series in chunks, so even the
+10M scale needs no client-side data. Run migrate.py first.
+"""
+import argparse
+import logging
+import os
+import time
+from sqlalchemy import create_engine, text
+
+logger = logging.getLogger('bench.seed')
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+SEED_CHUNK = text("""
+    INSERT INTO data_records (wiki_id, unit_id, title, content, category, is_active, created_at, updated_at)
+    SELECT
+        g % :wikis + 1,
+        g % :units + 1,
+        'Benchmark record ' || g,
+        repeat(md5(g::text), :content_blocks),
+        (ARRAY['news', 'docs', 'wiki', 'faq', 'misc'])[g % 5 + 1],
+        g % 10 <> 0,
+        now() - make_interval(secs => :last - g),
+        now() - make_interval(secs => :last - g)
+    FROM generate_series(:start, :stop) AS g
+""")
+
+
+def seed(engine, rows, wikis, units, content_size, chunk_size, truncate):
+    with engine.begin() as conn:
+        if truncate:
+            conn.execute(text('TRUNCATE data_records RESTART IDENTITY'))
+        offset = conn.execute(text('SELECT COALESCE(MAX(id), 0) FROM data_records')).scalar()
+
+    params = {'wikis': wikis, 'units': units, 'content_blocks': max(content_size // 32, 1), 'last': offset + rows}
+    for start in range(1, rows + 1, chunk_size):
+        stop = min(start + chunk_size - 1, rows)
+        began = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(SEED_CHUNK, {**params, 'start': start + offset, 'stop': stop + offset})
+        logger.info(f'Inserted rows {start}-{stop} of {rows} in {time.perf_counter() - began:.1f}s')
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('VACUUM ANALYZE data_records'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=SCALES, default='10k', help='number of rows to insert')
+    parser.add_argument('--rows', type=int, help='exact number of rows, overrides --scale')
+    parser.add_argument('--wikis', type=int, default=1000, help='distinct wiki_id values')
+    parser.add_argument('--units', type=int, default=10000, help='distinct unit_id values')
+    parser.add_argument('--content-size', type=int, default=256, help='approximate content length in characters')
+    parser.add_argument('--chunk-size', type=int, default=500_000, help='rows per transaction')
+    parser.add_argument('--truncate', action='store_true', help='empty data_records first')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    engine = create_engine(os.environ.get('DATABASE_URL', 'postgresql://localhost/flask_api'))
+    try:
+        seed(engine, args.rows or SCALES[args.scale], args.wikis, args.units,
+             args.content_size, args.chunk_size, args.truncate)
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
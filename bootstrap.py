@@ -0,0 +1,38 @@
+"""One-shot setup run before the app and worker.py start (see entrypoint.sh).
+
+Usage:
+    python bootstrap.py
+
+Applies pending schema migrations (migrate.py) and creates the admin API
+token if it does not exist. Importing or creating the app does no database
+work, so every gunicorn worker starts without a round trip to Postgres.
+Safe to run from several containers at once.
+"""
+from sqlalchemy.dialects.postgresql import insert
+from app import create_app, db
+from auth import generate_token
+from migrate import upgrade
+from models import ApiToken
+
+
+def create_admin_token(app):
+    """Insert the admin token unless one exists; returns the new token value or None"""
+    with app.app_context():
+        token_value = generate_token({"user": "admin", "role": "admin"})
+        stmt = (
+            insert(ApiToken)
+            .values(name="admin", token=token_value, is_active=True)
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(ApiToken.token)
+        )
+        with db.engine.begin() as conn:
+            created = conn.execute(stmt).scalar()
+        if created:
+            app.logger.info(f"Created admin token: {created}")
+        return created
+
+
+if __name__ == '__main__':
+    # Logging is configured by app.py
+    upgrade()
+    create_admin_token(create_app())
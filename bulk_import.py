@@ -0,0 +1,255 @@
+import json
+from datetime import datetime
+from sqlalchemy import literal_column, select, text, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from models import DataRecord, db
+from partitions import partition_scheme
+from validation import check_title
+
+IMPORT_MODES = ('insert', 'upsert')
+
+# Columns a client may set; id is only honoured in upsert mode
+IMPORT_FIELDS = ('wiki_id', 'unit_id', 'title', 'content', 'category', 'is_active')
+UPDATE_FIELDS = IMPORT_FIELDS + ('updated_at',)
+
+
+class ImportRowError(ValueError):
+    """A single import row failed validation"""
+
+
+def iter_ndjson(stream, start=1):
+    """Yield one decoded item per non-empty line of an NDJSON body"""
+    for line_number, line in enumerate(stream, start=start):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield ImportRowError(f'Line {line_number} is not valid JSON')
+
+
+def optional_int(item, key):
+    value = item.get(key)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+        raise ImportRowError(f'{key} must be an integer')
+    return value
+
+
+def optional_str(item, key, default=None, max_length=None):
+    value = item.get(key, default)
+    if value is not None and not isinstance(value, str):
+        raise ImportRowError(f'{key} must be a string')
+    if value is not None and max_length and len(value) > max_length:
+        raise ImportRowError(f'{key} must be {max_length} characters or less')
+    return value
+
+
+def prepare_row(item, mode, now):
+    """Validate one import item and turn it into a full set of column values"""
+    if isinstance(item, ImportRowError):
+        raise item
+    if not isinstance(item, dict):
+        raise ImportRowError('Record must be a JSON object')
+
+    raw_title = item.get('title')
+    if not isinstance(raw_title, str):
+        raise ImportRowError('Missing required field: title')
+    title, error = check_title(raw_title)
+    if error:
+        raise ImportRowError(error.get('message', error['error']))
+
+    is_active = item.get('is_active', True)
+    if not isinstance(is_active, bool):
+        raise ImportRowError('is_active must be a boolean')
+
+    row = {
+        'wiki_id': optional_int(item, 'wiki_id'),
+        'unit_id': optional_int(item, 'unit_id'),
+        'title': title,
+        'content': optional_str(item, 'content', default=''),
+        'category': optional_str(item, 'category', max_length=100),
+        'is_active': is_active,
+        'created_at': now,
+        'updated_at': now,
+    }
+    if mode == 'upsert' and item.get('id') is not None:
+        row['id'] = optional_int(item, 'id')
+    return row
+
+
+def build_statement(rows):
+    """Multi-row INSERT for rows sharing the same keys, upserting on id when given"""
+    stmt = pg_insert(DataRecord).values(rows)
+    if 'id' not in rows[0]:
+        # Plain inserts; system columns cannot be returned from a partitioned data_records
+        return stmt.returning(DataRecord.id, true().label('inserted'))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DataRecord.id],
+        set_={field: stmt.excluded[field] for field in UPDATE_FIELDS}
+    )
+    # xmax is 0 only for freshly inserted tuples, which tells inserts from updates
+    return stmt.returning(DataRecord.id, literal_column('xmax = 0').label('inserted'))
+
+
+def check_upsert(conn):
+    """Error payload when mode=upsert cannot run, else None.
+
+    ON CONFLICT (id) needs a unique index on id alone, which a partitioned
+    data_records does not have (see partitions.py).
+    """
+    if partition_scheme(conn) is None:
+        return None
+    return {
+        'error': 'Upsert not available',
+        'message': 'data_records is partitioned, so records cannot be upserted by id; use mode=insert'
+    }
+
+
+def previous_statement(entries):
+    """Current (id, wiki_id, unit_id) of rows an upsert batch may overwrite"""
+    return select(DataRecord.id, DataRecord.wiki_id, DataRecord.unit_id).where(
+        DataRecord.id.in_([row['id'] for _, row in entries])
+    )
+
+
+# Keeps the id sequence ahead of ids that upserts inserted explicitly
+SEQUENCE_CATCH_UP = text(
+    "SELECT setval('data_records_id_seq', "
+    "GREATEST((SELECT MAX(id) FROM data_records), "
+    "(SELECT last_value FROM data_records_id_seq)))"
+)
+
+
+class ImportBatches:
+    """Validation, batching and result bookkeeping shared by the sync and async importers.
+    
+    Each batch runs in a savepoint. If the database rejects a batch, its
+    rows are retried one by one so only the offending rows are reported.
+    """
+
+    def __init__(self, mode, batch_size):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.ids = []
+        self.errors = []
+        self.inserted = 0
+        self.updated = 0
+        self.explicit_ids_inserted = False
+        # (id, wiki_id, unit_id) before and after every write, for cache invalidation
+        self.affected = []
+        self._pending = []
+
+    def add(self, index, item, now):
+        """Validate and queue one item; returns True once a full batch is queued"""
+        self.ids.append(None)
+        try:
+            row = prepare_row(item, self.mode, now)
+        except ImportRowError as e:
+            self.errors.append({'index': index, 'error': str(e)})
+            return False
+        self._pending.append((index, row))
+        return len(self._pending) >= self.batch_size
+
+    def take_groups(self):
+        """Pending entries split into rows without and with explicit ids"""
+        pending, self._pending = self._pending, []
+        without_id = [entry for entry in pending if 'id' not in entry[1]]
+        with_id = [entry for entry in pending if 'id' in entry[1]]
+        return [group for group in (without_id, with_id) if group]
+
+    def record_success(self, entries, previous, result):
+        self.affected.extend(previous)
+        for (index, row), (record_id, inserted) in zip(entries, result):
+            self.ids[index] = record_id
+            self.affected.append((record_id, row['wiki_id'], row['unit_id']))
+            if inserted:
+                self.inserted += 1
+                self.explicit_ids_inserted |= 'id' in row
+            else:
+                self.updated += 1
+
+    def record_failure(self, entries, error):
+        if len(entries) == 1:
+            message = str(getattr(error, 'orig', error)).strip().splitlines()[0]
+            self.errors.append({'index': entries[0][0], 'error': message})
+
+    def check_size(self, index, max_rows):
+        if index >= max_rows:
+            raise ImportRowError(f'Too many records, maximum is {max_rows} per request')
+
+
+class RecordImporter(ImportBatches):
+    """Loads validated rows in batched multi-row INSERTs on the Flask-SQLAlchemy session"""
+
+    def flush(self):
+        for group in self.take_groups():
+            if not self._execute(group) and len(group) > 1:
+                for entry in group:
+                    self._execute([entry])
+
+    def _execute(self, entries):
+        previous = []
+        try:
+            with db.session.begin_nested():
+                if 'id' in entries[0][1]:
+                    previous = db.session.execute(previous_statement(entries)).all()
+                result = db.session.execute(build_statement([row for _, row in entries])).all()
+        except SQLAlchemyError as e:
+            self.record_failure(entries, e)
+            return False
+        self.record_success(entries, previous, result)
+        return True
+
+    def finish(self):
+        """Flush the last batch and catch the id sequence up"""
+        self.flush()
+        if self.explicit_ids_inserted:
+            db.session.execute(SEQUENCE_CATCH_UP)
+        self.errors.sort(key=lambda error: error['index'])
+
+
+class AsyncRecordImporter(ImportBatches):
+    """RecordImporter counterpart for an AsyncSession, used by the ASGI app"""
+
+    def __init__(self, session, mode, batch_size):
+        super().__init__(mode, batch_size)
+        self.session = session
+
+    async def flush(self):
+        for group in self.take_groups():
+            if not await self._execute(group) and len(group) > 1:
+                for entry in group:
+                    await self._execute([entry])
+
+    async def _execute(self, entries):
+        previous = []
+        try:
+            async with self.session.begin_nested():
+                if 'id' in entries[0][1]:
+                    previous = (await self.session.execute(previous_statement(entries))).all()
+                result = (await self.session.execute(build_statement([row for _, row in entries]))).all()
+        except SQLAlchemyError as e:
+            self.record_failure(entries, e)
+            return False
+        self.record_success(entries, previous, result)
+        return True
+
+    async def finish(self):
+        await self.flush()
+        if self.explicit_ids_inserted:
+            await self.session.execute(SEQUENCE_CATCH_UP)
+        self.errors.sort(key=lambda error: error['index'])
+
+
+def import_records(items, mode, batch_size, max_rows):
+    """Validate and load an iterable of import items; the caller commits"""
+    importer = RecordImporter(mode, batch_size)
+    now = datetime.utcnow()
+    for index, item in enumerate(items):
+        importer.check_size(index, max_rows)
+        if importer.add(index, item, now):
+            importer.flush()
+    importer.finish()
+    return importer
@@ -0,0 +1,223 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlencode
+from flask import current_app, request
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU with per-entry TTL and tag-based invalidation"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisBackend:
+    """Shared backend for any Redis-protocol server; tags are stored as sets of keys"""
+
+    def __init__(self, url, prefix='hps:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('CACHE_BACKEND=redis requires the "redis" package') from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, tags, ttl):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(self.prefix + key, value, ex=ttl)
+        for tag in tags:
+            tag_key = f'{self.prefix}tag:{tag}'
+            pipe.sadd(tag_key, self.prefix + key)
+            pipe.expire(tag_key, ttl)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        tag_keys = [f'{self.prefix}tag:{tag}' for tag in tags]
+        pipe = self.client.pipeline(transaction=False)
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        keys = set().union(*pipe.execute())
+        self.client.delete(*keys, *tag_keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResponseCache:
+    """Caches serialized JSON response bodies with hit/miss accounting.
+
+    Backend failures are logged and treated as misses so the cache never
+    takes the API down with it.
+    """
+
+    def __init__(self, backend, ttl, logger):
+        self.backend = backend
+        self.ttl = ttl
+        self.logger = logger
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+        # Callables taking (counter name, amount), e.g. to export metrics
+        self.observers = []
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Cache get failed for {key}: {str(e)}")
+            value = None
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key, value, tags):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, value, tags, self.ttl)
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Cache set failed for {key}: {str(e)}")
+
+    def invalidate(self, tags):
+        tags = [tag for tag in set(tags) if tag]
+        if self.backend is None or not tags:
+            return
+        try:
+            self.backend.invalidate(tags)
+            self._count('invalidations', len(tags))
+        except Exception as e:
+            self._count('errors')
+            self.logger.error(f"Cache invalidation failed for {tags}: {str(e)}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'invalidations': self.invalidations,
+            'errors': self.errors
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+        for observer in self.observers:
+            observer(name, amount)
+
+
+def pack_entry(etag, last_modified, body):
+    """Serialize a response body with its validators into one cache value"""
+    validators = json.dumps([etag, last_modified.isoformat() if last_modified else None])
+    return validators.encode('utf-8') + b'\n' + body
+
+
+def unpack_entry(value):
+    """Inverse of pack_entry: returns (etag, last_modified, body)"""
+    validators, body = value.split(b'\n', 1)
+    etag, last_modified = json.loads(validators)
+    return etag, datetime.fromisoformat(last_modified) if last_modified else None, body
+
+
+def record_tag(record_id):
+    return f'record:{record_id}'
+
+
+def wiki_tag(wiki_id):
+    return f'wiki:{wiki_id}' if wiki_id is not None else None
+
+
+def unit_tag(unit_id):
+    return f'unit:{unit_id}' if unit_id is not None else None
+
+
+def record_tags(record_id, wiki_id, unit_id):
+    """Every tag whose cached responses include the given record"""
+    return [record_tag(record_id), wiki_tag(wiki_id), unit_tag(unit_id)]
+
+
+def listing_key(tag, args=None):
+    """Cache key for a listing page: its tag plus the normalized query string"""
+    args = request.args if args is None else args
+    return f'{tag}:{urlencode(sorted(args.items(multi=True)))}'
+
+
+def create_response_cache(config, logger):
+    """Build the response cache configured by CACHE_BACKEND"""
+    backend_name = config['CACHE_BACKEND']
+    if backend_name == 'redis':
+        backend = RedisBackend(config['CACHE_REDIS_URL'])
+    elif backend_name == 'memory':
+        backend = MemoryBackend(config['CACHE_MAX_ENTRIES'])
+    else:
+        backend = None
+    return ResponseCache(backend, config['CACHE_TTL'], logger)
+
+
+def init_app(app):
+    app.extensions['response_cache'] = create_response_cache(app.config, app.logger)
+
+
+def get_response_cache():
+    return current_app.extensions['response_cache']
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from sqlalchemy import BigInteger, Text, cast, delete, func, select, text, true, tuple_
+from models import DataRecord, record_changes
+from pagination import InvalidCursorError, decode_position, encode_position
+
+
+def encode_changes_cursor(txid, seq, at):
+    """Encode a change log position; at dates the cursor for the retention check"""
+    return encode_position([txid, seq, at.isoformat()])
+
+
+def decode_changes_cursor(since):
+    """Decode a since= token into (txid, seq, at); an empty token starts from the oldest retained change"""
+    if not since:
+        return 0, 0, None
+    try:
+        txid, seq, at = decode_position(since)
+        return int(txid), int(seq), datetime.fromisoformat(at)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f'Invalid cursor: {since}') from e
+
+
+def cursor_expired(at, retention_days):
+    """Whether changes after the cursor may already have been pruned"""
+    return at is not None and at < datetime.utcnow() - timedelta(days=retention_days)
+
+
+def changes_statement(since, per_page, fields):
+    """One page of the change log after since, with the current state of each record.
+
+    Only changes of transactions older than the statement snapshot's xmin are
+    read: those are settled, so no later commit can add a change before them.
+    The snapshot row is returned even when the page is empty, so the caller
+    can move the cursor up to xmin. A long-running transaction that has
+    written anything holds xmin back, and with it the whole feed, until it
+    ends; lag_statement measures for how long.
+    """
+    txid, seq, _ = decode_changes_cursor(since)
+    xmin = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+    snapshot = select(xmin.label('xmin')).subquery('snapshot')
+    page = (
+        select(record_changes)
+        .where(
+            tuple_(record_changes.c.txid, record_changes.c.seq) > tuple_(txid, seq),
+            record_changes.c.txid < snapshot.c.xmin
+        )
+        .order_by(record_changes.c.txid, record_changes.c.seq)
+        .limit(per_page + 1)
+        .lateral('page')
+    )
+    selected = tuple(dict.fromkeys(('id',) + fields))
+    return (
+        select(snapshot.c.xmin, page.c.txid, page.c.seq, page.c.record_id, page.c.op, page.c.changed_at,
+               *DataRecord.columns(selected))
+        .select_from(snapshot)
+        .outerjoin(page, true())
+        .outerjoin(DataRecord, DataRecord.id == page.c.record_id)
+        .order_by(page.c.txid, page.c.seq)
+    )
+
+
+def changes_page(rows, per_page, fields):
+    """Build the response for rows of changes_statement.
+
+    A record that no longer exists is reported as a delete whatever the
+    logged operation, so replaying a page never resurrects a deleted record.
+    """
+    changes = [row for row in rows if row.seq is not None]
+    has_more = len(changes) > per_page
+    changes = changes[:per_page]
+    if has_more:
+        last = changes[-1]
+        next_since = encode_changes_cursor(last.txid, last.seq, last.changed_at)
+    else:
+        # Every settled change is read; later ones belong to transactions at or after xmin
+        next_since = encode_changes_cursor(rows[0].xmin, 0, datetime.utcnow())
+    items = []
+    for row in changes:
+        if row.id is None:
+            op, record = 'delete', None
+        else:
+            op = 'insert' if row.op == 'delete' else row.op
+            record = {field: row._mapping[field] for field in fields}
+        items.append({
+            'id': row.record_id,
+            'op': op,
+            'changed_at': row.changed_at.isoformat(),
+            'record': record
+        })
+    return {'changes': items, 'next_since': next_since, 'has_more': has_more}
+
+
+def lag_statement():
+    """Seconds the oldest open transaction holding a transaction id has run, 0 when there is none.
+
+    Other roles' transactions are only visible with pg_read_all_stats.
+    """
+    return text("""
+        SELECT COALESCE(EXTRACT(EPOCH FROM now() - min(xact_start)), 0)
+        FROM pg_stat_activity
+        WHERE backend_xid IS NOT NULL
+    """)
+
+
+def prune_statement(retention_days):
+    """Delete change log rows older than the retention period"""
+    return delete(record_changes).where(
+        record_changes.c.changed_at < datetime.utcnow() - timedelta(days=retention_days)
+    )
@@ -0,0 +1,193 @@
+import zlib
+from flask import current_app, request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # optional dependency, see pyproject extras
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, see pyproject extras
+    zstandard = None
+
+# Media types worth compressing; event streams are left alone so every event is delivered at once
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/javascript', 'text/')
+EXCLUDED_TYPES = ('text/event-stream',)
+
+
+class GzipStream:
+    name = 'gzip'
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        """Compress data and flush it, so a streamed chunk reaches the client without waiting for the next"""
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b''):
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliStream:
+    name = 'br'
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=4)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data=b''):
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdStream:
+    name = 'zstd'
+
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data=b''):
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+# Content-Encoding -> stream class, for the codecs whose library is installed
+CODECS = {'gzip': GzipStream}
+if brotli is not None:
+    CODECS['br'] = BrotliStream
+if zstandard is not None:
+    CODECS['zstd'] = ZstdStream
+
+
+def available_codecs(names):
+    """Stream classes for the configured encodings that can be served, in preference order"""
+    return [CODECS[name] for name in names if name in CODECS]
+
+
+def negotiate(accept_encoding, codecs):
+    """Pick the codec the client rates highest, ties going to the server's preference order"""
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    best, best_quality = None, 0
+    for codec in codecs:
+        quality = accepted.quality(codec.name)
+        if quality > best_quality:
+            best, best_quality = codec, quality
+    return best
+
+
+def is_compressible(status, headers):
+    """Whether a response with this status and these headers may be compressed"""
+    if status < 200 or status in (204, 206, 304) or 'Content-Encoding' in headers:
+        return False
+    mimetype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+    return mimetype.startswith(COMPRESSIBLE_TYPES) and not mimetype.startswith(EXCLUDED_TYPES)
+
+
+def compress_chunks(stream, chunks):
+    """Compress a streamed body chunk by chunk"""
+    for chunk in chunks:
+        if chunk:
+            yield stream.chunk(chunk)
+    yield stream.finish()
+
+
+def compress_response(response):
+    """after_request hook: compress bodies above COMPRESS_MIN_SIZE and all streamed bodies"""
+    codecs = current_app.extensions['compression_codecs']
+    if not codecs or request.method == 'HEAD' or response.direct_passthrough:
+        return response
+    if not is_compressible(response.status_code, response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not response.is_streamed and response.content_length < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    codec = negotiate(request.headers.get('Accept-Encoding'), codecs)
+    if codec is None:
+        return response
+    if response.is_streamed:
+        response.response = compress_chunks(codec(), response.iter_encoded())
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(codec().finish(response.get_data()))
+    response.headers['Content-Encoding'] = codec.name
+    return response
+
+
+def raw_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+
+
+class CompressionMiddleware:
+    """ASGI counterpart of compress_response for the Starlette app"""
+
+    def __init__(self, app, codecs, minimum_size):
+        self.app = app
+        self.codecs = codecs
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.codecs or scope['method'] == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = next((value.decode('latin-1') for name, value in scope['headers']
+                                if name == b'accept-encoding'), None)
+        codec = negotiate(accept_encoding, self.codecs)
+        start = None
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start, stream
+            if message['type'] == 'http.response.start':
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                return
+            if message['type'] != 'http.response.body' or start is None:
+                await send(message)
+                return
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if stream is None:
+                headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in start['headers']])
+                if not is_compressible(start['status'], headers):
+                    await send(start)
+                    await send(message)
+                    start = None
+                    return
+                vary = headers.get('Vary')
+                headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+                if codec is None or (not more_body and len(body) < self.minimum_size):
+                    await send({**start, 'headers': raw_headers(headers)})
+                    await send(message)
+                    start = None
+                    return
+                stream = codec()
+                headers['Content-Encoding'] = codec.name
+                headers.remove('Content-Length')
+                body = stream.finish(body) if not more_body else stream.chunk(body)
+                if not more_body:
+                    headers['Content-Length'] = str(len(body))
+                await send({**start, 'headers': raw_headers(headers)})
+            else:
+                body = stream.chunk(body) if more_body else stream.finish(body)
+            await send({**message, 'body': body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def init_app(app):
+    """Register response compression for the encodings in COMPRESS_ALGORITHMS that are installed"""
+    codecs = available_codecs(app.config['COMPRESS_ALGORITHMS'])
+    missing = [name for name in app.config['COMPRESS_ALGORITHMS'] if name not in CODECS]
+    if missing:
+        app.logger.info(f"Compression libraries not installed for: {', '.join(missing)}")
+    app.extensions['compression_codecs'] = codecs
+    app.after_request(compress_response)
@@ -0,0 +1,58 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, request
+from werkzeug.http import http_date, parse_date, parse_etags
+
+
+def make_etag(*parts):
+    """Build an opaque ETag value from the parts that identify a representation"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def as_utc(value):
+    """Attach UTC to the naive timestamps stored in the database"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def validator_headers(etag, last_modified):
+    """ETag and Last-Modified response headers for the validators"""
+    headers = {'ETag': f'W/"{etag}"'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(as_utc(last_modified))
+    return headers
+
+
+def headers_not_modified(etag, last_modified, headers):
+    """Evaluate If-None-Match (preferred) or If-Modified-Since from a header mapping"""
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+    if_modified_since = parse_date(headers.get('If-Modified-Since'))
+    if last_modified is not None and if_modified_since is not None:
+        # HTTP dates have whole-second precision
+        return as_utc(last_modified).replace(microsecond=0) <= if_modified_since
+    return False
+
+
+def headers_have_conditions(headers):
+    return bool(headers.get('If-None-Match') or headers.get('If-Modified-Since'))
+
+
+def is_not_modified(etag, last_modified):
+    return headers_not_modified(etag, last_modified, request.headers)
+
+
+def has_conditions():
+    return headers_have_conditions(request.headers)
+
+
+def set_validators(response, etag, last_modified):
+    response.headers.update(validator_headers(etag, last_modified))
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    """304 carrying the same validators a full response would have"""
+    return set_validators(current_app.response_class(status=304), etag, last_modified)
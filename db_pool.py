@@ -0,0 +1,174 @@
+import threading
+import time
+import uuid
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolWaitStats:
+    """Checkout wait time counters for one connection pool.
+
+    observers are callables taking (seconds, timed_out), called after every checkout.
+    """
+
+    def __init__(self):
+        self.observers = []
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        for observer in self.observers:
+            observer(seconds, timed_out)
+
+
+class TimedPoolMixin:
+    """Measures how long each checkout waits for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        """Keep the observers when Engine.dispose() replaces the pool; the counters start over"""
+        pool = super().recreate()
+        pool.wait_stats.observers = self.wait_stats.observers
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(config, is_async=False):
+    """SQLAlchemy engine options for the DB_* settings.
+
+    With DB_PGBOUNCER set, connections are assumed to go through PgBouncer in
+    transaction pooling mode: the pre-ping is skipped, asyncpg keeps no
+    prepared statements, and the statement timeout is set per transaction
+    instead of per connection.
+    """
+    pgbouncer = config['DB_PGBOUNCER']
+    options = {
+        'poolclass': TimedAsyncQueuePool if is_async else TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_use_lifo': config['DB_POOL_LIFO'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'] and not pgbouncer,
+    }
+
+    connect_args = {}
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if pgbouncer and is_async:
+        # Server-side prepared statements do not survive a change of backend connection
+        connect_args['statement_cache_size'] = 0
+        connect_args['prepared_statement_name_func'] = lambda: f'__asyncpg_{uuid.uuid4()}__'
+    elif timeout and not pgbouncer:
+        if is_async:
+            connect_args['server_settings'] = {'statement_timeout': str(timeout)}
+        else:
+            connect_args['options'] = f'-c statement_timeout={timeout}'
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+def async_database_url(url, config):
+    """Point a postgresql:// URL at the asyncpg driver"""
+    url = make_url(url).set(drivername='postgresql+asyncpg')
+    # libpq's sslmode is spelled ssl by asyncpg
+    if 'sslmode' in url.query:
+        url = url.update_query_dict({'ssl': url.query['sslmode']}).difference_update_query(['sslmode'])
+    if config['DB_PGBOUNCER']:
+        url = url.update_query_dict({'prepared_statement_cache_size': '0'})
+    return url
+
+
+def set_transaction_timeout(engine, timeout):
+    """SET LOCAL statement_timeout at the start of every transaction on engine"""
+    statement = f'SET LOCAL statement_timeout = {int(timeout)}'
+
+    @event.listens_for(engine, 'begin')
+    def begin(conn):
+        conn.exec_driver_sql(statement)
+
+
+def configure_engine(engine, config):
+    """Engine hooks for the DB_* settings; pass the sync engine of an AsyncEngine"""
+    if config['DB_PGBOUNCER'] and config['DB_STATEMENT_TIMEOUT']:
+        set_transaction_timeout(engine, config['DB_STATEMENT_TIMEOUT'])
+
+
+def pool_stats(pool):
+    """Pool occupancy and checkout wait counters for this worker"""
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    stats = {
+        'pool_class': type(pool).__name__,
+        'size': pool.size(),
+        'max_overflow': pool._max_overflow,
+        'checked_out': checked_out,
+        'checked_in': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'saturation': round(checked_out / capacity, 4) if capacity else None,
+    }
+    wait_stats = getattr(pool, 'wait_stats', None)
+    if wait_stats:
+        stats.update({
+            'checkouts': wait_stats.checkouts,
+            'timeouts': wait_stats.timeouts,
+            'wait_seconds_total': round(wait_stats.wait_seconds_total, 6),
+            'wait_seconds_avg': round(wait_stats.wait_seconds_total / wait_stats.checkouts, 6)
+            if wait_stats.checkouts else None,
+            'wait_seconds_max': round(wait_stats.wait_seconds_max, 6),
+        })
+    return stats
+
+
+def init_app(app):
+    """Attach the engine hooks; call inside an app context after db.init_app"""
+    for engine in app.extensions['sqlalchemy'].engines.values():
+        configure_engine(engine, app.config)
+
+
+def dispose_engines(app):
+    """Forget pooled connections inherited from the parent process, leaving them open for it"""
+    with app.app_context():
+        for engine in app.extensions['sqlalchemy'].engines.values():
+            engine.dispose(close=False)
+
+
+def get_pool_stats():
+    """Stats of the primary pool, plus each replica pool when replicas are configured"""
+    engines = current_app.extensions['sqlalchemy'].engines
+    stats = pool_stats(engines[None].pool)
+    replicas = {key: pool_stats(engine.pool) for key, engine in engines.items() if key is not None}
+    if replicas:
+        stats['replicas'] = replicas
+    return stats
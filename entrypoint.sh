@@ -9,5 +9,14 @@ done
 
 echo "Database is ready!"
 
+# Apply schema migrations and create the admin token, once per container start
+python bootstrap.py || exit 1
+
+# Drop metric files left by workers of a previous run
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Start the application
 exec "$@"
\ No newline at end of file
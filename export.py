@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+
+def export_value(value):
+    """Render a column value the same way DataRecord.to_dict does"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_header(keys, export_format):
+    """Leading chunk of an export: the CSV header row, nothing for NDJSON"""
+    if export_format != 'csv':
+        return b''
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(keys)
+    return buffer.getvalue().encode('utf-8')
+
+
+def encode_rows(keys, rows, export_format):
+    """Encode one fetched batch of row tuples as a single chunk"""
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([export_value(value) for value in row])
+        return buffer.getvalue().encode('utf-8')
+
+    return ''.join(
+        json.dumps(dict(zip(keys, row)), default=export_value, ensure_ascii=False) + '\n'
+        for row in rows
+    ).encode('utf-8')
+
+
+def write_export(result, export_format):
+    """Yield encoded chunks for a streamed result, one chunk per fetched batch"""
+    keys = list(result.keys())
+    header = encode_header(keys, export_format)
+    if header:
+        yield header
+    for rows in result.partitions():
+        yield encode_rows(keys, rows, export_format)
@@ -0,0 +1,327 @@
+"""Group commit for single-record creates and updates.
+
+With GROUP_COMMIT_WINDOW_MS > 0, POST /api/records and PUT /api/records/<id>
+hand their write to a GroupCommitter instead of committing on their own. The
+first write of a batch waits up to the window (or until GROUP_COMMIT_MAX_BATCH
+writes have joined) and then applies the whole batch in one transaction with
+a single commit, so concurrent writers share one WAL flush.
+
+Creates go in as one multi-row INSERT and updates follow in id order. A
+write the database rejects is retried in a savepoint of its own, so it fails
+only its own request; a failed commit fails every write of the batch. A
+deadlock with another batch rolls the batch back and runs it again.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from models import DataRecord
+
+# SQLSTATEs after which a whole batch is run again: deadlock, serialization failure
+RETRY_SQLSTATES = ('40P01', '40001')
+MAX_ATTEMPTS = 3
+
+# Fields a PUT may change, as in update_record
+UPDATE_FIELDS = ('wiki_id', 'unit_id', 'title', 'content', 'category', 'is_active')
+
+
+class PendingWrite:
+    """One create or update waiting for its batch, and its outcome"""
+
+    def __init__(self, kind, values, record_id=None, wiki_id=None):
+        self.kind = kind
+        self.values = values
+        self.record_id = record_id
+        # Lookup hint of PUT ?wiki_id=, see api_routes.where_record
+        self.wiki_id = wiki_id
+        self.submitted = time.perf_counter()
+        self.reset()
+
+    def reset(self):
+        self.row = None
+        self.previous = None
+        self.error = None
+
+    @property
+    def found(self):
+        return self.row is not None
+
+    def record(self):
+        """The written record as a detached DataRecord, for to_dict()"""
+        return DataRecord(**self.row._mapping)
+
+    def affected(self):
+        """(id, wiki_id, unit_id) before and after the write, for cache invalidation"""
+        rows = [(self.row.id, self.row.wiki_id, self.row.unit_id)]
+        if self.previous is not None:
+            rows.insert(0, tuple(self.previous))
+        return rows
+
+
+def create_statement():
+    """Multi-row INSERT returning the new records in parameter order"""
+    return insert(DataRecord).returning(*DataRecord.columns(), sort_by_parameter_order=True)
+
+
+def previous_statement(write):
+    """Lock the record an update targets and read the values invalidation needs"""
+    stmt = select(DataRecord.id, DataRecord.wiki_id, DataRecord.unit_id).where(DataRecord.id == write.record_id)
+    if write.wiki_id is not None:
+        stmt = stmt.where(DataRecord.wiki_id == write.wiki_id)
+    return stmt.with_for_update()
+
+
+def update_statement(write):
+    """UPDATE of the changed fields; a body without any re-reads the record as update_record would"""
+    if not write.values:
+        return select(*DataRecord.columns()).where(DataRecord.id == write.record_id)
+    return (
+        update(DataRecord)
+        .where(DataRecord.id == write.record_id)
+        .values(**write.values)
+        .returning(*DataRecord.columns())
+    )
+
+
+def is_retryable(error):
+    return getattr(getattr(error, 'orig', None), 'pgcode', None) in RETRY_SQLSTATES
+
+
+def plan(writes):
+    """Batch order: all creates in one group, then one group per update in id order"""
+    creates = [write for write in writes if write.kind == 'create']
+    updates = sorted((write for write in writes if write.kind == 'update'), key=lambda write: write.record_id)
+    return ([creates] if creates else []) + [[write] for write in updates]
+
+
+class Batch:
+    def __init__(self, full_event):
+        self.writes = []
+        self.full = full_event
+
+
+class GroupCommitStats:
+    """Observers called with (batch size, seconds each write waited, seconds the batch took)"""
+
+    def __init__(self):
+        self.observers = []
+
+    def observe(self, writes, started, finished):
+        waits = [started - write.submitted for write in writes]
+        for observer in self.observers:
+            observer(len(writes), waits, finished - started)
+
+
+class GroupCommitter(GroupCommitStats):
+    """Coalesces the single-record writes of one process's request threads.
+
+    No background thread: the request that opens a batch leads it, waiting
+    out the window and committing for everyone, while the others block on
+    their write's event.
+    """
+
+    def __init__(self, window_ms, max_batch):
+        super().__init__()
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._batch = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def submit(self, write):
+        """Apply write with the batch it joins; returns once that batch has committed"""
+        write.done = threading.Event()
+        with self._lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = Batch(threading.Event())
+            batch.writes.append(write)
+            if len(batch.writes) >= self.max_batch:
+                self._batch = None
+                batch.full.set()
+        if not leader:
+            write.done.wait()
+            return write
+        batch.full.wait(self.window)
+        with self._lock:
+            if self._batch is batch:
+                self._batch = None
+        self.run(batch.writes)
+        return write
+
+    def run(self, writes):
+        started = time.perf_counter()
+        engine = current_app.extensions['sqlalchemy'].engine
+        try:
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                for write in writes:
+                    write.reset()
+                try:
+                    with engine.begin() as conn:
+                        for group in plan(writes):
+                            if not self._apply(conn, group) and len(group) > 1:
+                                for write in group:
+                                    self._apply(conn, [write])
+                    break
+                except SQLAlchemyError as e:
+                    if is_retryable(e) and attempt < MAX_ATTEMPTS:
+                        current_app.logger.warning(f"Retrying group commit of {len(writes)} writes: {str(e)}")
+                        continue
+                    current_app.logger.error(f"Group commit of {len(writes)} writes failed: {str(e)}")
+                    for write in writes:
+                        write.error = e
+                    break
+        finally:
+            self.observe(writes, started, time.perf_counter())
+            for write in writes:
+                write.done.set()
+
+    def _apply(self, conn, group):
+        """Run a group in a savepoint; False when the database rejected it"""
+        try:
+            with conn.begin_nested():
+                if group[0].kind == 'create':
+                    rows = conn.execute(create_statement(), [write.values for write in group]).all()
+                    for write, row in zip(group, rows):
+                        write.row = row
+                else:
+                    write = group[0]
+                    write.previous = conn.execute(previous_statement(write)).first()
+                    if write.previous is not None:
+                        write.row = conn.execute(update_statement(write)).one()
+            return True
+        except SQLAlchemyError as e:
+            if is_retryable(e):
+                raise
+            for write in group:
+                write.reset()
+                if len(group) == 1:
+                    write.error = e
+            return False
+
+
+class AsyncGroupCommitter(GroupCommitStats):
+    """GroupCommitter counterpart for the ASGI app: batches the writes of one event loop"""
+
+    def __init__(self, engine, window_ms, max_batch, logger):
+        super().__init__()
+        self.engine = engine
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.logger = logger
+        self._batch = None
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    async def submit(self, write):
+        write.done = asyncio.Event()
+        batch = self._batch
+        leader = batch is None
+        if leader:
+            batch = self._batch = Batch(asyncio.Event())
+        batch.writes.append(write)
+        if len(batch.writes) >= self.max_batch:
+            self._batch = None
+            batch.full.set()
+        if not leader:
+            await write.done.wait()
+            return write
+        try:
+            await asyncio.wait_for(batch.full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        if self._batch is batch:
+            self._batch = None
+        await self.run(batch.writes)
+        return write
+
+    async def run(self, writes):
+        started = time.perf_counter()
+        try:
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                for write in writes:
+                    write.reset()
+                try:
+                    async with self.engine.begin() as conn:
+                        for group in plan(writes):
+                            if not await self._apply(conn, group) and len(group) > 1:
+                                for write in group:
+                                    await self._apply(conn, [write])
+                    break
+                except SQLAlchemyError as e:
+                    if is_retryable(e) and attempt < MAX_ATTEMPTS:
+                        self.logger.warning(f"Retrying group commit of {len(writes)} writes: {str(e)}")
+                        continue
+                    self.logger.error(f"Group commit of {len(writes)} writes failed: {str(e)}")
+                    for write in writes:
+                        write.error = e
+                    break
+        finally:
+            self.observe(writes, started, time.perf_counter())
+            for write in writes:
+                write.done.set()
+
+    async def _apply(self, conn, group):
+        try:
+            async with conn.begin_nested():
+                if group[0].kind == 'create':
+                    rows = (await conn.execute(create_statement(), [write.values for write in group])).all()
+                    for write, row in zip(group, rows):
+                        write.row = row
+                else:
+                    write = group[0]
+                    write.previous = (await conn.execute(previous_statement(write))).first()
+                    if write.previous is not None:
+                        write.row = (await conn.execute(update_statement(write))).one()
+            return True
+        except SQLAlchemyError as e:
+            if is_retryable(e):
+                raise
+            for write in group:
+                write.reset()
+                if len(group) == 1:
+                    write.error = e
+            return False
+
+
+def create_values(data, title):
+    """Column values of a new record from a validated POST body"""
+    now = datetime.utcnow()
+    return {
+        'wiki_id': data.get('wiki_id'),
+        'unit_id': data.get('unit_id'),
+        'title': title,
+        'content': data.get('content', ''),
+        'category': data.get('category'),
+        'is_active': data.get('is_active', True),
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def update_values(data, title):
+    """Column values a validated PUT body changes; updated_at is set by the model's onupdate"""
+    values = {field: data[field] for field in UPDATE_FIELDS if field in data}
+    if 'title' in values:
+        values['title'] = title
+    return values
+
+
+def init_app(app):
+    app.extensions['group_committer'] = GroupCommitter(
+        window_ms=app.config['GROUP_COMMIT_WINDOW_MS'],
+        max_batch=app.config['GROUP_COMMIT_MAX_BATCH'],
+    )
+
+
+def get_group_committer():
+    return current_app.extensions['group_committer']
@@ -0,0 +1,45 @@
+# Gunicorn settings; loaded automatically from the working directory
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+# gthread (default) or gevent keep client connections open between requests;
+# sync workers close every connection after one response
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Requests served concurrently by one gthread worker; keep within DB_POOL_SIZE + DB_MAX_OVERFLOW
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+# gevent greenlets per worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+# Seconds an idle keep-alive connection stays open; keep below the load balancer's idle timeout
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# Import the app and models once in the master and fork ready workers from it.
+# gevent workers must patch the standard library before the app is imported,
+# so they always load it after the fork
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true' and worker_class != 'gevent'
+
+
+def on_starting(server):
+    """Warn when the per-process response cache would serve stale bodies across workers"""
+    if server.cfg.workers > 1 and os.environ.get('CACHE_BACKEND') == 'memory':
+        server.log.warning(
+            'CACHE_BACKEND=memory with %d workers: writes only invalidate the cache of the worker '
+            'that handled them; use CACHE_BACKEND=redis', server.cfg.workers
+        )
+
+
+def post_fork(server, worker):
+    """Give the worker pools of its own and make psycopg2 yield to other greenlets under gevent"""
+    if server.cfg.preload_app:
+        import db_pool
+        db_pool.dispose_engines(server.app.wsgi())
+    if server.cfg.worker_class_str == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def child_exit(server, worker):
+    """Drop live gauges of a dead worker from the shared Prometheus metrics"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,241 @@
+"""Postgres-backed queue for bulk record operations.
+
+Usage:
+    python worker.py            # run JOB_WORKERS worker threads until SIGTERM
+
+POST /api/records/bulk queues id lists longer than BULK_SYNC_MAX_IDS as a
+bulk_jobs row and answers 202. Workers claim jobs with FOR UPDATE SKIP LOCKED
+and apply JOB_CHUNK_SIZE ids per transaction, committing progress with each
+chunk, so a stopped or crashed worker's job resumes where it left off once its
+lease expires. GET /api/jobs/<id> reports the progress.
+"""
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import Integer, and_, any_, delete, func, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from models import BulkJob, DataRecord, db
+from multiget import MAX_RECORD_ID
+
+# action -> (is_active value, past tense for messages); None deletes
+BULK_ACTIONS = {
+    'delete': (None, 'deleted'),
+    'activate': (True, 'activated'),
+    'deactivate': (False, 'deactivated'),
+}
+
+
+def check_record_ids(value, max_ids):
+    """Validate a record_ids list; returns (sorted unique ids, None) or (None, (error, status))"""
+    if not value:
+        return None, ({'error': 'No record IDs provided'}, 400)
+    if not isinstance(value, list) or any(isinstance(i, bool) or not isinstance(i, int) for i in value):
+        return None, ({
+            'error': 'Invalid record IDs',
+            'message': 'record_ids must be a list of integers'
+        }, 400)
+    if any(abs(i) > MAX_RECORD_ID for i in value):
+        return None, ({
+            'error': 'Invalid record IDs',
+            'message': f'record_ids must be between {-MAX_RECORD_ID - 1} and {MAX_RECORD_ID}'
+        }, 400)
+    # Sorted so concurrent chunks lock data_records rows in the same order
+    ids = sorted(set(value))
+    if len(ids) > max_ids:
+        return None, ({
+            'error': 'Too many record IDs',
+            'message': f'At most {max_ids} record IDs per bulk operation'
+        }, 413)
+    return ids, None
+
+
+def bulk_statement(action, ids):
+    """DELETE or UPDATE of the given ids, returning (id, wiki_id, unit_id) for cache invalidation.
+
+    The ids travel as one array parameter (= ANY), not one bind per id.
+    """
+    is_active, _ = BULK_ACTIONS[action]
+    stmt = delete(DataRecord) if action == 'delete' else update(DataRecord).values(is_active=is_active)
+    return (
+        stmt.where(DataRecord.id == any_(literal(ids, ARRAY(Integer))))
+        .returning(DataRecord.id, DataRecord.wiki_id, DataRecord.unit_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def enqueue_statement(action, ids, token_id=None):
+    """INSERT of a queued job, returning the columns of BulkJob.to_dict()"""
+    return (
+        insert(BulkJob)
+        .values(action=action, record_ids=ids, total=len(ids), token_id=token_id)
+        .returning(BulkJob)
+    )
+
+
+def claim_statement(worker_id, lease_seconds):
+    """Take the oldest queued job, or a running one whose worker stopped heartbeating"""
+    now = datetime.utcnow()
+    candidate = (
+        select(BulkJob.id)
+        .where(or_(
+            BulkJob.status == 'queued',
+            and_(BulkJob.status == 'running', BulkJob.heartbeat_at < now - timedelta(seconds=lease_seconds))
+        ))
+        .order_by(BulkJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        update(BulkJob)
+        .where(BulkJob.id == candidate)
+        .values(
+            status='running',
+            worker_id=worker_id,
+            attempts=BulkJob.attempts + 1,
+            started_at=func.coalesce(BulkJob.started_at, now),
+            heartbeat_at=now
+        )
+        .returning(BulkJob.id, BulkJob.attempts)
+    )
+
+
+def finish_statement(job_id, worker_id, status, error=None, refund_attempt=False):
+    """Hand a job back to the queue or close it, if this worker still holds it.
+
+    refund_attempt takes back the attempt the claim counted, for jobs handed
+    back on shutdown, so rolling restarts do not use up JOB_MAX_ATTEMPTS.
+    """
+    values = {'status': status, 'worker_id': None, 'error': error}
+    if refund_attempt:
+        values['attempts'] = BulkJob.attempts - 1
+    if status != 'queued':
+        values['finished_at'] = datetime.utcnow()
+    return (
+        update(BulkJob)
+        .where(BulkJob.id == job_id, BulkJob.worker_id == worker_id, BulkJob.status == 'running')
+        .values(**values)
+    )
+
+
+def run_chunk(conn, job_id, worker_id, chunk_size):
+    """Apply the next chunk of a claimed job in the caller's transaction.
+
+    Returns (affected rows, done), or None when the job was reclaimed by
+    another worker after this one's lease expired.
+    """
+    # The job row lock fences the chunk: a worker whose lease was taken over finds no row
+    job = conn.execute(
+        select(
+            BulkJob.action, BulkJob.processed, BulkJob.total,
+            # Postgres array slices are 1-based and inclusive
+            BulkJob.record_ids[BulkJob.processed + 1:BulkJob.processed + chunk_size]
+        )
+        .where(BulkJob.id == job_id, BulkJob.worker_id == worker_id, BulkJob.status == 'running')
+        .with_for_update()
+    ).first()
+    if job is None:
+        return None
+    action, processed, total, ids = job
+    affected = conn.execute(bulk_statement(action, ids)).all() if ids else []
+    processed = min(processed + chunk_size, total)
+    done = processed >= total
+    now = datetime.utcnow()
+    conn.execute(
+        update(BulkJob)
+        .where(BulkJob.id == job_id)
+        .values(
+            processed=processed,
+            affected=BulkJob.affected + len(affected),
+            heartbeat_at=now,
+            status='succeeded' if done else 'running',
+            worker_id=None if done else worker_id,
+            finished_at=now if done else None
+        )
+    )
+    return affected, done
+
+
+class JobWorker:
+    """Runs queued bulk jobs in a pool of threads until stop() is called"""
+
+    def __init__(self, app):
+        self.app = app
+        self.threads = app.config['JOB_WORKERS']
+        self.chunk_size = app.config['JOB_CHUNK_SIZE']
+        self.poll_interval = app.config['JOB_POLL_INTERVAL']
+        self.lease_seconds = app.config['JOB_LEASE_SECONDS']
+        self.max_attempts = app.config['JOB_MAX_ATTEMPTS']
+        self._stop = threading.Event()
+
+    def run(self):
+        """Start the worker threads and block until they have all stopped"""
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(target=self._loop, args=(f'{prefix}:{n}',), name=f'job-worker-{n}')
+            for n in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def stop(self, *_):
+        """Finish the current chunk, hand unfinished jobs back to the queue and exit"""
+        self._stop.set()
+
+    def _loop(self, worker_id):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    claimed = self._claim(worker_id)
+                except Exception as e:
+                    self.app.logger.error(f"Error claiming bulk job: {str(e)}")
+                    claimed = None
+                if claimed is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self._process(*claimed, worker_id)
+
+    def _claim(self, worker_id):
+        with db.engine.begin() as conn:
+            claimed = conn.execute(claim_statement(worker_id, self.lease_seconds)).first()
+            if claimed is not None and claimed.attempts > self.max_attempts:
+                conn.execute(finish_statement(
+                    claimed.id, worker_id, 'failed', f'Gave up after {self.max_attempts} attempts'
+                ))
+                self.app.logger.error(f"Bulk job {claimed.id} failed after {self.max_attempts} attempts")
+                return None
+        return claimed
+
+    def _process(self, job_id, attempts, worker_id):
+        from api_routes import invalidate_records
+
+        self.app.logger.info(f"Bulk job {job_id} claimed by {worker_id} (attempt {attempts})")
+        while not self._stop.is_set():
+            try:
+                with db.engine.begin() as conn:
+                    result = run_chunk(conn, job_id, worker_id, self.chunk_size)
+            except Exception as e:
+                self.app.logger.error(f"Error in bulk job {job_id}: {str(e)}")
+                status = 'failed' if attempts >= self.max_attempts else 'queued'
+                self._finish(job_id, worker_id, status, str(e))
+                return
+            if result is None:
+                self.app.logger.warning(f"Bulk job {job_id} was taken over by another worker")
+                return
+            affected, done = result
+            invalidate_records(affected)
+            if done:
+                self.app.logger.info(f"Bulk job {job_id} finished")
+                return
+        self._finish(job_id, worker_id, 'queued', refund_attempt=True)
+
+    def _finish(self, job_id, worker_id, status, error=None, refund_attempt=False):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(finish_statement(job_id, worker_id, status, error, refund_attempt))
+        except Exception as e:
+            self.app.logger.error(f"Error releasing bulk job {job_id}: {str(e)}")
+
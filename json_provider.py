@@ -0,0 +1,55 @@
+import json
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency, see pyproject extras
+    orjson = None
+
+
+def default(obj):
+    """Serialize dates as ISO 8601, like DataRecord.to_dict does, then defer to Flask"""
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+
+def dumps_bytes(obj):
+    """Serialize to compact, key-sorted UTF-8 JSON outside a Flask app"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, default=default, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson when installed, the stdlib json module otherwise.
+    
+    Both paths sort keys and render datetimes as ISO 8601, so responses are
+    the same whichever backend is available.
+    """
+
+    default = staticmethod(default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._options()
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=self.default, option=option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _options(self):
+        return orjson.OPT_SORT_KEYS if self.sort_keys else 0
@@ -0,0 +1,210 @@
+import os
+import time
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from auth import require_auth
+from cache import get_response_cache
+from changes import lag_statement
+from group_commit import get_group_committer
+from models import db
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # optional dependency, see pyproject extras
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Metrics:
+    """Prometheus metrics of one process; values are merged across gunicorn workers at scrape time"""
+
+    def __init__(self):
+        self.requests = Counter(
+            'http_requests_total', 'HTTP requests by route and status', ['method', 'route', 'status']
+        )
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Time spent in the request handler', ['method', 'route'],
+            buckets=LATENCY_BUCKETS
+        )
+        self.request_queries = Histogram(
+            'http_request_db_queries', 'Database queries per request', ['route'], buckets=QUERY_COUNT_BUCKETS
+        )
+        self.request_db_duration = Histogram(
+            'http_request_db_seconds', 'Database time per request', ['route'], buckets=LATENCY_BUCKETS
+        )
+        self.query_duration = Histogram(
+            'db_query_duration_seconds', 'Duration of single database queries', ['pool'], buckets=QUERY_BUCKETS
+        )
+        self.pool_wait = Histogram(
+            'db_pool_checkout_wait_seconds', 'Time waited for a pooled connection', buckets=POOL_WAIT_BUCKETS
+        )
+        self.pool_timeouts = Counter('db_pool_checkout_timeouts_total', 'Pool checkouts that timed out')
+        self.pool_checked_out = Gauge(
+            'db_pool_checked_out', 'Connections checked out of the pool', ['pool'], multiprocess_mode='livesum'
+        )
+        self.pool_capacity = Gauge(
+            'db_pool_capacity', 'Pool size plus max overflow', ['pool'], multiprocess_mode='livesum'
+        )
+        self.cache_events = Counter(
+            'response_cache_events_total', 'Response cache hits, misses, invalidations and errors', ['event']
+        )
+        self.group_commit_batch_size = Histogram(
+            'group_commit_batch_size', 'Writes applied per group commit', buckets=BATCH_SIZE_BUCKETS
+        )
+        self.group_commit_wait = Histogram(
+            'group_commit_wait_seconds', 'Time a write waited for its group commit batch to start',
+            buckets=POOL_WAIT_BUCKETS
+        )
+        self.group_commit_duration = Histogram(
+            'group_commit_duration_seconds', 'Time to apply and commit one group commit batch', buckets=QUERY_BUCKETS
+        )
+        self.changes_lag = Gauge(
+            'record_changes_lag_seconds', 'Age of the oldest open writing transaction, which holds back the change feed',
+            multiprocess_mode='mostrecent'
+        )
+
+
+_metrics = None
+
+
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
+
+
+def pool_name(bind_key):
+    return bind_key or 'primary'
+
+
+def observe_queries(engine, pool):
+    """Time every cursor execution on engine, per query and per request"""
+    metrics = get_metrics()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+        metrics.query_duration.labels(pool).observe(elapsed)
+        if has_request_context():
+            g.db_queries = g.get('db_queries', 0) + 1
+            g.db_seconds = g.get('db_seconds', 0.0) + elapsed
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        starts = context.connection.info.get('query_start_time') if context.connection else None
+        if starts:
+            starts.pop()
+
+
+def start_timer():
+    g.request_start_time = time.perf_counter()
+
+
+def record_request(response):
+    """after_request hook recording latency, status and database time of the request"""
+    start = g.get('request_start_time')
+    if start is None:
+        return response
+    metrics = get_metrics()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.requests.labels(request.method, route, response.status_code).inc()
+    metrics.request_duration.labels(request.method, route).observe(time.perf_counter() - start)
+    metrics.request_queries.labels(route).observe(g.get('db_queries', 0))
+    metrics.request_db_duration.labels(route).observe(g.get('db_seconds', 0.0))
+    return response
+
+
+def observe_pool(seconds, timed_out):
+    metrics = get_metrics()
+    metrics.pool_wait.observe(seconds)
+    if timed_out:
+        metrics.pool_timeouts.inc()
+
+
+def observe_cache(name, amount):
+    get_metrics().cache_events.labels(name).inc(amount)
+
+
+def observe_group_commit(size, waits, seconds):
+    metrics = get_metrics()
+    metrics.group_commit_batch_size.observe(size)
+    for wait in waits:
+        metrics.group_commit_wait.observe(wait)
+    metrics.group_commit_duration.observe(seconds)
+
+
+def observe_changes_lag():
+    """Measure the change feed lag at scrape time; a failed query keeps the previous value"""
+    try:
+        with db.engine.connect() as conn:
+            lag = conn.execute(lag_statement()).scalar()
+    except SQLAlchemyError as e:
+        current_app.logger.warning(f"Error measuring change feed lag: {str(e)}")
+        return
+    get_metrics().changes_lag.set(lag)
+
+
+def observe_pool_occupancy(engine, pool):
+    """Track checked-out connections with pool events, so gauges are exact at any scrape.
+
+    The capacity is set on checkout rather than here: with preload_app this
+    runs in the gunicorn master, whose livesum values are not reported.
+    """
+    metrics = get_metrics()
+    checked_out = metrics.pool_checked_out.labels(pool)
+    capacity = metrics.pool_capacity.labels(pool)
+
+    @event.listens_for(engine, 'checkout')
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        capacity.set(engine.pool.size() + max(engine.pool._max_overflow, 0))
+        checked_out.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+
+def metrics_registry():
+    """Registry to scrape: merged worker files in multiprocess mode, else this process"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def init_app(app):
+    """Instrument requests, queries, the pool and the response cache and serve /metrics"""
+    if prometheus_client is None:
+        app.logger.warning('prometheus_client is not installed, /metrics is disabled')
+        return
+
+    for bind_key, engine in app.extensions['sqlalchemy'].engines.items():
+        observe_queries(engine, pool_name(bind_key))
+        observe_pool_occupancy(engine, pool_name(bind_key))
+        engine.pool.wait_stats.observers.append(observe_pool)
+    get_response_cache().observers.append(observe_cache)
+    get_group_committer().observers.append(observe_group_commit)
+
+    app.before_request(start_timer)
+    app.after_request(record_request)
+
+    @app.route('/metrics')
+    @require_auth
+    def prometheus_metrics():
+        """Prometheus exposition of request, database, pool, cache, group commit and change feed metrics"""
+        observe_changes_lag()
+        registry = metrics_registry()
+        return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
@@ -0,0 +1,160 @@
+"""Apply the SQL schema migrations in migrations/.
+
+Usage:
+    python migrate.py           # apply pending migrations
+    python migrate.py --list    # show applied and pending migrations
+
+Files are applied in name order and recorded in schema_migrations. A file
+whose first line is "-- migrate:no-transaction" runs statement by statement
+in autocommit mode, which CREATE/DROP INDEX CONCURRENTLY require.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from sqlalchemy import create_engine
+
+logger = logging.getLogger('migrate')
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / 'migrations'
+NO_TRANSACTION_MARKER = '-- migrate:no-transaction'
+
+# Serializes concurrent runners, e.g. several containers starting at once
+ADVISORY_LOCK_KEY = 4815162342
+# Seconds between attempts to take the lock while another runner holds it
+LOCK_POLL_INTERVAL = 1
+
+
+def load_migrations():
+    """Return [(version, sql)] for every migration file, in apply order"""
+    return [
+        (path.stem, path.read_text(encoding='utf-8'))
+        for path in sorted(MIGRATIONS_DIR.glob('*.sql'))
+    ]
+
+
+def split_statements(sql):
+    """Split a no-transaction migration into individual statements"""
+    statements = []
+    for chunk in re.split(r';\s*(?:\n|$)', sql):
+        lines = [line for line in chunk.splitlines() if not line.strip().startswith('--')]
+        statement = '\n'.join(lines).strip()
+        if statement:
+            statements.append(statement)
+    return statements
+
+
+CONCURRENT_INDEX_RE = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?("?[\w.]+"?)',
+    re.IGNORECASE
+)
+
+
+def concurrent_index_names(statements):
+    """Names of the indexes a migration builds with CREATE INDEX CONCURRENTLY"""
+    return [match.group(1).strip('"') for match in map(CONCURRENT_INDEX_RE.search, statements) if match]
+
+
+def drop_invalid_indexes(cursor, index_names):
+    """Drop the named indexes if an interrupted CREATE INDEX CONCURRENTLY left them INVALID.
+
+    Only the migration's own indexes are considered: an invalid index may
+    also be one that another session is still building.
+    """
+    if not index_names:
+        return
+    cursor.execute("""
+        SELECT i.indexrelid::regclass::text
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE NOT i.indisvalid AND n.nspname = current_schema() AND c.relname = ANY(%s)
+    """, (index_names,))
+    for (index_name,) in cursor.fetchall():
+        logger.warning(f"Dropping invalid index {index_name}")
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}')
+
+
+def acquire_lock(cursor):
+    """Wait for the migration lock without keeping a transaction open.
+
+    A blocking pg_advisory_lock() call is a transaction of its own, and a
+    CREATE INDEX CONCURRENTLY in the runner holding the lock waits for it to
+    end: a deadlock. Polling keeps every attempt short.
+    """
+    cursor.execute('SELECT pg_try_advisory_lock(%s)', (ADVISORY_LOCK_KEY,))
+    while not cursor.fetchone()[0]:
+        time.sleep(LOCK_POLL_INTERVAL)
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', (ADVISORY_LOCK_KEY,))
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+    """)
+    cursor.execute('SELECT version FROM schema_migrations')
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migration(conn, version, sql):
+    cursor = conn.cursor()
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        statements = split_statements(sql)
+        drop_invalid_indexes(cursor, concurrent_index_names(statements))
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute('INSERT INTO schema_migrations (version) VALUES (%s)', (version,))
+        return
+
+    conn.autocommit = False
+    try:
+        cursor.execute(sql)
+        cursor.execute('INSERT INTO schema_migrations (version) VALUES (%s)', (version,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+
+
+def upgrade(database_url=None, list_only=False):
+    """Apply pending migrations; returns the versions that were applied"""
+    database_url = database_url or os.environ.get('DATABASE_URL', 'postgresql://localhost/flask_api')
+    engine = create_engine(database_url)
+    raw = engine.raw_connection()
+    conn = raw.driver_connection
+    conn.autocommit = True
+    applied = []
+    try:
+        cursor = conn.cursor()
+        acquire_lock(cursor)
+        done = applied_versions(cursor)
+        for version, sql in load_migrations():
+            if version in done:
+                if list_only:
+                    logger.info(f"applied  {version}")
+                continue
+            if list_only:
+                logger.info(f"pending  {version}")
+                continue
+            logger.info(f"Applying migration {version}")
+            apply_migration(conn, version, sql)
+            applied.append(version)
+        cursor.execute('SELECT pg_advisory_unlock(%s)', (ADVISORY_LOCK_KEY,))
+    finally:
+        raw.close()
+        engine.dispose()
+    if not list_only:
+        logger.info(f"Schema up to date ({len(applied)} migration(s) applied)")
+    return applied
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+    upgrade(list_only='--list' in sys.argv[1:])
@@ -0,0 +1,23 @@
+-- Baseline schema, equivalent to what db.create_all() used to build.
+-- IF NOT EXISTS keeps it a no-op on databases created before migrations.
+
+CREATE TABLE IF NOT EXISTS api_tokens (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    token TEXT NOT NULL,
+    is_active BOOLEAN NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    last_used TIMESTAMP WITHOUT TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS data_records (
+    id SERIAL PRIMARY KEY,
+    wiki_id INTEGER,
+    unit_id INTEGER,
+    title VARCHAR(200) NOT NULL,
+    content TEXT,
+    category VARCHAR(100),
+    is_active BOOLEAN NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE
+);
@@ -0,0 +1,31 @@
+-- migrate:no-transaction
+-- Indexes for the record listing and token lookup access paths, built
+-- without blocking writes on a live table.
+
+-- Newest-first listing and keyset cursor over all records
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_records_created_at_id
+    ON data_records (created_at DESC, id DESC);
+
+-- Same order restricted to active records (is_active filter)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_records_active_created_at_id
+    ON data_records (created_at DESC, id DESC)
+    WHERE is_active;
+
+-- Equality filter plus newest-first order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_records_wiki_id_created_at_id
+    ON data_records (wiki_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_records_unit_id_created_at_id
+    ON data_records (unit_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_records_category_created_at_id
+    ON data_records (category, created_at DESC, id DESC);
+
+-- Single-column indexes are now covered by the composite ones above
+DROP INDEX CONCURRENTLY IF EXISTS ix_data_records_wiki_id;
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_data_records_unit_id;
+
+-- Bearer token lookup in require_auth is pure equality
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_api_tokens_token
+    ON api_tokens USING hash (token);
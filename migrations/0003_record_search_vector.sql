@@ -0,0 +1,13 @@
+-- Full-text search document for GET /api/records/search: title weighted
+-- above content, with the language-neutral 'simple' configuration so the
+-- same column serves every language in the data.
+--
+-- Adding a stored generated column rewrites data_records under an
+-- ACCESS EXCLUSIVE lock; schedule this migration for a quiet window on
+-- large tables.
+ALTER TABLE data_records
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, coalesce(content, '')), 'B')
+    ) STORED;
@@ -0,0 +1,4 @@
+-- migrate:no-transaction
+-- GIN index answering search_vector @@ tsquery without scanning the table
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_data_records_search_vector
+    ON data_records USING gin (search_vector);
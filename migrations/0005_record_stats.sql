@@ -0,0 +1,94 @@
+-- Record counts per (wiki_id, category, is_active) for GET /api/records/stats,
+-- kept current by statement-level triggers so dashboards read O(groups)
+-- rows instead of running COUNT(*) over data_records.
+--
+-- The triggers aggregate each statement's transition table, so a bulk
+-- UPDATE or import touches every affected group once. Writes to the same
+-- group serialize on its counter row until they commit.
+
+CREATE TABLE IF NOT EXISTS record_stats (
+    wiki_id INTEGER,
+    category VARCHAR(100),
+    is_active BOOLEAN NOT NULL,
+    record_count BIGINT NOT NULL DEFAULT 0,
+    CONSTRAINT uq_record_stats_group UNIQUE NULLS NOT DISTINCT (wiki_id, category, is_active)
+);
+
+CREATE OR REPLACE FUNCTION record_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Groups are upserted in key order so concurrent statements lock counter rows in the same order
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO record_stats AS s (wiki_id, category, is_active, record_count)
+        SELECT wiki_id, category, is_active, count(*)
+        FROM new_records
+        GROUP BY wiki_id, category, is_active
+        ORDER BY wiki_id, category, is_active
+        ON CONFLICT (wiki_id, category, is_active)
+        DO UPDATE SET record_count = s.record_count + excluded.record_count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO record_stats AS s (wiki_id, category, is_active, record_count)
+        SELECT wiki_id, category, is_active, -count(*)
+        FROM old_records
+        GROUP BY wiki_id, category, is_active
+        ORDER BY wiki_id, category, is_active
+        ON CONFLICT (wiki_id, category, is_active)
+        DO UPDATE SET record_count = s.record_count + excluded.record_count;
+    ELSE
+        -- Only rows that changed group move a count; title/content edits net to zero
+        INSERT INTO record_stats AS s (wiki_id, category, is_active, record_count)
+        SELECT wiki_id, category, is_active, sum(delta)
+        FROM (
+            SELECT wiki_id, category, is_active, 1 AS delta FROM new_records
+            UNION ALL
+            SELECT wiki_id, category, is_active, -1 AS delta FROM old_records
+        ) changes
+        GROUP BY wiki_id, category, is_active
+        HAVING sum(delta) <> 0
+        ORDER BY wiki_id, category, is_active
+        ON CONFLICT (wiki_id, category, is_active)
+        DO UPDATE SET record_count = s.record_count + excluded.record_count;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION record_stats_truncate() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM record_stats;
+    RETURN NULL;
+END
+$$;
+
+-- Block writes until the triggers exist and the backfill has committed
+LOCK TABLE data_records IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS record_stats_insert ON data_records;
+CREATE TRIGGER record_stats_insert
+    AFTER INSERT ON data_records
+    REFERENCING NEW TABLE AS new_records
+    FOR EACH STATEMENT EXECUTE FUNCTION record_stats_apply();
+
+DROP TRIGGER IF EXISTS record_stats_update ON data_records;
+CREATE TRIGGER record_stats_update
+    AFTER UPDATE ON data_records
+    REFERENCING OLD TABLE AS old_records NEW TABLE AS new_records
+    FOR EACH STATEMENT EXECUTE FUNCTION record_stats_apply();
+
+DROP TRIGGER IF EXISTS record_stats_delete ON data_records;
+CREATE TRIGGER record_stats_delete
+    AFTER DELETE ON data_records
+    REFERENCING OLD TABLE AS old_records
+    FOR EACH STATEMENT EXECUTE FUNCTION record_stats_apply();
+
+DROP TRIGGER IF EXISTS record_stats_truncate ON data_records;
+CREATE TRIGGER record_stats_truncate
+    AFTER TRUNCATE ON data_records
+    FOR EACH STATEMENT EXECUTE FUNCTION record_stats_truncate();
+
+DELETE FROM record_stats;
+INSERT INTO record_stats (wiki_id, category, is_active, record_count)
+SELECT wiki_id, category, is_active, count(*)
+FROM data_records
+GROUP BY wiki_id, category, is_active;
@@ -0,0 +1,26 @@
+-- Queue of bulk operations too large to run inside a request. jobs.py
+-- workers claim rows with FOR UPDATE SKIP LOCKED and apply record_ids in
+-- chunks, committing progress with each chunk.
+
+CREATE TABLE IF NOT EXISTS bulk_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    action VARCHAR(20) NOT NULL,
+    record_ids INTEGER[] NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    affected INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    token_id INTEGER,
+    error TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    started_at TIMESTAMP WITHOUT TIME ZONE,
+    heartbeat_at TIMESTAMP WITHOUT TIME ZONE,
+    finished_at TIMESTAMP WITHOUT TIME ZONE
+);
+
+-- Claim order for workers; finished jobs drop out of the index
+CREATE INDEX IF NOT EXISTS ix_bulk_jobs_pending
+    ON bulk_jobs (id)
+    WHERE status IN ('queued', 'running');
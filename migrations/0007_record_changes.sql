@@ -0,0 +1,54 @@
+-- Change log behind GET /api/records/changes: one row per inserted, updated
+-- or deleted record, written by statement-level triggers in the same
+-- transaction as the change.
+--
+-- Readers page through (txid, seq) and only return rows whose transaction
+-- is older than their snapshot's xmin, i.e. already committed or rolled
+-- back, so a transaction committing late can never land behind a cursor.
+
+CREATE TABLE IF NOT EXISTS record_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    txid BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+    record_id INTEGER NOT NULL,
+    op VARCHAR(10) NOT NULL,
+    changed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX IF NOT EXISTS ix_record_changes_txid_seq ON record_changes (txid, seq);
+-- Retention pruning
+CREATE INDEX IF NOT EXISTS ix_record_changes_changed_at ON record_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION record_changes_log() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO record_changes (record_id, op)
+        SELECT id, 'insert' FROM new_records ORDER BY id;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO record_changes (record_id, op)
+        SELECT id, 'update' FROM new_records ORDER BY id;
+    ELSE
+        INSERT INTO record_changes (record_id, op)
+        SELECT id, 'delete' FROM old_records ORDER BY id;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS record_changes_insert ON data_records;
+CREATE TRIGGER record_changes_insert
+    AFTER INSERT ON data_records
+    REFERENCING NEW TABLE AS new_records
+    FOR EACH STATEMENT EXECUTE FUNCTION record_changes_log();
+
+DROP TRIGGER IF EXISTS record_changes_update ON data_records;
+CREATE TRIGGER record_changes_update
+    AFTER UPDATE ON data_records
+    REFERENCING NEW TABLE AS new_records
+    FOR EACH STATEMENT EXECUTE FUNCTION record_changes_log();
+
+DROP TRIGGER IF EXISTS record_changes_delete ON data_records;
+CREATE TRIGGER record_changes_delete
+    AFTER DELETE ON data_records
+    REFERENCING OLD TABLE AS old_records
+    FOR EACH STATEMENT EXECUTE FUNCTION record_changes_log();
@@ -0,0 +1,51 @@
+-- Token buckets shared by all workers for the per-token rate limit
+-- (RATE_LIMIT_BACKEND=postgres). Unlogged: losing the buckets in a crash
+-- only refills them.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    token_id INTEGER PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Refill the bucket of a token for the time since its last use, then take up
+-- to p_want whole tokens. retry_after is the wait in seconds for the next
+-- token when none can be granted.
+CREATE OR REPLACE FUNCTION rate_limit_take(
+    p_token_id INTEGER,
+    p_rate DOUBLE PRECISION,
+    p_burst DOUBLE PRECISION,
+    p_want INTEGER,
+    OUT granted INTEGER,
+    OUT retry_after DOUBLE PRECISION
+)
+LANGUAGE plpgsql AS $$
+DECLARE
+    available DOUBLE PRECISION;
+    now_ts TIMESTAMP WITH TIME ZONE;
+BEGIN
+    INSERT INTO rate_limit_buckets (token_id, tokens, updated_at)
+    VALUES (p_token_id, p_burst, clock_timestamp())
+    ON CONFLICT (token_id) DO NOTHING;
+
+    SELECT tokens, updated_at INTO available, now_ts
+    FROM rate_limit_buckets
+    WHERE token_id = p_token_id
+    FOR UPDATE;
+
+    -- Read the clock after the row lock, so time spent waiting for it is refilled too
+    available := LEAST(p_burst, available + EXTRACT(EPOCH FROM clock_timestamp() - now_ts) * p_rate);
+    now_ts := clock_timestamp();
+    granted := LEAST(p_want, FLOOR(available))::INTEGER;
+    IF granted < 1 THEN
+        granted := 0;
+        retry_after := (1 - available) / p_rate;
+    ELSE
+        retry_after := 0;
+    END IF;
+
+    UPDATE rate_limit_buckets
+    SET tokens = available - granted, updated_at = now_ts
+    WHERE token_id = p_token_id;
+END
+$$;
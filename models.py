@@ -1,6 +1,8 @@
 from app import db
 from datetime import datetime
-from sqlalchemy import Text, Boolean, Integer, String, DateTime
+from sqlalchemy import Text, Boolean, BigInteger, Integer, String, DateTime, Computed
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred
 
 class ApiToken(db.Model):
     """Model for storing API tokens"""
@@ -13,22 +15,41 @@ class ApiToken(db.Model):
     created_at = db.Column(DateTime, default=datetime.utcnow)
     last_used = db.Column(DateTime)
     
+    __table_args__ = (
+        db.Index('ix_api_tokens_token', 'token', postgresql_using='hash'),
+    )
+    
     def __repr__(self):
         return f'<ApiToken {self.name}>'
 
+# Columns exposed by the API, in to_dict() order
+RECORD_FIELDS = (
+    'id', 'wiki_id', 'unit_id', 'title', 'content', 'category',
+    'is_active', 'created_at', 'updated_at'
+)
+
+# Text search configuration of DataRecord.search_vector; queries must use the same one
+SEARCH_CONFIG = 'simple'
+
 class DataRecord(db.Model):
     """Generic model for storing data records"""
     __tablename__ = 'data_records'
     
     id = db.Column(Integer, primary_key=True)
-    wiki_id = db.Column(Integer, nullable=True, index=True)
-    unit_id = db.Column(Integer, nullable=True, index=True)
+    wiki_id = db.Column(Integer, nullable=True)
+    unit_id = db.Column(Integer, nullable=True)
     title = db.Column(String(200), nullable=False)
     content = db.Column(Text)
     category = db.Column(String(100))
     is_active = db.Column(Boolean, default=True, nullable=False)
     created_at = db.Column(DateTime, default=datetime.utcnow)
     updated_at = db.Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Maintained by Postgres (migrations/0003); deferred so record loads never read it
+    search_vector = deferred(db.Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(content, '')), 'B')",
+        persisted=True
+    )))
     
     def to_dict(self):
         """Convert model to dictionary for JSON serialization"""
@@ -44,5 +65,95 @@ class DataRecord(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    @classmethod
+    def columns(cls, fields=RECORD_FIELDS):
+        """Column attributes for the given API fields, for selecting plain row tuples"""
+        return [getattr(cls, field) for field in fields]
+    
     def __repr__(self):
         return f'<DataRecord {self.title}>'
+
+
+# Indexes for the listing access paths; kept in sync with migrations/
+db.Index('ix_data_records_created_at_id', DataRecord.created_at.desc(), DataRecord.id.desc())
+db.Index(
+    'ix_data_records_active_created_at_id',
+    DataRecord.created_at.desc(), DataRecord.id.desc(),
+    postgresql_where=DataRecord.is_active
+)
+db.Index('ix_data_records_wiki_id_created_at_id', DataRecord.wiki_id, DataRecord.created_at.desc(), DataRecord.id.desc())
+db.Index('ix_data_records_unit_id_created_at_id', DataRecord.unit_id, DataRecord.created_at.desc(), DataRecord.id.desc())
+db.Index('ix_data_records_category_created_at_id', DataRecord.category, DataRecord.created_at.desc(), DataRecord.id.desc())
+db.Index('ix_data_records_search_vector', DataRecord.search_vector, postgresql_using='gin')
+
+
+# Record counts per (wiki_id, category, is_active), maintained by triggers on
+# data_records (migrations/0005); read by GET /api/records/stats
+record_stats = db.Table(
+    'record_stats',
+    db.Column('wiki_id', Integer),
+    db.Column('category', String(100)),
+    db.Column('is_active', Boolean, nullable=False),
+    db.Column('record_count', BigInteger, nullable=False, default=0),
+    db.UniqueConstraint('wiki_id', 'category', 'is_active', name='uq_record_stats_group', postgresql_nulls_not_distinct=True),
+)
+
+
+
+# One row per inserted, updated or deleted record, written by triggers on
+# data_records (migrations/0007); read by GET /api/records/changes
+record_changes = db.Table(
+    'record_changes',
+    db.Column('seq', BigInteger, primary_key=True),
+    db.Column('txid', BigInteger, nullable=False),
+    db.Column('record_id', Integer, nullable=False),
+    db.Column('op', String(10), nullable=False),
+    db.Column('changed_at', DateTime, nullable=False),
+    db.Index('ix_record_changes_txid_seq', 'txid', 'seq'),
+    db.Index('ix_record_changes_changed_at', 'changed_at'),
+)
+
+class BulkJob(db.Model):
+    """Bulk record operation queued for the jobs.py workers"""
+    __tablename__ = 'bulk_jobs'
+    
+    id = db.Column(BigInteger, primary_key=True)
+    action = db.Column(String(20), nullable=False)
+    # Deferred: status reads never load the id list; workers slice it in SQL
+    record_ids = deferred(db.Column(ARRAY(Integer), nullable=False))
+    status = db.Column(String(20), nullable=False, default='queued')
+    total = db.Column(Integer, nullable=False)
+    processed = db.Column(Integer, nullable=False, default=0)
+    affected = db.Column(Integer, nullable=False, default=0)
+    attempts = db.Column(Integer, nullable=False, default=0)
+    worker_id = db.Column(Text)
+    token_id = db.Column(Integer)
+    error = db.Column(Text)
+    created_at = db.Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(DateTime)
+    heartbeat_at = db.Column(DateTime)
+    finished_at = db.Column(DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_bulk_jobs_pending', 'id', postgresql_where=db.text("status IN ('queued', 'running')")),
+    )
+    
+    def to_dict(self):
+        """Convert job status to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'action': self.action,
+            'status': self.status,
+            'total': self.total,
+            'processed': self.processed,
+            'affected': self.affected,
+            'progress': round(self.processed / self.total, 4) if self.total else 1.0,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<BulkJob {self.id} {self.action} {self.status}>'
@@ -0,0 +1,43 @@
+from sqlalchemy import Integer, any_, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from models import DataRecord
+
+# Largest value of the integer id column; larger ids cannot exist
+MAX_RECORD_ID = 2 ** 31 - 1
+
+
+def check_ids(value, max_ids):
+    """Validate an ids list; returns (unique ids in request order, None) or (None, (error, status))"""
+    if not isinstance(value, list) or not value:
+        return None, ({
+            'error': 'Invalid ids',
+            'message': 'ids must be a non-empty list of integers'
+        }, 400)
+    if any(isinstance(i, bool) or not isinstance(i, int) for i in value):
+        return None, ({
+            'error': 'Invalid ids',
+            'message': 'ids must be a list of integers'
+        }, 400)
+    ids = list(dict.fromkeys(value))
+    if len(ids) > max_ids:
+        return None, ({
+            'error': 'Too many ids',
+            'message': f'At most {max_ids} ids per request'
+        }, 413)
+    return ids, None
+
+
+def multiget_statement(ids, fields):
+    """One query for every requested record, the ids bound as a single array"""
+    selected = tuple(dict.fromkeys(('id',) + fields))
+    ids = [i for i in ids if 0 < i <= MAX_RECORD_ID]
+    return select(*DataRecord.columns(selected)).where(DataRecord.id == any_(literal(ids, ARRAY(Integer))))
+
+
+def multiget_payload(rows, ids, fields):
+    """Records in request order, plus the ids that matched no record"""
+    found = {row.id: row for row in rows}
+    return {
+        'records': [{field: found[i]._mapping[field] for field in fields} for i in ids if i in found],
+        'missing': [i for i in ids if i not in found]
+    }
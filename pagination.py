@@ -0,0 +1,123 @@
+import base64
+import json
+import math
+from datetime import datetime
+from sqlalchemy import func, tuple_
+from models import DataRecord
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_position(values):
+    """Encode a list of JSON-serializable sort key values as an opaque cursor"""
+    raw = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_position(cursor):
+    """Inverse of encode_position"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError as e:
+        raise InvalidCursorError(f'Invalid cursor: {cursor}') from e
+    if not isinstance(values, list):
+        raise InvalidCursorError(f'Invalid cursor: {cursor}')
+    return values
+
+
+def encode_cursor(created_at, record_id):
+    """Encode the (created_at, id) position of a record as an opaque cursor"""
+    return encode_position([created_at.isoformat(), record_id])
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (created_at, id)"""
+    try:
+        created_at, record_id = decode_position(cursor)
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f'Invalid cursor: {cursor}') from e
+
+
+def order_newest_first(stmt):
+    """Apply the listing order shared by every record endpoint"""
+    return stmt.order_by(DataRecord.created_at.desc(), DataRecord.id.desc())
+
+
+def metadata_statement(stmt):
+    """(count, latest updated_at) of a filtered record select, in one aggregate"""
+    return stmt.with_only_columns(
+        func.count(DataRecord.id),
+        func.max(DataRecord.updated_at)
+    ).order_by(None)
+
+
+def count_statement(stmt):
+    return stmt.with_only_columns(func.count(DataRecord.id)).order_by(None)
+
+
+def offset_statement(stmt, page, per_page):
+    return order_newest_first(stmt).limit(per_page).offset((page - 1) * per_page)
+
+
+def offset_pagination(page, per_page, total):
+    pages = math.ceil(total / per_page) if total else 0
+    return {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': pages,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
+
+def keyset_statement(stmt, cursor, per_page):
+    """Rows after the cursor position on (created_at, id); an empty cursor starts from the newest record.
+
+    Fetches one extra row to tell whether another page follows.
+    """
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        # The plain created_at bound is implied by the row comparison, but only
+        # it lets the planner skip newer partitions of a range-partitioned table
+        stmt = stmt.where(
+            tuple_(DataRecord.created_at, DataRecord.id) < tuple_(created_at, record_id),
+            DataRecord.created_at <= created_at
+        )
+    return order_newest_first(stmt).limit(per_page + 1)
+
+
+def keyset_pagination(rows, per_page, total=None):
+    """Trim the extra row fetched by keyset_statement and build the pagination block"""
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    pagination = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_cursor': encode_cursor(rows[-1].created_at, rows[-1].id) if has_next else None
+    }
+    if total is not None:
+        pagination['total'] = total
+    return rows, pagination
+
+
+def listing_metadata(session, stmt):
+    """Return (count, latest updated_at) of the filtered set"""
+    return session.execute(metadata_statement(stmt)).one()
+
+
+def paginate_offset(session, stmt, page, per_page, total):
+    """Page-number pagination; total comes from listing_metadata"""
+    rows = session.execute(offset_statement(stmt, page, per_page)).all()
+    return rows, offset_pagination(page, per_page, total)
+
+
+def paginate_keyset(session, stmt, cursor, per_page, include_total=False):
+    """Keyset pagination; skips the COUNT(*) unless include_total is set"""
+    total = session.execute(count_statement(stmt)).scalar() if include_total else None
+    rows = session.execute(keyset_statement(stmt, cursor, per_page)).all()
+    return keyset_pagination(rows, per_page, total)
@@ -0,0 +1,303 @@
+"""Optional declarative partitioning of data_records.
+
+Usage:
+    python partitions.py status                         # scheme and partitions
+    python partitions.py convert hash --partitions 16   # hash partitions by wiki_id
+    python partitions.py convert range                  # monthly range partitions by created_at
+    python partitions.py create --ahead 3               # range: partitions for the next 3 months
+    python partitions.py detach data_records_p2024_01   # range: keep the rows as a standalone table
+    python partitions.py drop --before 2025-01-01       # range: drop partitions entirely before a date
+
+convert rebuilds data_records as a partitioned table in one transaction
+holding an ACCESS EXCLUSIVE lock, so run it in a maintenance window; the
+indexes and triggers of migrations/ are recreated on the new table. With
+hash partitioning, lookups filtered by wiki_id read a single partition. With
+range partitioning, newest-first listings read the newest partitions first,
+and old data is removed by dropping whole partitions instead of DELETE.
+
+Primary keys on a partitioned table must contain the partition key, and
+wiki_id and created_at are nullable, so every partition gets a primary key
+on id of its own instead. Ids stay unique through the id sequence.
+"""
+import argparse
+import logging
+import os
+import re
+from datetime import date, datetime
+from sqlalchemy import create_engine, text
+
+logger = logging.getLogger('partitions')
+
+PARENT = 'data_records'
+PARTITION_SCHEMES = {'hash': 'wiki_id', 'range': 'created_at'}
+DEFAULT_PARTITION = f'{PARENT}_default'
+RANGE_PARTITION_RE = re.compile(rf'^{PARENT}_p(\d{{4}})_(\d{{2}})$')
+
+# Serializes partition maintenance of concurrent runners (worker threads, CLI)
+ADVISORY_LOCK_KEY = 4815162343
+
+# Partition maintenance waits this long for table locks before giving up
+LOCK_TIMEOUT = '5s'
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+def month_start(value, offset=0):
+    """First day of the month offset months after value's month"""
+    months = value.year * 12 + value.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def range_partition_name(start):
+    return f'{PARENT}_p{start.year:04d}_{start.month:02d}'
+
+
+def partition_month(name):
+    """Start of the month a range partition covers, or None for other tables"""
+    match = RANGE_PARTITION_RE.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def partition_scheme(conn):
+    """'hash', 'range' or None when data_records is a plain table"""
+    strategy = conn.execute(text("""
+        SELECT p.partstrat::text FROM pg_partitioned_table p
+        WHERE p.partrelid = to_regclass(:parent)
+    """), {'parent': PARENT}).scalar()
+    return {'h': 'hash', 'r': 'range'}.get(strategy)
+
+
+def list_partitions(conn):
+    """[(name, bound, estimated rows)] of the attached partitions, in name order"""
+    return conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:parent)
+        ORDER BY c.relname
+    """), {'parent': PARENT}).all()
+
+
+def add_primary_key(conn, name):
+    conn.execute(text(f'ALTER TABLE {name} ADD PRIMARY KEY (id)'))
+
+
+def create_range_partition(conn, start):
+    """Create the partition for the month starting at start unless it exists; returns its name"""
+    name = range_partition_name(start)
+    exists = conn.execute(text('SELECT to_regclass(:name) IS NOT NULL'), {'name': name}).scalar()
+    if exists:
+        return None
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{month_start(start, 1).isoformat()}')"
+    ))
+    add_primary_key(conn, name)
+    logger.info(f"Created partition {name}")
+    return name
+
+
+def create_hash_partitions(conn, partitions):
+    for remainder in range(partitions):
+        name = f'{PARENT}_p{remainder}'
+        conn.execute(text(
+            f'CREATE TABLE {name} PARTITION OF {PARENT}_partitioned '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        ))
+
+
+def convert(conn, scheme, partitions=8, ahead=3):
+    """Rebuild data_records as a table partitioned by scheme, copying every row.
+
+    Runs in the caller's transaction. Indexes and triggers are read from the
+    old table and recreated on the new one, so the statement-level stats and
+    change log triggers keep firing for every partition.
+    """
+    if partition_scheme(conn):
+        raise ValueError(f'{PARENT} is already partitioned')
+    column = PARTITION_SCHEMES[scheme]
+    conn.execute(text(f'LOCK TABLE {PARENT} IN ACCESS EXCLUSIVE MODE'))
+    index_definitions = conn.execute(text("""
+        SELECT pg_get_indexdef(indexrelid) FROM pg_index
+        WHERE indrelid = to_regclass(:parent) AND NOT indisprimary
+    """), {'parent': PARENT}).scalars().all()
+    trigger_definitions = conn.execute(text("""
+        SELECT pg_get_triggerdef(oid) FROM pg_trigger
+        WHERE tgrelid = to_regclass(:parent) AND NOT tgisinternal
+    """), {'parent': PARENT}).scalars().all()
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:parent, 'id')"), {'parent': PARENT}).scalar()
+    columns = ', '.join(conn.execute(text("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = to_regclass(:parent) AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+        ORDER BY attnum
+    """), {'parent': PARENT}).scalars().all())
+
+    conn.execute(text(
+        f'CREATE TABLE {PARENT}_partitioned '
+        f'(LIKE {PARENT} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS) '
+        f'PARTITION BY {scheme.upper()} ({column})'
+    ))
+    if scheme == 'hash':
+        create_hash_partitions(conn, partitions)
+    conn.execute(text(f'ALTER TABLE {PARENT}_partitioned RENAME TO {PARENT}_new'))
+
+    conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY NONE'))
+    conn.execute(text(f'ALTER TABLE {PARENT} RENAME TO {PARENT}_unpartitioned'))
+    conn.execute(text(f'ALTER TABLE {PARENT}_new RENAME TO {PARENT}'))
+    if scheme == 'range':
+        oldest = conn.execute(text(f'SELECT min(created_at) FROM {PARENT}_unpartitioned')).scalar()
+        first = month_start(oldest or datetime.utcnow())
+        last = month_start(datetime.utcnow(), ahead)
+        while first <= last:
+            create_range_partition(conn, first)
+            first = month_start(first, 1)
+        # Rows without created_at, or beyond the partitions created so far
+        conn.execute(text(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT'))
+        add_primary_key(conn, DEFAULT_PARTITION)
+    else:
+        for name, _, _ in list_partitions(conn):
+            add_primary_key(conn, name)
+
+    # No triggers exist on the new table yet, so the copy leaves stats and change log alone
+    copied = conn.execute(text(
+        f'INSERT INTO {PARENT} ({columns}) SELECT {columns} FROM {PARENT}_unpartitioned'
+    )).rowcount
+    conn.execute(text(f'DROP TABLE {PARENT}_unpartitioned'))
+    conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY {PARENT}.id'))
+    for definition in index_definitions + trigger_definitions:
+        conn.execute(text(definition))
+    logger.info(f"Partitioned {PARENT} by {scheme} on {column}: {copied} rows copied")
+    return copied
+
+
+def create_ahead(conn, ahead):
+    """Make sure range partitions exist from this month through ahead months from now.
+
+    Attaching a partition locks data_records, so give up after LOCK_TIMEOUT
+    rather than queue every request behind a long-running query.
+    """
+    conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    created = []
+    for offset in range(ahead + 1):
+        name = create_range_partition(conn, month_start(datetime.utcnow(), offset))
+        if name:
+            created.append(name)
+    return created
+
+
+def detach(conn, name):
+    """Detach a range partition, keeping its rows as a standalone table.
+
+    The rows leave data_records, so they are subtracted from record_stats
+    and logged as deletes for the change feed in the same transaction. The
+    partition is locked against writes first and data_records is locked only
+    for the final DETACH.
+    """
+    conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    conn.execute(text(f'LOCK TABLE {name} IN SHARE ROW EXCLUSIVE MODE'))
+    conn.execute(text(f"""
+        INSERT INTO record_stats AS s (wiki_id, category, is_active, record_count)
+        SELECT wiki_id, category, is_active, -count(*)
+        FROM {name}
+        GROUP BY wiki_id, category, is_active
+        ORDER BY wiki_id, category, is_active
+        ON CONFLICT (wiki_id, category, is_active)
+        DO UPDATE SET record_count = s.record_count + excluded.record_count
+    """))
+    conn.execute(text(f"INSERT INTO record_changes (record_id, op) SELECT id, 'delete' FROM {name} ORDER BY id"))
+    conn.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION {name}'))
+    logger.info(f"Detached partition {name}")
+
+
+def drop_before(conn, cutoff):
+    """Detach and drop the range partitions whose whole month lies before cutoff"""
+    dropped = []
+    for name, _, _ in list_partitions(conn):
+        start = partition_month(name)
+        if start is None or month_start(start, 1) > cutoff:
+            continue
+        detach(conn, name)
+        conn.execute(text(f'DROP TABLE {name}'))
+        logger.info(f"Dropped partition {name}")
+        dropped.append(name)
+    return dropped
+
+
+def maintain(conn, ahead, retention_months):
+    """Periodic upkeep of range partitions: create upcoming months, drop expired ones.
+
+    A no-op unless data_records is range partitioned; returns (created, dropped).
+    """
+    conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+    if partition_scheme(conn) != 'range':
+        return [], []
+    created = create_ahead(conn, ahead)
+    dropped = []
+    if retention_months > 0:
+        dropped = drop_before(conn, month_start(datetime.utcnow(), -retention_months))
+    return created, dropped
+
+
+def is_lock_timeout(error):
+    """Whether a database error is lock_timeout expiring (lock_not_available)"""
+    return getattr(getattr(error, 'orig', None), 'pgcode', None) == LOCK_NOT_AVAILABLE
+
+
+def checked_partition(conn, name):
+    if partition_month(name) is None or name not in {row[0] for row in list_partitions(conn)}:
+        raise ValueError(f'{name} is not an attached monthly partition of {PARENT}')
+    return name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=f'Manage partitions of {PARENT}')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status')
+    convert_parser = commands.add_parser('convert')
+    convert_parser.add_argument('scheme', choices=PARTITION_SCHEMES)
+    convert_parser.add_argument('--partitions', type=int, default=8, help='hash partitions')
+    convert_parser.add_argument('--ahead', type=int, default=3, help='months of range partitions ahead')
+    create_parser = commands.add_parser('create')
+    create_parser.add_argument('--ahead', type=int, default=3)
+    detach_parser = commands.add_parser('detach')
+    detach_parser.add_argument('name')
+    drop_parser = commands.add_parser('drop')
+    drop_target = drop_parser.add_mutually_exclusive_group(required=True)
+    drop_target.add_argument('name', nargs='?')
+    drop_target.add_argument('--before', type=date.fromisoformat)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(os.environ.get('DATABASE_URL', 'postgresql://localhost/flask_api'))
+    try:
+        with engine.begin() as conn:
+            conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+            scheme = partition_scheme(conn)
+            if args.command == 'status':
+                logger.info(f"{PARENT}: {'partitioned by ' + scheme if scheme else 'not partitioned'}")
+                for name, bound, rows in list_partitions(conn):
+                    logger.info(f"{name:32} {bound}  ~{max(rows, 0)} rows")
+            elif args.command == 'convert':
+                convert(conn, args.scheme, args.partitions, args.ahead)
+            elif scheme != 'range':
+                raise ValueError(f'{args.command} needs {PARENT} to be range partitioned')
+            elif args.command == 'create':
+                create_ahead(conn, args.ahead)
+            elif args.command == 'detach':
+                detach(conn, checked_partition(conn, args.name))
+            elif args.name:
+                name = checked_partition(conn, args.name)
+                detach(conn, name)
+                conn.execute(text(f'DROP TABLE {name}'))
+                logger.info(f"Dropped partition {name}")
+            else:
+                drop_before(conn, args.before)
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+    try:
+        main()
+    except ValueError as e:
+        logger.error(str(e))
+        raise SystemExit(1)
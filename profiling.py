@@ -0,0 +1,262 @@
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+PROFILE_MODES = ('timings', 'cprofile', 'sample')
+
+# Request header asking for a profile of this request; honoured for admin tokens only
+PROFILE_HEADER = 'X-Profile'
+
+
+class StackSampler:
+    """Samples the call stack of one thread and aggregates it as collapsed stacks.
+
+    The output is the folded format read by flamegraph.pl and speedscope:
+    one "frame;frame;frame count" line per distinct stack.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class RequestProfile:
+    """Phase timings, and optionally a cProfile or stack-sampling capture, of one request"""
+
+    def __init__(self, requested):
+        self.requested = requested
+        self.authorized = not requested
+        self.start = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.queries = 0
+        self.profiler = None
+        self.sampler = None
+
+    def add(self, name, seconds):
+        self.phases[name] += seconds
+
+    def start_capture(self, mode, interval):
+        if mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif mode == 'sample':
+            self.sampler = StackSampler(threading.get_ident(), interval)
+            self.sampler.start()
+
+    def stop_capture(self):
+        if self.profiler:
+            self.profiler.disable()
+        if self.sampler:
+            self.sampler.stop()
+
+    def dump(self, directory, name):
+        """Write the capture, if any, and return its path"""
+        if not (self.profiler or self.sampler):
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name + ('.prof' if self.profiler else '.folded'))
+        if self.profiler:
+            self.profiler.dump_stats(path)
+        else:
+            self.sampler.dump(path)
+        return path
+
+    def timings(self):
+        """Milliseconds per phase, with the remainder of the request as "other" """
+        total = time.perf_counter() - self.start
+        timings = {name: seconds * 1000 for name, seconds in self.phases.items()}
+        timings['other'] = max(total - sum(self.phases.values()), 0) * 1000
+        timings['total'] = total * 1000
+        return timings
+
+
+def current_profile():
+    return g.get('profile') if has_request_context() else None
+
+
+@contextmanager
+def phase(name):
+    """Time a block as a named phase of the current request profile, if any"""
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    db_before = profile.phases['db']
+    try:
+        yield
+    finally:
+        # Queries inside the block are counted under db only, so phases never overlap
+        profile.add(name, time.perf_counter() - start - (profile.phases['db'] - db_before))
+
+
+def requested_mode():
+    """Profile mode asked for by the X-Profile header, or None"""
+    value = request.headers.get(PROFILE_HEADER, '').lower()
+    if not value or value in ('0', 'false'):
+        return None
+    return value if value in PROFILE_MODES else 'timings'
+
+
+def begin_profile():
+    """before_request hook: profile sampled requests and those carrying X-Profile"""
+    config = current_app.config
+    mode = requested_mode() if config['PROFILE_ADMIN_HEADER'] else None
+    if mode:
+        # Captures start only once require_auth has confirmed an admin token
+        g.profile = RequestProfile(requested=True)
+        g.profile_mode = mode
+    elif config['PROFILE_SAMPLE_RATE'] and random.random() < config['PROFILE_SAMPLE_RATE']:
+        g.profile = RequestProfile(requested=False)
+        g.profile.start_capture(config['PROFILE_MODE'], config['PROFILE_SAMPLE_INTERVAL'])
+
+
+def authorize_profile(payload):
+    """Called by require_auth: start the capture of a header-requested profile for admins"""
+    profile = current_profile()
+    if profile is None or not profile.requested or payload.get('role') != 'admin':
+        return
+    profile.authorized = True
+    profile.start_capture(g.profile_mode, current_app.config['PROFILE_SAMPLE_INTERVAL'])
+
+
+def finish_profile(response):
+    """after_request hook: log the phase timings and write any capture"""
+    profile = current_profile()
+    if profile is None:
+        return response
+    profile.stop_capture()
+    if not profile.authorized:
+        return response
+
+    timings = profile.timings()
+    route = request.url_rule.rule if request.url_rule else request.path
+    summary = ' '.join(f'{name}={ms:.1f}ms' for name, ms in timings.items())
+    message = f"Profile {request.method} {route} {response.status_code}: {summary} queries={profile.queries}"
+    name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{request.method}-{re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_')}"
+    path = profile.dump(current_app.config['PROFILE_DIR'], f'{name}-{os.getpid()}')
+    if path:
+        message += f' capture={path}'
+    current_app.logger.info(message)
+
+    if profile.requested:
+        response.headers['Server-Timing'] = ', '.join(
+            f'{name};dur={ms:.2f}' for name, ms in timings.items()
+        )
+    return response
+
+
+# Statements EXPLAIN accepts; WITH covers CTE forms of the same
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def is_explainable(statement):
+    words = statement.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in EXPLAINABLE
+
+
+def explain(cursor, statement, parameters):
+    """EXPLAIN plan of a statement, on a new cursor of the same DBAPI connection.
+
+    The EXPLAIN runs inside a savepoint: a failure would otherwise abort the
+    request's open transaction and every later query in it.
+    """
+    connection = cursor.connection
+    explain_cursor = connection.cursor()
+    savepoint = not connection.autocommit
+    try:
+        if savepoint:
+            explain_cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            explain_cursor.execute('EXPLAIN ' + statement, parameters)
+            plan = '\n'.join(row[0] for row in explain_cursor.fetchall())
+        except Exception:
+            if savepoint:
+                explain_cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            raise
+        finally:
+            if savepoint:
+                explain_cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        return plan
+    finally:
+        explain_cursor.close()
+
+
+def observe_queries(engine, slow_query_ms, explain_slow_queries, logger):
+    """Add query time to the request profile and log statements slower than slow_query_ms"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['profile_query_start'].pop()
+        profile = current_profile()
+        if profile is not None:
+            profile.add('db', elapsed)
+            profile.queries += 1
+        if slow_query_ms and elapsed * 1000 >= slow_query_ms:
+            message = f"Slow query ({elapsed * 1000:.1f}ms): {statement}"
+            # Plans show parameter values inline, and api_tokens lookups carry bearer tokens
+            if explain_slow_queries and not executemany and is_explainable(statement) and 'api_tokens' not in statement:
+                try:
+                    message += '\n' + explain(cursor, statement, parameters)
+                except Exception as e:
+                    message += f'\nEXPLAIN failed: {str(e)}'
+            logger.warning(message)
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        starts = context.connection.info.get('profile_query_start') if context.connection else None
+        if starts:
+            starts.pop()
+
+
+def init_app(app):
+    """Install the profiling hooks; nothing is installed unless a PROFILE_* or SLOW_QUERY_MS setting enables it"""
+    config = app.config
+    profiling = bool(config['PROFILE_SAMPLE_RATE'] or config['PROFILE_ADMIN_HEADER'])
+    if not (profiling or config['SLOW_QUERY_MS']):
+        return
+
+    for engine in app.extensions['sqlalchemy'].engines.values():
+        observe_queries(engine, config['SLOW_QUERY_MS'], config['SLOW_QUERY_EXPLAIN'], app.logger)
+    if profiling:
+        app.before_request(begin_profile)
+        app.after_request(finish_profile)
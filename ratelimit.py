@@ -0,0 +1,209 @@
+import math
+import threading
+import time
+from collections import deque
+from flask import current_app
+from sqlalchemy import func, select
+
+RATE_LIMIT_BACKENDS = ('memory', 'postgres')
+
+# Leased tokens not spent within this many seconds are dropped, so an idle
+# worker cannot bank tokens and burst past the shared limit later
+LEASE_TTL = 1.0
+
+
+def lease_statement(token_id, rate, burst, want):
+    """Take up to want tokens from the shared bucket; returns (granted, retry_after)"""
+    take = func.rate_limit_take(token_id, rate, burst, want).table_valued('granted', 'retry_after')
+    return select(take.c.granted, take.c.retry_after)
+
+
+class RateLimiter:
+    """Per-token request rate and in-flight limits of one process.
+
+    With the memory backend each process keeps a token bucket of its own, so
+    the effective rate grows with the number of workers. With the postgres
+    backend the bucket lives in rate_limit_buckets (migrations/0008) and each
+    process leases up to RATE_LIMIT_LEASE tokens at a time, paying one round
+    trip per lease instead of one per request.
+
+    The in-flight limit is always per process: it protects the threads and
+    pool connections of the worker serving the requests.
+    """
+
+    def __init__(self, backend, rate, burst, lease, concurrency):
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self.lease = max(1, min(lease, burst))
+        self.concurrency = concurrency
+        self._buckets = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def check(self, token_id):
+        """Spend one request from the local bucket.
+
+        Returns (True, 0) when allowed, (False, retry_after) when limited, or
+        (None, 0) when the postgres backend needs a new lease first.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(token_id, (None, now))
+            if self.backend == 'memory':
+                tokens = self.burst if tokens is None else min(self.burst, tokens + (now - updated) * self.rate)
+                if tokens < 1:
+                    self._buckets[token_id] = (tokens, now)
+                    return False, (1 - tokens) / self.rate
+                self._buckets[token_id] = (tokens - 1, now)
+                return True, 0
+            if tokens and now - updated < LEASE_TTL:
+                self._buckets[token_id] = (tokens - 1, updated)
+                return True, 0
+            return None, 0
+
+    def add_lease(self, token_id, granted, retry_after):
+        """Store tokens leased from the shared bucket and spend one of them"""
+        now = time.monotonic()
+        with self._lock:
+            # Concurrent requests may lease at once; keep what the others left unspent
+            tokens, updated = self._buckets.get(token_id, (None, now))
+            if not tokens or now - updated >= LEASE_TTL:
+                tokens, updated = 0, now
+            tokens += granted
+            if tokens < 1:
+                return False, retry_after
+            self._buckets[token_id] = (tokens - 1, now if granted else updated)
+        return True, 0
+
+    def fetch_lease(self, token_id):
+        """Lease tokens from the shared bucket in a transaction of its own"""
+        with current_app.extensions['sqlalchemy'].engine.begin() as conn:
+            return conn.execute(lease_statement(token_id, self.rate, self.burst, self.lease)).one()
+
+    def enter(self, token_id):
+        """Count a request in flight; False when the token is at its limit"""
+        if self.concurrency <= 0:
+            return True
+        with self._lock:
+            count = self._in_flight.get(token_id, 0)
+            if count >= self.concurrency:
+                return False
+            self._in_flight[token_id] = count + 1
+            return True
+
+    def exit(self, token_id):
+        if self.concurrency <= 0:
+            return
+        with self._lock:
+            count = self._in_flight.get(token_id, 1) - 1
+            if count:
+                self._in_flight[token_id] = count
+            else:
+                self._in_flight.pop(token_id, None)
+
+
+class LoadShedder:
+    """Tracks connection pool checkout waits over a sliding window.
+
+    While the average wait of the last window seconds exceeds the threshold
+    the process is overloaded and new requests are refused. Waits age out of
+    the window, so shedding stops once the pool has recovered. Fewer than
+    min_samples checkouts in the window never count as overload, so a single
+    slow checkout cannot shed a whole window of requests.
+    """
+
+    def __init__(self, threshold_ms, window, min_samples):
+        self.threshold = threshold_ms / 1000
+        self.window = window
+        self.min_samples = max(1, min_samples)
+        self._waits = deque()
+        self._lock = threading.Lock()
+
+    def record(self, seconds, timed_out=False):
+        if self.threshold <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._waits.append((now, seconds))
+            self._expire(now)
+
+    def overloaded(self):
+        """Average checkout wait of the window when above the threshold, else None"""
+        if self.threshold <= 0:
+            return None
+        with self._lock:
+            self._expire(time.monotonic())
+            if len(self._waits) < self.min_samples:
+                return None
+            average = sum(seconds for _, seconds in self._waits) / len(self._waits)
+        return average if average > self.threshold else None
+
+    def _expire(self, now):
+        while self._waits and self._waits[0][0] < now - self.window:
+            self._waits.popleft()
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+def rate_limited_error():
+    return {
+        'error': 'Too many requests',
+        'message': 'Request rate limit exceeded for this token'
+    }
+
+
+def too_many_in_flight_error():
+    return {
+        'error': 'Too many requests',
+        'message': 'Too many concurrent requests for this token'
+    }
+
+
+def overloaded_error():
+    return {
+        'error': 'Service overloaded',
+        'message': 'The database is saturated; retry shortly'
+    }
+
+
+def create_rate_limiter(config):
+    return RateLimiter(
+        backend=config['RATE_LIMIT_BACKEND'],
+        rate=config['RATE_LIMIT_PER_SECOND'],
+        burst=config['RATE_LIMIT_BURST'],
+        lease=config['RATE_LIMIT_LEASE'],
+        concurrency=config['RATE_LIMIT_CONCURRENCY'],
+    )
+
+
+def create_load_shedder(config, engines):
+    """Build a load shedder fed by every timed checkout of the given engines' pools"""
+    shedder = LoadShedder(
+        config['LOAD_SHED_POOL_WAIT_MS'], config['LOAD_SHED_WINDOW'], config['LOAD_SHED_MIN_SAMPLES']
+    )
+    for engine in engines:
+        engine.pool.wait_stats.observers.append(shedder.record)
+    return shedder
+
+
+def init_app(app):
+    """Call inside an app context after db.init_app"""
+    app.extensions['rate_limiter'] = create_rate_limiter(app.config)
+    app.extensions['load_shedder'] = create_load_shedder(
+        app.config, app.extensions['sqlalchemy'].engines.values()
+    )
+
+
+def get_rate_limiter():
+    return current_app.extensions['rate_limiter']
+
+
+def get_load_shedder():
+    return current_app.extensions['load_shedder']
@@ -0,0 +1,137 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+REPLICA_STRATEGIES = ('round_robin', 'least_connections')
+
+# Request header that sends a read-only request to the primary
+READ_FROM_HEADER = 'X-Read-From'
+
+
+def replica_bind_keys(urls):
+    """SQLALCHEMY_BINDS keys for the configured replica URLs"""
+    return [f'replica_{index}' for index in range(len(urls))]
+
+
+class ReplicaRouter:
+    """Picks a replica engine for reads and tracks tokens that must read from the primary"""
+
+    def __init__(self, bind_keys, strategy, sticky_seconds, max_sticky=10000):
+        self.bind_keys = bind_keys
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self.max_sticky = max_sticky
+        self._cycle = itertools.cycle(bind_keys)
+        self._sticky = OrderedDict()
+        self._lock = threading.Lock()
+
+    def choose(self, engines):
+        """Replica engine for the next read, or None when no replica is configured"""
+        if not self.bind_keys:
+            return None
+        if self.strategy == 'least_connections':
+            return min((engines[key] for key in self.bind_keys), key=lambda engine: engine.pool.checkedout())
+        with self._lock:
+            return engines[next(self._cycle)]
+
+    def mark_write(self, token_id):
+        """Keep a token's reads on the primary for the sticky window after it writes"""
+        if self.sticky_seconds <= 0 or token_id is None:
+            return
+        with self._lock:
+            self._sticky[token_id] = time.monotonic() + self.sticky_seconds
+            self._sticky.move_to_end(token_id)
+            while len(self._sticky) > self.max_sticky:
+                self._sticky.popitem(last=False)
+
+    def is_sticky(self, token_id):
+        with self._lock:
+            expires_at = self._sticky.get(token_id)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._sticky[token_id]
+                return False
+            return True
+
+
+def get_replica_router():
+    return current_app.extensions.get('replica_router')
+
+
+def wants_primary():
+    """Whether this request asked for, or is in the sticky window of, primary reads"""
+    router = get_replica_router()
+    if router is None:
+        return False
+    if request.headers.get(READ_FROM_HEADER, '').lower() == 'primary':
+        return True
+    return router.is_sticky(getattr(request, 'token_id', None))
+
+
+def use_replica():
+    """Whether reads in the current request may go to a replica"""
+    if not has_request_context() or not g.get('db_read_only'):
+        return False
+    return get_replica_router() is not None and not wants_primary()
+
+
+def request_replica(engines):
+    """The replica serving this request, chosen on its first read.
+
+    Replicas can lag by different amounts, so every read of one request
+    (a listing's count and its page, say) goes to the same replica.
+    """
+    if 'db_replica' not in g:
+        g.db_replica = get_replica_router().choose(engines)
+    return g.db_replica
+
+
+class RoutingSession(Session):
+    """Sends SELECTs of read-only requests to a replica and everything else to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            is_read = isinstance(clause, Select) and not self._flushing and not (self.new or self.dirty or self.deleted)
+            if is_read and use_replica():
+                engine = request_replica(self._db.engines)
+                if engine is not None:
+                    return engine
+            elif not is_read and has_request_context():
+                g.db_wrote = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(f):
+    """Decorator allowing a handler's queries to be served by a read replica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+def remember_writes(response):
+    """after_request hook starting the sticky window for tokens that wrote"""
+    if g.get('db_wrote'):
+        get_replica_router().mark_write(getattr(request, 'token_id', None))
+    return response
+
+
+def init_app(app):
+    """Create the replica router when DATABASE_REPLICA_URLS is set"""
+    urls = app.config['DATABASE_REPLICA_URLS']
+    if not urls:
+        return
+    app.extensions['replica_router'] = ReplicaRouter(
+        replica_bind_keys(urls),
+        strategy=app.config['DATABASE_REPLICA_STRATEGY'],
+        sticky_seconds=app.config['DATABASE_REPLICA_STICKY_SECONDS'],
+    )
+    app.after_request(remember_writes)
@@ -0,0 +1,137 @@
+from datetime import datetime
+from sqlalchemy import Float, cast, func, literal_column, select, tuple_
+from models import SEARCH_CONFIG, DataRecord
+from pagination import InvalidCursorError, decode_position, encode_position, order_newest_first
+
+SEARCH_SORTS = ('relevance', 'newest')
+SEARCH_QUERY_MAX_LENGTH = 256
+
+# ts_headline options for the content snippet; the markers are not HTML-escaped
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2'
+
+
+def check_search_query(value):
+    """Validate the q= parameter; returns (query, None) or (None, error)"""
+    query = (value or '').strip()
+    if not query:
+        return None, {
+            'error': 'Missing search query',
+            'message': 'Provide the text to search for in the q parameter'
+        }
+    if len(query) > SEARCH_QUERY_MAX_LENGTH:
+        return None, {
+            'error': 'Search query too long',
+            'message': f'q must be {SEARCH_QUERY_MAX_LENGTH} characters or less'
+        }
+    return query, None
+
+
+def tsquery(text):
+    """websearch_to_tsquery accepts user syntax ("quoted phrases", or, -exclusions) without raising"""
+    return func.websearch_to_tsquery(SEARCH_CONFIG, text)
+
+
+def ranking(search_vector, ts_query):
+    """ts_rank_cd as float8: drivers render real differently, and cursors must round-trip exactly"""
+    return cast(func.ts_rank_cd(search_vector, ts_query), Float)
+
+
+def decode_search_cursor(cursor, sort):
+    """Decode a search cursor into (position, id) for the given sort"""
+    try:
+        cursor_sort, position, record_id = decode_position(cursor)
+        if cursor_sort != sort:
+            raise ValueError('cursor was issued for a different sort')
+        if sort == 'newest':
+            position = datetime.fromisoformat(position)
+        else:
+            position = float(position)
+        return position, int(record_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f'Invalid cursor: {cursor}') from e
+
+
+def encode_search_cursor(sort, position, record_id):
+    return encode_position([sort, position.isoformat() if sort == 'newest' else position, record_id])
+
+
+def search_statement(filtered, query, sort, cursor, per_page, max_matches, fields):
+    """One page of search results as a single statement.
+
+    filtered is a select of DataRecord with the listing filters applied.
+    Matching rows are found through the GIN index on search_vector.
+
+    newest is a plain keyset scan on (created_at, id), so Postgres stops
+    after one page whichever way it finds the matches. relevance ranks only
+    the newest max_matches matches: a stable candidate set that bounds the
+    cost of very common terms. Snippets are only computed for the page, in
+    the outer query.
+
+    Each row has the requested fields plus search_id, search_position,
+    search_matches, rank and snippet.
+    """
+    ts_query = tsquery(query)
+    matches = filtered.where(DataRecord.search_vector.op('@@')(ts_query))
+
+    if sort == 'relevance':
+        limited = order_newest_first(
+            matches.with_only_columns(DataRecord.id, DataRecord.search_vector)
+        ).limit(max_matches).subquery()
+        # Counting the capped candidates is free, since ranking reads them all anyway
+        candidates = select(
+            limited.c.id,
+            ranking(limited.c.search_vector, ts_query).label('position'),
+            func.count().over().label('matches'),
+        ).subquery()
+        page = select(candidates)
+        if cursor:
+            after_position, after_id = decode_search_cursor(cursor, sort)
+            page = page.where(tuple_(candidates.c.position, candidates.c.id) < tuple_(after_position, after_id))
+        page = page.order_by(candidates.c.position.desc(), candidates.c.id.desc())
+    else:
+        page = matches.with_only_columns(
+            DataRecord.id, DataRecord.created_at.label('position'), literal_column('NULL').label('matches')
+        )
+        if cursor:
+            after_position, after_id = decode_search_cursor(cursor, sort)
+            page = page.where(tuple_(DataRecord.created_at, DataRecord.id) < tuple_(after_position, after_id))
+        page = order_newest_first(page)
+    page = page.limit(per_page + 1).subquery()
+
+    rank = ranking(DataRecord.search_vector, ts_query)
+    snippet = func.ts_headline(SEARCH_CONFIG, func.coalesce(DataRecord.content, ''), ts_query, HEADLINE_OPTIONS)
+    return (
+        select(
+            *DataRecord.columns(fields),
+            page.c.id.label('search_id'),
+            page.c.position.label('search_position'),
+            page.c.matches.label('search_matches'),
+            rank.label('rank'),
+            snippet.label('snippet'),
+        )
+        .join_from(page, DataRecord, DataRecord.id == page.c.id)
+        .order_by(page.c.position.desc(), page.c.id.desc())
+    )
+
+
+def search_page(rows, sort, per_page, max_matches, fields):
+    """Build the records and pagination blocks from search_statement rows"""
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    records = []
+    for row in rows:
+        record = {field: row._mapping[field] for field in fields}
+        record['rank'] = round(row.rank, 6)
+        record['snippet'] = row.snippet
+        records.append(record)
+    last = rows[-1] if rows else None
+    pagination = {
+        'per_page': per_page,
+        'sort': sort,
+        'has_next': has_next,
+        'next_cursor': encode_search_cursor(sort, last.search_position, last.search_id) if has_next else None
+    }
+    if sort == 'relevance' and last is not None:
+        # Only the newest max_matches matches are ranked; a capped count means more exist
+        pagination['truncated'] = last.search_matches >= max_matches
+    return records, pagination
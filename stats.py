@@ -0,0 +1,45 @@
+from sqlalchemy import BigInteger, cast, func
+from models import record_stats
+
+# Columns of record_stats that counts can be grouped and filtered by
+STATS_DIMENSIONS = ('wiki_id', 'category', 'is_active')
+
+
+def check_group_by(value):
+    """Parse a comma-separated group_by= parameter; returns (dimensions, None) or (None, error)"""
+    if not value:
+        return (), None
+    dimensions = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in dimensions if name not in STATS_DIMENSIONS]
+    if unknown:
+        return None, {
+            'error': 'Invalid group_by',
+            'message': f"Unknown dimensions: {', '.join(unknown)}. Supported: {', '.join(STATS_DIMENSIONS)}"
+        }
+    return dimensions, None
+
+
+def stats_statement(filtered, group_by):
+    """Counts per group_by combination from a filtered select of record_stats, largest first.
+
+    Reads one row per stored group, never data_records itself.
+    """
+    columns = [record_stats.c[name] for name in group_by]
+    # sum(bigint) is numeric; the cast keeps counts integers for the JSON encoder
+    count = cast(func.sum(record_stats.c.record_count), BigInteger)
+    return (
+        filtered.with_only_columns(*columns, count.label('count'))
+        .group_by(*columns)
+        .having(func.sum(record_stats.c.record_count) > 0)
+        .order_by(count.desc(), *columns)
+    )
+
+
+def stats_payload(rows, group_by):
+    # Plain str keys: column names are quoted_name, which orjson rejects
+    groups = [dict(zip(group_by + ('count',), row)) for row in rows]
+    return {
+        'total': sum(group['count'] for group in groups),
+        'group_by': list(group_by),
+        'groups': groups if group_by else []
+    }
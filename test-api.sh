@@ -71,6 +71,275 @@ test_get_records() {
     fi
 }
 
+# Проверка кода ответа: expect_status <ожидаемый код> <описание> <аргументы curl...>
+expect_status() {
+    expected=$1
+    description=$2
+    shift 2
+    response=$(curl -s -w "%{http_code}" -o /tmp/response.json -H "Authorization: Bearer $TOKEN" "$@")
+    
+    if [ "$response" = "$expected" ]; then
+        echo "✅ $description"
+    else
+        echo "❌ $description (код: $response, ожидался $expected)"
+        cat /tmp/response.json
+    fi
+}
+
+# Тест массовой загрузки: ошибки по строкам, повтор пакета по одной строке и upsert
+test_import_records() {
+    echo ""
+    echo "📦 Тест массовой загрузки..."
+    # Пустой title отклоняется при проверке, wiki_id вне диапазона integer — базой,
+    # после чего пакет повторяется по одной строке
+    expect_status 200 "Загрузка JSON-массива с ошибочными строками" -X POST \
+        -H "Content-Type: application/json" \
+        -d '[{"title": "Импорт 1", "category": "test"}, {"title": ""}, {"title": "Импорт 2", "wiki_id": 99999999999}]' \
+        "$API_URL/api/records/import"
+    cat /tmp/response.json | jq '{inserted, failed, errors}' 2>/dev/null || cat /tmp/response.json
+    imported_id=$(jq -r '.ids[0]' /tmp/response.json 2>/dev/null)
+    
+    # Существующий id обновляется, новый вставляется (inserted/updated по xmax)
+    expect_status 200 "Upsert существующей и новой записи" -X POST \
+        -H "Content-Type: application/json" \
+        -d "{\"mode\": \"upsert\", \"records\": [{\"id\": $imported_id, \"title\": \"Импорт 1 (обновлено)\"}, {\"title\": \"Импорт 3\"}]}" \
+        "$API_URL/api/records/import"
+    cat /tmp/response.json | jq '{inserted, updated}' 2>/dev/null || cat /tmp/response.json
+    
+    expect_status 200 "Загрузка NDJSON с некорректной строкой" -X POST \
+        -H "Content-Type: application/x-ndjson" \
+        --data-binary $'{"title": "NDJSON 1"}\nnot json\n{"title": "NDJSON 2"}' \
+        "$API_URL/api/records/import"
+    cat /tmp/response.json | jq '{inserted, failed, errors}' 2>/dev/null || cat /tmp/response.json
+}
+
+# Тест выгрузки
+test_export_records() {
+    echo ""
+    echo "📤 Тест выгрузки..."
+    expect_status 200 "Выгрузка CSV" "$API_URL/api/records/export?format=csv&category=test"
+    head -3 /tmp/response.json
+    expect_status 400 "Неизвестный формат выгрузки отклонён" "$API_URL/api/records/export?format=xml"
+}
+
+# Тест курсорной пагинации и выбора полей
+test_cursor_pagination() {
+    echo ""
+    echo "📑 Тест курсорной пагинации и выбора полей..."
+    expect_status 200 "Первая страница по курсору" "$API_URL/api/records?per_page=2&cursor=&fields=id,title"
+    cat /tmp/response.json | jq . 2>/dev/null || cat /tmp/response.json
+    next_cursor=$(jq -r '.pagination.next_cursor // empty' /tmp/response.json 2>/dev/null)
+    if [ -n "$next_cursor" ]; then
+        expect_status 200 "Следующая страница по курсору" "$API_URL/api/records?per_page=2&cursor=$next_cursor&fields=id,title"
+    fi
+    expect_status 400 "Некорректный курсор отклонён" "$API_URL/api/records?cursor=broken"
+    expect_status 400 "Неизвестное поле отклонено" "$API_URL/api/records?fields=id,password"
+}
+
+# Тест условных запросов
+test_conditional_get() {
+    echo ""
+    echo "🔁 Тест условных запросов..."
+    etag=$(curl -s -D - -o /dev/null -H "Authorization: Bearer $TOKEN" "$API_URL/api/records?per_page=5" \
+        | grep -i '^etag:' | cut -d' ' -f2- | tr -d '\r')
+    if [ -z "$etag" ]; then
+        echo "❌ Ответ без ETag"
+        return
+    fi
+    expect_status 304 "Повторный запрос с If-None-Match" -H "If-None-Match: $etag" "$API_URL/api/records?per_page=5"
+}
+
+# Тест полнотекстового поиска
+test_search_records() {
+    echo ""
+    echo "🔍 Тест полнотекстового поиска..."
+    response=$(curl -s -w "%{http_code}" \
+        -H "Authorization: Bearer $TOKEN" \
+        -o /tmp/response.json \
+        "$API_URL/api/records/search?q=%D0%A2%D0%B5%D1%81%D1%82%D0%BE%D0%B2%D0%B0%D1%8F&category=test&per_page=5")
+    
+    if [ "$response" = "200" ]; then
+        echo "✅ Поиск выполнен"
+        cat /tmp/response.json | jq . 2>/dev/null || cat /tmp/response.json
+    else
+        echo "❌ Ошибка поиска (код: $response)"
+        cat /tmp/response.json
+    fi
+}
+
+# Тест статистики
+test_record_stats() {
+    echo ""
+    echo "📊 Тест статистики..."
+    expect_status 200 "Число записей по категориям" "$API_URL/api/records/stats?group_by=category,is_active"
+    cat /tmp/response.json | jq . 2>/dev/null || cat /tmp/response.json
+    expect_status 400 "Неизвестное измерение отклонено" "$API_URL/api/records/stats?group_by=title"
+}
+
+# Тест сжатия ответов и keep-alive
+test_compression() {
+    echo ""
+    echo "🗜️ Тест сжатия ответов..."
+    encoding=$(curl -s -D - -o /dev/null -H "Authorization: Bearer $TOKEN" -H "Accept-Encoding: gzip" \
+        "$API_URL/api/records?per_page=100" | grep -i '^content-encoding:' | cut -d' ' -f2 | tr -d '\r')
+    if [ "$encoding" = "gzip" ]; then
+        echo "✅ Список сжат gzip"
+    else
+        echo "❌ Список не сжат (Content-Encoding: ${encoding:-нет})"
+    fi
+    
+    if curl -s --compressed -H "Authorization: Bearer $TOKEN" -H "Accept-Encoding: gzip" \
+        "$API_URL/api/records/export?format=ndjson" | head -1 | jq -e .id > /dev/null 2>&1; then
+        echo "✅ Потоковая выгрузка сжата и читается"
+    else
+        echo "❌ Сжатая выгрузка не распакована"
+    fi
+    
+    reused=$(curl -s -v -o /dev/null -o /dev/null -H "Authorization: Bearer $TOKEN" \
+        "$API_URL/api/health" "$API_URL/api/health" 2>&1 | grep -ci 're-using existing connection')
+    if [ "$reused" -ge 1 ]; then
+        echo "✅ Соединение переиспользовано (keep-alive)"
+    else
+        echo "❌ Соединение не переиспользовано"
+    fi
+}
+
+# Тест ограничения частоты запросов
+test_rate_limit() {
+    echo ""
+    echo "🚦 Тест ограничения частоты запросов..."
+    limited=0
+    for i in $(seq 1 200); do
+        status=$(curl -s -o /tmp/response.json -D /tmp/headers.txt -w "%{http_code}" \
+            -H "Authorization: Bearer $TOKEN" "$API_URL/api/records?per_page=1&fields=id")
+        if [ "$status" = "429" ]; then
+            limited=1
+            break
+        fi
+    done
+    if [ "$limited" = "1" ]; then
+        echo "✅ Лимит сработал после $i запросов, $(grep -i '^retry-after' /tmp/headers.txt | tr -d '\r')"
+        sleep "$(grep -i '^retry-after' /tmp/headers.txt | tr -dc '0-9')"
+    else
+        echo "ℹ️ 200 запросов прошли без 429 (RATE_LIMIT_PER_SECOND выше или ограничение отключено)"
+    fi
+}
+
+# Тест одновременного создания записей (с GROUP_COMMIT_WINDOW_MS — одной групповой фиксацией).
+# Запросов не больше RATE_LIMIT_CONCURRENCY, чтобы не получить 429
+test_parallel_writes() {
+    echo ""
+    echo "⚡ Тест одновременного создания записей..."
+    pids=""
+    for i in 1 2 3 4; do
+        curl -s -o /tmp/parallel_$i.json -w "%{http_code}" -X POST \
+            -H "Authorization: Bearer $TOKEN" \
+            -H "Content-Type: application/json" \
+            -d "{\"title\": \"Параллельная запись $i\"}" \
+            "$API_URL/api/records" > /tmp/parallel_$i.status &
+        pids="$pids $!"
+    done
+    wait $pids
+    created=$(cat /tmp/parallel_*.status | grep -o '201' | wc -l)
+    ids=$(jq -r '.record.id // empty' /tmp/parallel_*.json 2>/dev/null | sort -u | wc -l)
+    if [ "$created" = "4" ] && [ "$ids" = "4" ]; then
+        echo "✅ 4 записи созданы, у каждой свой id"
+    else
+        echo "❌ Создано записей: $created, различных id: $ids"
+        cat /tmp/parallel_*.json
+    fi
+    rm -f /tmp/parallel_*.json /tmp/parallel_*.status
+}
+
+# Тест поиска записи по id с указанием wiki_id (одна секция при секционировании по wiki_id)
+test_record_wiki_hint() {
+    echo ""
+    echo "🧭 Тест поиска записи в пределах wiki..."
+    expect_status 201 "Запись в wiki 42" -X POST \
+        -H "Content-Type: application/json" \
+        -d '{"title": "Запись wiki 42", "wiki_id": 42}' \
+        "$API_URL/api/records"
+    id=$(jq -r '.record.id' /tmp/response.json 2>/dev/null)
+    expect_status 200 "Запись найдена в своей wiki" "$API_URL/api/records/$id?wiki_id=42"
+    expect_status 404 "Запись не найдена в другой wiki" "$API_URL/api/records/$id?wiki_id=43"
+    expect_status 200 "Запись удалена в своей wiki" -X DELETE "$API_URL/api/records/$id?wiki_id=42"
+}
+
+# Тест пакетного получения записей
+test_batch_get() {
+    echo ""
+    echo "📚 Тест пакетного получения записей..."
+    expect_status 200 "Список записей" "$API_URL/api/records?per_page=3&fields=id"
+    ids=$(jq -r '[.records[].id] | reverse | join(",")' /tmp/response.json 2>/dev/null)
+    expect_status 200 "Записи по списку id" -X POST \
+        -H "Content-Type: application/json" \
+        -d "{\"ids\": [${ids:+$ids,}2000000000]}" \
+        "$API_URL/api/records/batch-get?fields=id,title"
+    cat /tmp/response.json | jq . 2>/dev/null || cat /tmp/response.json
+    expect_status 400 "Пустой список id отклонён" -X POST \
+        -H "Content-Type: application/json" \
+        -d '{"ids": []}' \
+        "$API_URL/api/records/batch-get"
+}
+
+# Тест ленты изменений
+test_record_changes() {
+    echo ""
+    echo "🔄 Тест ленты изменений..."
+    expect_status 200 "Начало ленты" "$API_URL/api/records/changes?per_page=1000&fields=id"
+    since=$(jq -r '.next_since' /tmp/response.json 2>/dev/null)
+    while [ "$(jq -r '.has_more' /tmp/response.json 2>/dev/null)" = "true" ]; do
+        expect_status 200 "Следующая страница ленты" "$API_URL/api/records/changes?per_page=1000&fields=id&since=$since" > /dev/null
+        since=$(jq -r '.next_since' /tmp/response.json 2>/dev/null)
+    done
+    
+    expect_status 201 "Создание записи для ленты" -X POST \
+        -H "Content-Type: application/json" \
+        -d '{"title": "Запись для ленты изменений", "category": "test"}' \
+        "$API_URL/api/records"
+    record_id=$(jq -r '.record.id' /tmp/response.json 2>/dev/null)
+    expect_status 200 "Удаление записи для ленты" -X DELETE "$API_URL/api/records/$record_id"
+    
+    expect_status 200 "Изменения после курсора" "$API_URL/api/records/changes?since=$since&wait=5&fields=id,title"
+    cat /tmp/response.json | jq '.changes' 2>/dev/null || cat /tmp/response.json
+    expect_status 400 "Некорректный курсор ленты отклонён" "$API_URL/api/records/changes?since=broken"
+}
+
+# Тест массовых операций и фоновых задач
+test_bulk_jobs() {
+    echo ""
+    echo "🧰 Тест массовых операций..."
+    expect_status 400 "Нечисловые id отклонены" -X POST \
+        -H "Content-Type: application/json" \
+        -d '{"action": "deactivate", "record_ids": ["1"]}' \
+        "$API_URL/api/records/bulk"
+    expect_status 400 "id вне диапазона integer отклонены" -X POST \
+        -H "Content-Type: application/json" \
+        -d '{"action": "deactivate", "record_ids": [3000000000]}' \
+        "$API_URL/api/records/bulk"
+    expect_status 404 "Неизвестная задача" "$API_URL/api/jobs/999999999"
+    
+    # Несуществующие id: задача выполняется, но ничего не меняет
+    ids=$(seq 2000000001 2000002001 | paste -sd, -)
+    expect_status 202 "Длинный список id поставлен в очередь" -X POST \
+        -H "Content-Type: application/json" \
+        -d "{\"action\": \"deactivate\", \"record_ids\": [$ids]}" \
+        "$API_URL/api/records/bulk"
+    job_id=$(jq -r '.job.id // empty' /tmp/response.json 2>/dev/null)
+    if [ -z "$job_id" ]; then
+        return
+    fi
+    for attempt in $(seq 1 10); do
+        expect_status 200 "Статус задачи $job_id" "$API_URL/api/jobs/$job_id" > /dev/null
+        status=$(jq -r '.status' /tmp/response.json 2>/dev/null)
+        if [ "$status" = "succeeded" ] || [ "$status" = "failed" ]; then
+            break
+        fi
+        sleep 1
+    done
+    cat /tmp/response.json | jq '{status, total, processed, affected, progress}' 2>/dev/null || cat /tmp/response.json
+}
+
 # Основной процесс тестирования
 main() {
     # Проверка что Docker Compose запущен
@@ -87,6 +356,19 @@ main() {
     test_health
     test_create_record
     test_get_records
+    test_record_wiki_hint
+    test_parallel_writes
+    test_import_records
+    test_export_records
+    test_cursor_pagination
+    test_conditional_get
+    test_search_records
+    test_record_stats
+    test_compression
+    test_batch_get
+    test_record_changes
+    test_bulk_jobs
+    test_rate_limit
     
     echo ""
     echo "🎉 Тестирование завершено!"
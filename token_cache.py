@@ -0,0 +1,179 @@
+import asyncio
+import atexit
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import case, update
+from models import ApiToken, db
+
+
+def token_digest(token):
+    """Return the cache key for a raw bearer token"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def last_used_statement(pending):
+    """One UPDATE setting last_used for every {token_id: timestamp} pending"""
+    return (
+        update(ApiToken)
+        .where(ApiToken.id.in_(list(pending)))
+        .values(last_used=case(pending, value=ApiToken.id))
+    )
+
+
+class TokenCache:
+    """Per-worker TTL/LRU cache of tokens that passed database and JWT validation.
+
+    The TTL bounds how long a revoked token keeps working in a worker that
+    has already seen it.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        """Return (token_id, payload) for a cached token or None"""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            token_id, payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return token_id, payload
+
+    def put(self, digest, token_id, payload):
+        """Cache a validated token until the TTL or the JWT expiry, whichever is first"""
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if payload.get('exp'):
+            expires_at = min(expires_at, float(payload['exp']))
+        with self._lock:
+            self._entries[digest] = (token_id, payload, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, digest=None):
+        """Drop one token, or every token when no digest is given"""
+        with self._lock:
+            if digest is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(digest, None)
+
+
+class LastUsedBatcher:
+    """Collects last_used timestamps and writes them in a single UPDATE per interval"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def touch(self, token_id):
+        """Record that a token was used now"""
+        if self.interval <= 0:
+            self._write({token_id: datetime.utcnow()})
+            return
+        with self._lock:
+            self._pending[token_id] = datetime.utcnow()
+        self._ensure_thread()
+
+    def flush(self):
+        """Write all pending timestamps to the database"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self._write(pending)
+
+    def _write(self, pending):
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(last_used_statement(pending))
+        except Exception as e:
+            self.app.logger.error(f"Error flushing token last_used: {str(e)}")
+
+    def _ensure_thread(self):
+        # Started lazily so that forked workers each get their own flusher
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='last-used-flusher', daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+class AsyncLastUsedBatcher:
+    """LastUsedBatcher counterpart for the ASGI app, flushing from an asyncio task"""
+
+    def __init__(self, engine, interval, logger):
+        self.engine = engine
+        self.interval = interval
+        self.logger = logger
+        self._pending = {}
+
+    def touch(self, token_id):
+        self._pending[token_id] = datetime.utcnow()
+        if self.interval <= 0:
+            asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(last_used_statement(pending))
+        except Exception as e:
+            self.logger.error(f"Error flushing token last_used: {str(e)}")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(max(self.interval, 1))
+            await self.flush()
+
+
+def init_app(app):
+    """Create the token cache and last_used batcher for an application"""
+    app.extensions['token_cache'] = TokenCache(
+        ttl=app.config['AUTH_CACHE_TTL'],
+        max_size=app.config['AUTH_CACHE_MAX_SIZE'],
+    )
+    app.extensions['last_used_batcher'] = LastUsedBatcher(
+        app, interval=app.config['LAST_USED_FLUSH_INTERVAL']
+    )
+
+
+def get_token_cache():
+    return current_app.extensions['token_cache']
+
+
+def get_last_used_batcher():
+    return current_app.extensions['last_used_batcher']
@@ -0,0 +1,45 @@
+from models import RECORD_FIELDS
+
+TITLE_MAX_LENGTH = 200
+
+
+def check_title(value):
+    """Validate a record title.
+
+    Returns (title, None) with the stripped title, or (None, error) where
+    error is the JSON error body to send back.
+    """
+    title = value.strip()
+    if not title:
+        return None, {
+            'error': 'Title cannot be empty'
+        }
+    if len(title) > TITLE_MAX_LENGTH:
+        return None, {
+            'error': 'Title too long',
+            'message': f'Title must be {TITLE_MAX_LENGTH} characters or less'
+        }
+    return title, None
+
+
+def check_fields(value):
+    """Parse a comma-separated fields= parameter.
+    
+    Returns (fields, None) with the requested fields in the order given, all
+    fields when value is empty, or (None, error) for unknown field names.
+    """
+    if not value:
+        return RECORD_FIELDS, None
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields:
+        return None, {
+            'error': 'Invalid fields',
+            'message': 'fields must name at least one field'
+        }
+    unknown = [field for field in fields if field not in RECORD_FIELDS]
+    if unknown:
+        return None, {
+            'error': 'Invalid fields',
+            'message': f'Unknown fields: {", ".join(unknown)}. Allowed fields: {", ".join(RECORD_FIELDS)}'
+        }
+    return fields, None
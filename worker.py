@@ -0,0 +1,56 @@
+import signal
+import threading
+from app import create_app
+from changes import prune_statement
+from jobs import JobWorker
+from partitions import is_lock_timeout, maintain
+from models import db
+
+app = create_app()
+
+# Seconds between deletions of change log rows past CHANGES_RETENTION_DAYS
+PRUNE_INTERVAL = 3600
+
+
+def prune_changes(stopped):
+    """Trim the change log every PRUNE_INTERVAL until stopped is set"""
+    with app.app_context():
+        while not stopped.wait(PRUNE_INTERVAL):
+            try:
+                with db.engine.begin() as conn:
+                    pruned = conn.execute(prune_statement(app.config['CHANGES_RETENTION_DAYS'])).rowcount
+                app.logger.info(f"Pruned {pruned} change log rows")
+            except Exception as e:
+                app.logger.error(f"Error pruning change log: {str(e)}")
+
+
+def maintain_partitions(stopped):
+    """Create upcoming range partitions of data_records and drop expired ones every PRUNE_INTERVAL"""
+    with app.app_context():
+        while True:
+            try:
+                with db.engine.begin() as conn:
+                    maintain(conn, app.config['PARTITION_AHEAD_MONTHS'], app.config['RECORDS_RETENTION_MONTHS'])
+            except Exception as e:
+                if is_lock_timeout(e):
+                    app.logger.warning(f"Skipped partition maintenance until the next run, data_records is busy: {str(e)}")
+                else:
+                    app.logger.error(f"Error maintaining partitions: {str(e)}")
+            if stopped.wait(PRUNE_INTERVAL):
+                break
+
+
+if __name__ == '__main__':
+    worker = JobWorker(app)
+    stopped = threading.Event()
+
+    def stop(*args):
+        stopped.set()
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    threading.Thread(target=prune_changes, args=(stopped,), name='change-log-pruner', daemon=True).start()
+    threading.Thread(target=maintain_partitions, args=(stopped,), name='partition-maintainer', daemon=True).start()
+    app.logger.info(f"Starting {worker.threads} bulk job worker thread(s)")
+    worker.run()